@@ -0,0 +1,151 @@
+"""
+AI 분석 결과 캐시
+Incident와 최근 알람이 그대로면 LLM을 다시 실행하지 않고 이전 분석 결과 반환
+
+- 캐시 키: incident_key + 요약된 알람 집합, 유사 사건, 프롬프트 버전의 hash (alert_digest)
+- 1차: 프로세스 메모리 LRU / 2차: ai_analysis_cache 테이블 (재시작, replica 간 공유)
+- AI_CACHE_TTL_SECONDS 후 만료
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from db_pool import get_db_connection
+
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", "86400"))
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "500"))
+AI_CACHE_PURGE_EVERY = 100  # 저장 N회마다 만료 행 정리
+
+CacheKey = Tuple[str, str]
+
+
+def analysis_digest(alert_summary: list, prompt_version: str, similar_ids: Optional[list] = None) -> str:
+    """요약된 알람 집합 + 프롬프트 버전 (+ 프롬프트에 넣은 유사 사건 ID) hash"""
+    raw = json.dumps({"alerts": alert_summary, "prompt": prompt_version, "similar": similar_ids or []},
+                     sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class AIAnalysisCache:
+    """(incident_key, alert_digest) → 분석 결과 (메모리 LRU + DB)"""
+
+    def __init__(self, max_size: int = AI_CACHE_SIZE, ttl: int = AI_CACHE_TTL_SECONDS):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+
+        # 통계
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _remember(self, key: CacheKey, result: Dict[str, Any], expires_at: float):
+        with self._lock:
+            self._entries[key] = (result, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, incident_key: str, digest: str) -> Optional[Dict[str, Any]]:
+        """캐시된 분석 결과 조회 (메모리 → DB), 없거나 만료되면 None"""
+        key = (incident_key, digest)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return result
+                del self._entries[key]
+
+        try:
+            conn = get_db_connection()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("""
+                        SELECT result, TIMESTAMPDIFF(SECOND, NOW(), expires_at) AS ttl_left
+                        FROM ai_analysis_cache
+                        WHERE incident_key = %s AND alert_digest = %s AND expires_at > NOW()
+                    """, key)
+                    row = cursor.fetchone()
+            finally:
+                conn.close()
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️  AI 분석 캐시 조회 실패: {e}")
+            row = None
+
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        result = row["result"]
+        if isinstance(result, (str, bytes)):
+            result = json.loads(result)
+        self._remember(key, result, time.monotonic() + max(row["ttl_left"], 0))
+        with self._lock:
+            self.db_hits += 1
+        return result
+
+    def put(self, incident_key: str, digest: str, prompt_version: str, result: Dict[str, Any]):
+        """분석 결과 저장 (같은 키는 덮어씀)"""
+        self._remember((incident_key, digest), result, time.monotonic() + self.ttl)
+        with self._lock:
+            self._puts += 1
+            purge = self._puts % AI_CACHE_PURGE_EVERY == 0
+
+        try:
+            conn = get_db_connection()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("""
+                        INSERT INTO ai_analysis_cache (incident_key, alert_digest, prompt_version, result, expires_at)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ON DUPLICATE KEY UPDATE
+                            prompt_version = VALUES(prompt_version),
+                            result = VALUES(result),
+                            created_at = NOW(),
+                            expires_at = VALUES(expires_at)
+                    """, (incident_key, digest, prompt_version, json.dumps(result, ensure_ascii=False),
+                          datetime.now() + timedelta(seconds=self.ttl)))
+                    if purge:
+                        cursor.execute("DELETE FROM ai_analysis_cache WHERE expires_at <= NOW() LIMIT 1000")
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️  AI 분석 캐시 저장 실패: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """hit-rate 통계"""
+        with self._lock:
+            size = len(self._entries)
+            memory_hits, db_hits, misses = self.memory_hits, self.db_hits, self.misses
+        checked = memory_hits + db_hits + misses
+        return {
+            "enabled": AI_CACHE_ENABLED,
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "memory_hits": memory_hits,
+            "db_hits": db_hits,
+            "misses": misses,
+            "errors": self.errors,
+            "hit_ratio": round((memory_hits + db_hits) / checked, 4) if checked else 0,
+        }
+
+
+# 프로세스 공용 캐시
+ai_cache = AIAnalysisCache()
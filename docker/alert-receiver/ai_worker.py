@@ -0,0 +1,266 @@
+"""
+AI 분석 작업 풀
+Slack "🤖 AI 분석" 요청을 고정 크기 워커에서 실행 (Ollama 동시 추론 수 제한)
+
+- AI_WORKERS개 워커 + 최대 AI_QUEUE_MAX개 대기열
+- 같은 incident_id의 진행 중 / 대기 중 작업이 있으면 새로 실행하지 않고 같은 Future 공유
+- 작업마다 AI_ANALYSIS_TIMEOUT_SECONDS 제한 (대기 시간 포함)
+- 실행 중 시간 초과된 작업은 추론이 실제로 끝날 때까지 incident_id의 작업으로 남음
+  → 그 사이 같은 Incident의 새 요청은 후속 작업 1개로 모여, 이전 추론이 끝난 뒤 대기열에 들어감 (동시 추론 중복 방지)
+- 대기 시간 / 추론 시간 통계
+- 작업은 job.progress(text)로 진행 상황을 listener(Slack 스트리밍 메시지 등)에 전달
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+AI_WORKERS = int(os.getenv("AI_WORKERS", "1"))  # CPU 추론 기준 동시 1건
+AI_QUEUE_MAX = int(os.getenv("AI_QUEUE_MAX", "20"))
+AI_ANALYSIS_TIMEOUT_SECONDS = float(os.getenv("AI_ANALYSIS_TIMEOUT_SECONDS", "300"))
+
+
+class AIQueueFull(Exception):
+    """대기열이 가득 차서 작업을 받지 않음"""
+
+
+class AIJob:
+    """
+    AI 분석 작업 (incident_id당 1개)
+    subscribers: 결과를 받을 Slack 스레드 (channel, message_ts)
+    """
+
+    def __init__(self, incident_id: str, task: Callable[["AIJob"], Any], timeout: float):
+        self.incident_id = incident_id
+        self.task = task
+        self.future: Future = Future()
+        self.subscribers: set = set()
+        self.listeners: list = []
+        self.enqueued_at = time.monotonic()
+        self.deadline = self.enqueued_at + timeout
+        self.started_at: Optional[float] = None
+        self.finished = False  # 결과(또는 시간 초과) 전달됨
+        self.successor: Optional["AIJob"] = None  # 시간 초과 후 들어온 같은 Incident의 새 요청
+        self.blocked = False  # 이전 작업의 추론이 끝나기를 기다리는 중 (아직 대기열에 없음)
+
+    def add_listener(self, listener: Callable[[str], None]):
+        """진행 상황 listener 등록 (공유된 작업에 나중에 합류해도 이후 진행 상황을 받음)"""
+        self.listeners.append(listener)
+
+    def progress(self, text: str):
+        """작업 진행 상황 전달 (워커 스레드에서 호출, listener 오류는 무시)"""
+        if self.finished:
+            return
+        for listener in list(self.listeners):
+            try:
+                listener(text)
+            except Exception as e:
+                print(f"⚠️  AI 분석 진행 상황 전달 실패: {e}")
+
+
+class AIWorkerPool:
+    """고정 크기 AI 분석 워커 + 대기열"""
+
+    def __init__(self, workers: int = AI_WORKERS, max_queue: int = AI_QUEUE_MAX,
+                 timeout: float = AI_ANALYSIS_TIMEOUT_SECONDS):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        self._cond = threading.Condition()
+        self._queue: deque = deque()
+        self._jobs: Dict[str, AIJob] = {}  # incident_id → 대기 중 / 실행 중 작업 (시간 초과됐지만 추론 중인 작업 포함)
+        self._running = 0
+        self._threads: list = []
+
+        # 통계
+        self.submitted = 0
+        self.shared = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.dequeued = 0
+        self.inferences = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.total_inference = 0.0
+        self.max_inference = 0.0
+
+    def submit(self, incident_id: str, task: Callable[[AIJob], Any],
+               subscriber: Optional[Tuple[str, str]] = None) -> Tuple[AIJob, bool, int]:
+        """
+        AI 분석 요청
+
+        Args:
+            task: 워커에서 실행할 분석 함수 task(job) (결과가 job.future에 설정됨)
+            subscriber: 결과를 받을 Slack 스레드 (channel, message_ts)
+
+        Returns: (job, 새 subscriber 여부, 대기 순서 - 0이면 바로 실행 / 실행 중)
+        Raises: AIQueueFull
+        """
+        with self._cond:
+            self.submitted += 1
+            current = self._jobs.get(incident_id)
+            job = current
+            if current is not None and current.finished:
+                # 시간 초과됐지만 추론이 아직 끝나지 않음 → 후속 작업에 합류
+                job = current.successor
+            if job is not None:
+                self.shared += 1
+                is_new = subscriber is not None and subscriber not in job.subscribers
+                if is_new:
+                    job.subscribers.add(subscriber)
+                return job, is_new, self._position(job)
+
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise AIQueueFull(f"AI 분석 대기열 가득 참 ({len(self._queue)}개)")
+
+            job = AIJob(incident_id, task, self.timeout)
+            if subscriber is not None:
+                job.subscribers.add(subscriber)
+            if current is not None:
+                # 이전 추론이 끝나면 _release에서 대기열에 추가
+                job.blocked = True
+                current.successor = job
+            else:
+                self._jobs[incident_id] = job
+                self._queue.append(job)
+                self._ensure_workers()
+                self._cond.notify()
+            return job, subscriber is not None, self._position(job)
+
+    def _position(self, job: AIJob) -> int:
+        """대기 순서 (_cond 보유 상태에서 호출)"""
+        if job.started_at is not None:
+            return 0
+        if job.blocked:
+            # 이전 추론이 끝난 뒤 대기열 끝에 들어감
+            return len(self._queue) + 1
+        try:
+            ahead = self._queue.index(job)
+        except ValueError:
+            return 0
+        # 쉬는 워커가 바로 가져갈 작업은 대기 순서 0
+        return max(0, ahead + 1 - (self.workers - self._running))
+
+    def _ensure_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"ai-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                job = self._queue.popleft()
+                now = time.monotonic()
+                job.started_at = now
+                wait = now - job.enqueued_at
+                self.dequeued += 1
+                self.total_queue_wait += wait
+                self.max_queue_wait = max(self.max_queue_wait, wait)
+                expired = now >= job.deadline
+                if not expired:
+                    self._running += 1
+            if expired:
+                self._finish(job, error=TimeoutError(f"AI 분석 대기 시간 초과 ({self.timeout:g}초)"))
+                self._release(job)
+                continue
+
+            # 실행 중 제한 시간 초과 시 결과를 기다리는 쪽에는 TimeoutError 전달
+            # (추론 자체는 중단할 수 없으므로 워커는 끝날 때까지 점유됨)
+            timer = threading.Timer(job.deadline - time.monotonic(), self._expire, args=(job,))
+            timer.daemon = True
+            timer.start()
+            try:
+                result = job.task(job)
+                error = None
+            except Exception as e:
+                result, error = None, e
+            finally:
+                timer.cancel()
+            elapsed = time.monotonic() - job.started_at
+
+            with self._cond:
+                self._running -= 1
+                self.inferences += 1
+                self.total_inference += elapsed
+                self.max_inference = max(self.max_inference, elapsed)
+            self._finish(job, result=result, error=error)
+            self._release(job)
+
+    def _expire(self, job: AIJob):
+        """실행 중 제한 시간 초과 - 결과는 TimeoutError로 전달하지만 _jobs에는 추론이 끝날 때까지 남김"""
+        self._finish(job, error=TimeoutError(f"AI 분석 시간 초과 ({self.timeout:g}초)"))
+
+    def _release(self, job: AIJob):
+        """
+        추론이 실제로 끝난 작업을 _jobs에서 제거
+        시간 초과 후 들어온 후속 작업이 있으면 대기열에 추가 (제한 시간은 이때부터)
+        """
+        with self._cond:
+            if self._jobs.get(job.incident_id) is not job:
+                return
+            successor = job.successor
+            if successor is None:
+                del self._jobs[job.incident_id]
+                return
+            successor.blocked = False
+            successor.enqueued_at = time.monotonic()
+            successor.deadline = successor.enqueued_at + self.timeout
+            self._jobs[job.incident_id] = successor
+            self._queue.append(successor)
+            self._ensure_workers()
+            self._cond.notify()
+
+    def _finish(self, job: AIJob, result: Any = None, error: Optional[Exception] = None):
+        """
+        작업 결과 설정 (이미 끝난 작업은 무시, _jobs 정리는 _release)
+        Future 콜백(Slack 전송 등)은 락 밖에서 실행
+        """
+        with self._cond:
+            if job.finished:
+                return
+            job.finished = True
+            if error is None:
+                self.completed += 1
+            elif isinstance(error, TimeoutError):
+                self.timeouts += 1
+            else:
+                self.failed += 1
+        if error is None:
+            job.future.set_result(result)
+        else:
+            job.future.set_exception(error)
+
+    def stats(self) -> Dict[str, Any]:
+        """대기열 / 대기 시간 / 추론 시간 통계"""
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queue_depth": len(self._queue),
+                "queue_max": self.max_queue,
+                "submitted": self.submitted,
+                "shared": self.shared,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "timed_out_running": sum(1 for job in self._jobs.values() if job.finished),
+                "avg_queue_wait_ms": round(self.total_queue_wait / self.dequeued * 1000, 1) if self.dequeued else 0,
+                "max_queue_wait_ms": round(self.max_queue_wait * 1000, 1),
+                "avg_inference_ms": round(self.total_inference / self.inferences * 1000, 1) if self.inferences else 0,
+                "max_inference_ms": round(self.max_inference * 1000, 1),
+            }
+
+
+# 프로세스 공용 풀
+ai_pool = AIWorkerPool()
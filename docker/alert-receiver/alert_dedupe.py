@@ -0,0 +1,206 @@
+"""
+Grafana 반복 알림 dedupe
+Grafana는 firing 중인 alert를 repeat interval / 그룹 변경마다 다시 보냄
+같은 alert(fingerprint + startsAt + status)는 최초 저장 행의 repeat_count / last_seen_at만 갱신하고
+grafana_alerts 행 추가, incident 갱신, Slack 전송을 하지 않음
+
+- 1차: 프로세스 메모리 LRU/TTL 캐시
+- 2차: grafana_alerts (fingerprint, starts_at, state) 인덱스 조회
+- 최초 저장 행의 incident가 open(active / acknowledged)일 때만 반복으로 처리
+  (수동 Resolve 후 Grafana가 계속 보내는 같은 firing alert는 find_or_create_incident로 → 새 incident / 카드)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from incident_index import open_incidents
+
+ALERT_DEDUPE_ENABLED = os.getenv("ALERT_DEDUPE_ENABLED", "true").lower() in ("1", "true", "yes")
+ALERT_DEDUPE_CACHE_SIZE = int(os.getenv("ALERT_DEDUPE_CACHE_SIZE", "10000"))
+ALERT_DEDUPE_TTL_SECONDS = float(os.getenv("ALERT_DEDUPE_TTL_SECONDS", "21600"))  # 6시간
+
+DedupeKey = Tuple[str, str, str]
+
+
+def dedupe_key(alert_info: Dict[str, Any]) -> Optional[DedupeKey]:
+    """
+    반복 알림 판별 키 (fingerprint, startsAt, status)
+    fingerprint나 startsAt이 없는 alert는 dedupe 대상이 아님
+    """
+    if not alert_info.get("fingerprint") or not alert_info.get("starts_at"):
+        return None
+    return (alert_info["fingerprint"], alert_info["starts_at"], alert_info["state"])
+
+
+class AlertDedupeCache:
+    """
+    dedupe 키 → 최초 저장 행 {alert_id, incident_id} (LRU + TTL)
+    """
+
+    def __init__(self, max_size: int = ALERT_DEDUPE_CACHE_SIZE, ttl: float = ALERT_DEDUPE_TTL_SECONDS):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._entries: "OrderedDict[DedupeKey, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 통계
+        self.cache_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def get(self, key: DedupeKey) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: DedupeKey, value: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def partition(self, groups: Dict[str, list]) -> Tuple[Dict[int, Dict[str, Any]], Dict[DedupeKey, List[int]]]:
+        """
+        payload alert를 캐시로 분류
+
+        Args:
+            groups: group_alerts_by_incident_key 결과 {incident_key: [(index, alert, alert_info)]}
+
+        Returns: (repeats {index: 최초 저장 행}, DB 조회가 필요한 {dedupe 키: [index, ...]})
+        """
+        repeats, lookup = {}, {}
+        for items in groups.values():
+            for index, _, alert_info in items:
+                key = dedupe_key(alert_info)
+                if key is None:
+                    continue
+                original = self.get(key)
+                if original and open_incidents.status(original["incident_id"]) is None:
+                    # open incident 인덱스에 없음 (resolve됨 또는 미로드) → DB에서 incident 상태와 함께 다시 확인
+                    original = None
+                if original:
+                    repeats[index] = original
+                else:
+                    lookup.setdefault(key, []).append(index)
+        with self._lock:
+            self.cache_hits += len(repeats)
+        return repeats, lookup
+
+    def resolve_lookup(self, lookup: Dict[DedupeKey, List[int]], rows: List[Dict[str, Any]],
+                       repeats: Dict[int, Dict[str, Any]]):
+        """DB 조회 결과를 repeats와 캐시에 반영 (키별 최초 저장 행 = 가장 작은 alert_id)"""
+        found = {}
+        for row in rows:
+            found.setdefault((row["fingerprint"], row["starts_at"], row["state"]), {
+                "alert_id": row["alert_id"],
+                "incident_id": row["incident_id"],
+            })
+        db_hits = misses = 0
+        for key, indexes in lookup.items():
+            original = found.get(key)
+            if original is None:
+                misses += len(indexes)
+                continue
+            self.put(key, original)
+            db_hits += len(indexes)
+            for index in indexes:
+                repeats[index] = original
+        with self._lock:
+            self.db_hits += db_hits
+            self.misses += misses
+
+    def remember(self, items: list, alert_ids: List[int], incident_id: str):
+        """새로 저장한 alert를 캐시에 등록 (commit 후 호출)"""
+        for (_, _, alert_info), alert_id in zip(items, alert_ids):
+            key = dedupe_key(alert_info)
+            if key is not None:
+                self.put(key, {"alert_id": alert_id, "incident_id": incident_id})
+
+    def stats(self) -> Dict[str, Any]:
+        """dedupe hit-rate 통계"""
+        with self._lock:
+            size = len(self._entries)
+            cache_hits, db_hits, misses = self.cache_hits, self.db_hits, self.misses
+        checked = cache_hits + db_hits + misses
+        return {
+            "enabled": ALERT_DEDUPE_ENABLED,
+            "size": size,
+            "max_size": self.max_size,
+            "cache_hits": cache_hits,
+            "db_hits": db_hits,
+            "misses": misses,
+            "hit_ratio": round((cache_hits + db_hits) / checked, 4) if checked else 0,
+            "cache_hit_ratio": round(cache_hits / checked, 4) if checked else 0,
+        }
+
+
+def build_repeat_lookup_query(keys: List[DedupeKey]) -> Tuple[str, list]:
+    """
+    dedupe 키별 최초 저장 행 조회 SQL (동기/비동기 경로 공용)
+    resolve된 incident의 행은 제외 → 반복으로 보지 않고 find_or_create_incident로 처리
+    """
+    placeholders = ", ".join(["(%s, %s, %s)"] * len(keys))
+    sql = f"""
+        SELECT a.alert_id, a.incident_id, a.fingerprint, a.starts_at, a.state
+        FROM grafana_alerts a
+        JOIN incidents i ON i.incident_id = a.incident_id
+                        AND i.status IN ('active', 'acknowledged')
+        WHERE (a.fingerprint, a.starts_at, a.state) IN ({placeholders})
+        ORDER BY a.alert_id
+    """
+    params = [value for key in keys for value in key]
+    return sql, params
+
+
+def build_repeat_update_queries(repeats: Dict[int, Dict[str, Any]]) -> List[Tuple[str, list]]:
+    """
+    최초 저장 행의 repeat_count / last_seen_at 갱신 SQL (동기/비동기 경로 공용)
+    같은 행이 payload에 여러 번 있으면 그 수만큼 증가
+    """
+    counts: Dict[int, int] = {}
+    for original in repeats.values():
+        counts[original["alert_id"]] = counts.get(original["alert_id"], 0) + 1
+
+    by_count: Dict[int, List[int]] = {}
+    for alert_id, count in counts.items():
+        by_count.setdefault(count, []).append(alert_id)
+
+    now = datetime.now()
+    queries = []
+    for count, alert_ids in by_count.items():
+        placeholders = ", ".join(["%s"] * len(alert_ids))
+        sql = f"""
+            UPDATE grafana_alerts
+            SET repeat_count = repeat_count + %s,
+                last_seen_at = %s
+            WHERE alert_id IN ({placeholders})
+        """
+        queries.append((sql, [count, now] + alert_ids))
+    return queries
+
+
+def repeat_result(incident_key: str, original: Dict[str, Any]) -> Dict[str, Any]:
+    """반복 알림의 처리 결과 (process_grafana_payload 결과 형식)"""
+    return {
+        "alert_id": original["alert_id"],
+        "incident_id": original["incident_id"],
+        "incident_key": incident_key,
+        "is_new_incident": False,
+        "alert_count": None,
+        "repeat": True,
+    }
+
+
+# 프로세스 공용 캐시
+repeat_cache = AlertDedupeCache()
@@ -1,14 +1,17 @@
 """
 Grafana Alert → DB → Slack 기반 Incident 관리 프로토타입
 """
+import asyncio
 import hashlib
+import hmac
+import importlib
 import json
 import os
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 import httpx
-import pymysql
 from fastapi import FastAPI, Request, HTTPException, Header
 from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
@@ -18,25 +21,50 @@ load_dotenv()
 
 app = FastAPI(title="Grafana Alert Receiver", version="1.0.0")
 
-# 환경 변수
-DB_HOST = os.getenv("DB_HOST", "mysql")
-DB_PORT = int(os.getenv("DB_PORT", "3306"))
-DB_USER = os.getenv("DB_USER", "observer")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "observer123")
-DB_NAME = os.getenv("DB_NAME", "observer")
+# 환경 변수 (DB 접속 정보는 db_pool 모듈에서 읽음)
 SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL", "")
 SLACK_SIGNING_SECRET = os.getenv("SLACK_SIGNING_SECRET", "")
 SLACK_APP_TOKEN = os.getenv("SLACK_APP_TOKEN", "")  # Socket Mode용
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN", "")  # Socket Mode에서 메시지 전송용 (선택사항)
 SLACK_CHANNEL = os.getenv("SLACK_CHANNEL", "C0A4LAEF6P8")  # 기본 Slack 채널
+INGEST_MODE = os.getenv("INGEST_MODE", "sync")  # sync: 요청 안에서 처리, queue: Ingest Queue, spool: 디스크 spool 후 replay
+DB_ASYNC = os.getenv("DB_ASYNC", "true").lower() in ("1", "true", "yes")  # FastAPI 엔드포인트에서 aiomysql 사용
+ALERT_COUNT_RECONCILE_INTERVAL_SECONDS = int(os.getenv("ALERT_COUNT_RECONCILE_INTERVAL_SECONDS", "3600"))  # 0이면 비활성화
+INGEST_RETRY_AFTER_SECONDS = int(os.getenv("INGEST_RETRY_AFTER_SECONDS", "5"))  # 큐 가득 참 시 Retry-After
+MUTE_API_TOKEN = os.getenv("MUTE_API_TOKEN", "")  # POST /incidents/mute 인증 토큰 (없으면 엔드포인트 비활성화)
+MUTE_API_MAX_INCIDENTS = int(os.getenv("MUTE_API_MAX_INCIDENTS", "100"))  # 요청당 최대 Incident 수
+MUTE_API_MAX_DURATION_MINUTES = int(os.getenv("MUTE_API_MAX_DURATION_MINUTES", "1440"))  # 최대 음소거 시간 (Slack 버튼 최대값과 같음)
 
 # Slack 관련 모듈 import (환경 변수 설정 후)
 import slack_sender
 import slack_interactions
-from slack_sender import create_incident_card, send_incident_card, send_thread_reply
+from slack_sender import create_incident_card, send_incident_card, send_response_url
 from slack_interactions import verify_slack_signature, parse_interaction_payload, extract_button_action
-from incident_service import acknowledge_incident, resolve_incident, get_incident_info
-from grafana_silence import mute_incident_via_grafana
+from incident_service import get_incident_info, get_mute_targets, generate_incident_id, build_alert_insert_batches, build_alert_id_query, reconcile_alert_counts
+from grafana_silence import build_matchers, silence_manager
+from incident_actions import action_dispatcher, handle_block_actions, handle_view_submission, interaction_key, is_resolve_click
+from ingest_queue import IngestQueue
+from ingest_spool import IngestSpool
+import db_pool
+from db_pool import get_db_connection
+import async_db
+from incident_index import open_incidents
+from card_index import card_index
+from key_locks import key_locks
+import slack_outbox
+import slack_scheduler
+import http_clients
+from ai_worker import ai_pool
+from ai_cache import ai_cache
+from card_refresher import card_refresher
+from interaction_executor import interaction_executor, LatencyStats
+import similar_incidents
+from similar_incidents import similar_index
+from slack_outbox import SLACK_OUTBOX_ENABLED, SlackOutboxDispatcher
+from alert_dedupe import (
+    ALERT_DEDUPE_ENABLED, repeat_cache, repeat_result,
+    build_repeat_lookup_query, build_repeat_update_queries
+)
 
 # 모듈 변수 설정
 slack_sender.SLACK_WEBHOOK_URL = SLACK_WEBHOOK_URL
@@ -44,19 +72,6 @@ slack_sender.SLACK_BOT_TOKEN = SLACK_BOT_TOKEN
 slack_interactions.SLACK_SIGNING_SECRET = SLACK_SIGNING_SECRET
 
 
-def get_db_connection():
-    """MySQL 연결 생성"""
-    return pymysql.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
-    )
-
-
 def calculate_incident_key(labels: Dict[str, Any]) -> str:
     """
     Incident Key 계산 (사건 유형 키)
@@ -76,17 +91,6 @@ def calculate_incident_key(labels: Dict[str, Any]) -> str:
     return incident_key
 
 
-def generate_incident_id() -> str:
-    """
-    Incident ID 생성 (에피소드 ID, 매번 새로 생성)
-    형식: INC-YYYYMMDDHHMMSS-{random_hex}
-    이번에 대응한 사건(episode)의 고유 ID
-    """
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    random_suffix = hashlib.sha256(f"{timestamp}{os.urandom(16)}".encode()).hexdigest()[:8]
-    return f"INC-{timestamp}-{random_suffix}"
-
-
 def extract_alert_info(alert: Dict[str, Any]) -> Dict[str, Any]:
     """Grafana alert에서 정보 추출"""
     labels = alert.get("labels", {})
@@ -105,52 +109,117 @@ def extract_alert_info(alert: Dict[str, Any]) -> Dict[str, Any]:
         "message": annotations.get("description", annotations.get("summary", "")),
         "labels": labels,
         "annotations": annotations,
+        "fingerprint": alert.get("fingerprint"),  # 반복 알림 dedupe 키 (fingerprint + startsAt + status)
+        "starts_at": alert.get("startsAt"),
     }
 
 
-def save_alert_to_db(conn, alert_info: Dict[str, Any], raw_payload: Dict[str, Any], incident_id: str, incident_key: str) -> int:
+def save_alerts_to_db(conn, alerts: List[Tuple[Dict[str, Any], Dict[str, Any]]], incident_id: str, incident_key: str) -> List[int]:
     """
-    알람을 grafana_alerts 테이블에 저장 (incident_id, incident_key 포함)
+    같은 Incident의 알람들을 grafana_alerts 테이블에 multi-row INSERT로 저장
     주의: commit은 호출자에서 처리 (트랜잭션 범위 확대)
+    주의: incidents.alert_count는 find_or_create_incident(alert_delta=N)에서 증가
+    
+    Args:
+        alerts: [(alert_info, raw_payload), ...]
+    
+    Returns: 저장된 alert_id 리스트 (alerts 순서)
     """
+    alert_ids = []
     with conn.cursor() as cursor:
-        sql = """
-        INSERT INTO grafana_alerts 
-        (incident_id, incident_key, received_at, state, rule_uid, alertname, message, labels, annotations, raw_payload)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        cursor.execute(sql, (
-            incident_id,
-            incident_key,
-            datetime.now(),
-            alert_info["state"],
-            alert_info["rule_uid"],
-            alert_info["alertname"],
-            alert_info["message"],
-            json.dumps(alert_info["labels"]),
-            json.dumps(alert_info["annotations"]),
-            json.dumps(raw_payload)
-        ))
-        # commit 제거: 호출자에서 처리
-        return cursor.lastrowid
-
-
-def find_or_create_incident(conn, incident_key: str, alert_info: Dict[str, Any]) -> tuple[str, bool]:
+        for sql, params, rows in build_alert_insert_batches(alerts, incident_id, incident_key):
+            cursor.execute(sql, params)
+            # multi-row INSERT의 lastrowid는 첫 번째 행의 id → 나머지는 다시 조회 (1행이면 생략)
+            first_id = cursor.lastrowid
+            if rows == 1:
+                alert_ids.append(first_id)
+                continue
+            cursor.execute(*build_alert_id_query(incident_id, first_id, rows))
+            alert_ids.extend(row["alert_id"] for row in cursor.fetchall())
+    return alert_ids
+
+
+def save_alert_to_db(conn, alert_info: Dict[str, Any], raw_payload: Dict[str, Any], incident_id: str, incident_key: str) -> int:
+    """
+    알람 1건을 grafana_alerts 테이블에 저장 (incident_id, incident_key 포함)
+    주의: commit은 호출자에서 처리 (트랜잭션 범위 확대)
+    """
+    return save_alerts_to_db(conn, [(alert_info, raw_payload)], incident_id, incident_key)[0]
+
+
+def group_alerts_by_incident_key(alerts: List[Dict[str, Any]]) -> Dict[str, list]:
+    """
+    payload의 alert를 incident_key별로 묶음 (payload 내 순서 유지)
+    
+    Returns: {incident_key: [(payload 내 index, alert, alert_info), ...]}
+    """
+    groups: Dict[str, list] = {}
+    for index, alert in enumerate(alerts):
+        alert_info = extract_alert_info(alert)
+        incident_key = calculate_incident_key(alert_info["labels"])
+        groups.setdefault(incident_key, []).append((index, alert, alert_info))
+    return groups
+
+
+def representative_alert_info(items: list) -> Dict[str, Any]:
+    """
+    그룹의 대표 alert_info
+    첫 alert의 정보 + 마지막 alert의 severity (alert를 순서대로 처리했을 때의 최종 상태와 동일)
+    """
+    alert_info = dict(items[0][2])
+    alert_info["severity"] = items[-1][2]["severity"]
+    return alert_info
+
+
+def find_or_create_incident(conn, incident_key: str, alert_info: Dict[str, Any],
+                            alert_delta: int = 1) -> Dict[str, Any]:
     """
     Open Incident 찾기 또는 새로 생성
+    - open incident 인덱스에 있으면 조건부 UPDATE만 수행 (SELECT 생략)
+      UPDATE가 0행이면(이미 resolve됨 등) 인덱스 항목을 제거하고 아래 경로로 진행
     - open incident 조회 (status IN ('active','acknowledged'))
     - SELECT FOR UPDATE로 Row Lock하여 동시성 문제 해결
     - 있으면 기존 사용 (업데이트: last_seen_at, severity)
     - 없으면 새로 생성
-    - 주의: commit은 호출자에서 처리 (트랜잭션 범위 확대)
+    - 주의: commit은 호출자에서 처리 (트랜잭션 범위 확대), open incident 인덱스 등록도 commit 후 호출자에서
+    
+    Args:
+        alert_delta: 이번에 저장할 alert 수 (incidents.alert_count에 더함)
     
-    Returns: (incident_id, is_new_incident)
+    Returns: Incident snapshot
+        {incident_id, incident_key, is_new_incident, status, start_time,
+         slack_message_ts, alert_count(저장 후 개수)}
+        이후 단계는 이 snapshot을 재사용하여 같은 행을 다시 조회하지 않음
     """
     with conn.cursor() as cursor:
+        # 인덱스 hit: UPDATE가 Row Lock을 잡고 open 상태를 검증
+        # 갱신된 alert_count는 LAST_INSERT_ID(expr)로 받아 재조회하지 않음
+        cached = open_incidents.get(incident_key)
+        if cached:
+            cursor.execute("""
+                UPDATE incidents 
+                SET last_seen_at = %s,
+                    severity = %s,
+                    status = 'active',
+                    alert_count = LAST_INSERT_ID(alert_count + %s),
+                    updated_at = %s
+                WHERE incident_id = %s
+                  AND status IN ('active', 'acknowledged')
+            """, (
+                datetime.now(),
+                alert_info["severity"],
+                alert_delta,
+                datetime.now(),
+                cached["incident_id"]
+            ))
+            if cursor.rowcount == 1:
+                return open_incidents.hit_snapshot(incident_key, cached, cursor.lastrowid)
+            open_incidents.invalidate(incident_key, cached["incident_id"])
+        
         # Open incident 조회 (SELECT FOR UPDATE로 Row Lock)
         # 동시성 문제 해결: 같은 incident_key로 동시 요청 시 하나만 처리
         cursor.execute("""
-            SELECT incident_id, alert_count 
+            SELECT incident_id, start_time, slack_message_ts, alert_count 
             FROM incidents 
             WHERE incident_key = %s 
               AND status IN ('active', 'acknowledged')
@@ -164,22 +233,32 @@ def find_or_create_incident(conn, incident_key: str, alert_info: Dict[str, Any])
             # 기존 open incident 사용
             incident_id = existing["incident_id"]
             # 업데이트: last_seen_at 갱신, severity 업데이트, status를 active로 변경
-            # alert_count는 트리거가 자동으로 업데이트하므로 수동 증가 제거
+            # alert_count는 이번에 저장할 alert 수만큼 증가 (O(1), COUNT(*) 재계산 없음)
             cursor.execute("""
                 UPDATE incidents 
                 SET last_seen_at = %s,
                     severity = %s,
                     status = 'active',
+                    alert_count = alert_count + %s,
                     updated_at = %s
                 WHERE incident_id = %s
             """, (
                 datetime.now(),
                 alert_info["severity"],
+                alert_delta,
                 datetime.now(),
                 incident_id
             ))
             # commit 제거: 호출자에서 처리
-            return (incident_id, False)  # 기존 incident
+            incident = {
+                "incident_id": incident_id,
+                "incident_key": incident_key,
+                "is_new_incident": False,
+                "status": "active",
+                "start_time": existing["start_time"],
+                "slack_message_ts": existing["slack_message_ts"],
+                "alert_count": existing["alert_count"] + alert_delta,
+            }
         else:
             # 신규 생성
             # 트리거가 중복 체크를 하지만, 애플리케이션 레벨에서도 한번 더 확인
@@ -203,10 +282,21 @@ def find_or_create_incident(conn, incident_key: str, alert_info: Dict[str, Any])
                 now,  # start_time
                 now,  # first_seen_at
                 now,  # last_seen_at
-                0  # 초기값 0, 트리거가 자동으로 업데이트
+                alert_delta  # 이번에 저장할 alert 수
             ))
             # commit 제거: 호출자에서 처리
-            return (incident_id, True)  # 신규 incident
+            incident = {
+                "incident_id": incident_id,
+                "incident_key": incident_key,
+                "is_new_incident": True,
+                "status": "active",
+                "start_time": now,
+                "slack_message_ts": None,
+                "alert_count": alert_delta,
+            }
+    
+    # 인덱스 등록은 commit 후 호출자에서 처리 (rollback된 Incident가 인덱스에 남지 않음)
+    return incident
 
 
 # check_silence 함수 제거 (이번 단순화 범위에서 제외)
@@ -268,22 +358,290 @@ def send_to_slack(alert_info: Dict[str, Any], incident_id: str, incident_key: st
         )
         
         # Slack 전송
-        ts = send_incident_card(blocks)
+        ts = send_incident_card(blocks, severity=alert_info["severity"])
         print(f"📤 신규 Incident 메시지 전송: ts={ts}")
+        if ts:
+            card_refresher.remember(incident_id, blocks)
     
     # AI 분석은 버튼 클릭 시에만 실행 (자동 실행 제거)
     
     return ts
 
 
+def process_grafana_payload(payload: Dict[str, Any]) -> list:
+    """
+    Grafana webhook payload 처리 (DB 저장 + Slack 전송)
+    extract_alert_info → find_or_create_incident → save_alerts_to_db 파이프라인
+    - alert를 incident_key별로 묶어 Incident당 한 번만 조회/생성
+    - 같은 Incident의 alert는 multi-row INSERT 한 번으로 저장
+      (DB 왕복: alert 수에 비례 → distinct incident_key 수에 비례)
+    - 전체 alert를 하나의 트랜잭션으로 처리
+    - Grafana 반복 알림은 최초 저장 행의 repeat_count만 갱신 (행 추가, incident 갱신, Slack 전송 없음)
+    - 신규 Incident 카드는 slack_outbox에 기록하고 commit 후 dispatcher가 전송 (SLACK_OUTBOX_ENABLED=true)
+    - payload의 incident_key별 stripe 락을 commit까지 보유 (같은 key의 동시 요청은 DB 락 전에 메모리에서 대기)
+    - 기존 Incident 카드의 Alerts / 최근 발생 시각은 commit 후 card_refresher가 debounce하여 chat.update
+
+    Returns: alert별 처리 결과 리스트 (payload 순서)
+    """
+    groups = group_alerts_by_incident_key(payload.get("alerts", []))
+    results: List[Optional[Dict[str, Any]]] = [None] * sum(len(items) for items in groups.values())
+    # 같은 incident_key는 메모리에서 직렬화 (DB 연결을 빌리기 전에 대기)
+    with key_locks.hold(groups):
+        conn = get_db_connection()
+    
+        try:
+            # 트랜잭션 시작 (autocommit=False로 시작)
+            conn.autocommit(False)
+            
+            # 0. 반복 알림(fingerprint + startsAt + status) 분류: 최초 저장 행의 repeat_count만 갱신
+            repeats = find_repeat_alerts(conn, groups)
+            stored = []
+            refresh_cards = []  # 카드 갱신 대상 기존 Incident
+            outbox_queued = False
+        
+            for incident_key, items in groups.items():
+                items = split_repeat_results(results, incident_key, items, repeats)
+                if not items:
+                    continue
+                print(f"🔑 Incident Key: {incident_key} (alert {len(items)}개)")
+                alert_info = representative_alert_info(items)
+            
+                # 1. Open Incident 찾기 또는 새로 생성 (incident_key당 1회)
+                # SELECT FOR UPDATE로 Row Lock하여 동시성 문제 해결
+                # 반환된 snapshot(start_time, slack_message_ts, alert_count)을 이후 단계에서 재사용
+                incident = find_or_create_incident(conn, incident_key, alert_info, alert_delta=len(items))
+                incident_id = incident["incident_id"]
+                is_new_incident = incident["is_new_incident"]
+                print(f"{'🆕 신규' if is_new_incident else '🔄 기존'} Incident: {incident_id} (key: {incident_key})")
+            
+                # 2. grafana_alerts에 원본 저장 (multi-row INSERT)
+                # alert_count는 1단계에서 이미 alert 수만큼 증가됨
+                alert_ids = save_alerts_to_db(
+                    conn, [(info, alert) for _, alert, info in items], incident_id, incident_key
+                )
+                print(f"✅ Alert {len(alert_ids)}개 저장됨 → incident_id={incident_id}")
+            
+                # 3. Slack 전송 (Incident당 1회)
+                if SLACK_OUTBOX_ENABLED:
+                    # outbox에 기록만 하고 commit 후 dispatcher가 전송 (트랜잭션이 Slack 응답을 기다리지 않음)
+                    if is_new_incident and slack_outbox.slack_configured():
+                        outbox_queued = slack_outbox.enqueue_incident_card(conn, incident, alert_info) or outbox_queued
+                else:
+                    slack_ts = send_to_slack(
+                        alert_info, 
+                        incident_id, 
+                        incident_key,
+                        incident["alert_count"], 
+                        is_new_incident,
+                        incident["start_time"],
+                        incident_info=incident,  # snapshot 전달 (재조회 없음)
+                        existing_slack_ts=incident["slack_message_ts"]  # 기존 메시지의 ts
+                    )
+                    print(f"📤 Slack 전송: ts={slack_ts}")
+            
+                    # 신규 Incident인 경우 slack_message_ts 저장
+                    if is_new_incident and slack_ts:
+                        with conn.cursor() as cursor:
+                            cursor.execute(
+                                "UPDATE incidents SET slack_message_ts = %s, slack_channel = %s WHERE incident_id = %s",
+                                (slack_ts, SLACK_CHANNEL, incident_id)
+                            )
+                        print(f"💾 Slack message_ts 저장: incident_id={incident_id}, ts={slack_ts}")
+                        incident["slack_message_ts"] = slack_ts  # commit 후 인덱스 / 카드 인덱스에 반영
+            
+                fill_group_results(results, items, alert_ids, incident)
+                stored.append((items, alert_ids, incident))
+                if not is_new_incident:
+                    refresh_cards.append(incident)
+        
+            # 전체 트랜잭션 커밋 (모든 alert 처리 완료 후)
+            conn.commit()
+            print(f"✅ 트랜잭션 커밋 완료: {len(results)}개 alert 처리 (반복 알림 {len(repeats)}개)")
+            remember_committed(stored)
+            if outbox_queued:
+                slack_outbox.notify()
+            for incident in refresh_cards:
+                card_refresher.request(incident["incident_id"], incident["slack_message_ts"])
+    
+        except Exception as e:
+            # 에러 발생 시 롤백
+            conn.rollback()
+            print(f"❌ 트랜잭션 롤백: {e}")
+            raise
+        finally:
+            conn.close()
+    
+    return results
+
+
+def find_repeat_alerts(conn, groups: Dict[str, list]) -> Dict[int, Dict[str, Any]]:
+    """
+    반복 알림 분류 (캐시 → DB 순서로 조회) 후 최초 저장 행의 repeat_count / last_seen_at 갱신
+    주의: commit은 호출자에서 처리
+    
+    Returns: {payload index: 최초 저장 행 {alert_id, incident_id}}
+    """
+    if not ALERT_DEDUPE_ENABLED:
+        return {}
+    repeats, lookup = repeat_cache.partition(groups)
+    with conn.cursor() as cursor:
+        if lookup:
+            sql, params = build_repeat_lookup_query(list(lookup))
+            cursor.execute(sql, params)
+            repeat_cache.resolve_lookup(lookup, cursor.fetchall(), repeats)
+        for sql, params in build_repeat_update_queries(repeats):
+            cursor.execute(sql, params)
+    return repeats
+
+
+def split_repeat_results(results: list, incident_key: str, items: list, repeats: Dict[int, Dict[str, Any]]) -> list:
+    """
+    그룹에서 반복 알림의 결과를 results에 채우고, 새로 저장할 alert만 반환
+    반복 알림만 있는 그룹은 incident 갱신과 Slack 전송을 하지 않음
+    """
+    fresh = []
+    for item in items:
+        original = repeats.get(item[0])
+        if original:
+            results[item[0]] = repeat_result(incident_key, original)
+        else:
+            fresh.append(item)
+    if len(fresh) < len(items):
+        print(f"🔁 반복 알림 {len(items) - len(fresh)}개 (key: {incident_key}) - repeat_count만 갱신")
+    return fresh
+
+
+def fill_group_results(results: list, items: list, alert_ids: List[int], incident: Dict[str, Any]):
+    """
+    그룹 처리 결과를 payload 순서의 results에 채움
+    alert_count는 alert를 하나씩 저장했을 때의 값(저장 직후 개수)으로 환산
+    is_new_incident는 Incident를 생성한 첫 alert만 True
+    """
+    for position, ((index, _, _), alert_id) in enumerate(zip(items, alert_ids)):
+        results[index] = {
+            "alert_id": alert_id,
+            "incident_id": incident["incident_id"],
+            "incident_key": incident["incident_key"],
+            "is_new_incident": incident["is_new_incident"] and position == 0,
+            "alert_count": incident["alert_count"] - (len(items) - 1 - position)
+        }
+
+
+
+def remember_committed(stored: list):
+    """
+    commit이 성공한 그룹을 인메모리 인덱스에 반영 (open incident / 카드 / 반복 알림)
+    rollback된 트랜잭션의 Incident / 상태가 인덱스에 남지 않도록 commit 후에만 호출
+
+    Args:
+        stored: [(items, alert_ids, incident snapshot), ...]
+    """
+    for items, alert_ids, incident in stored:
+        open_incidents.put(incident["incident_key"], incident)
+        if incident["is_new_incident"] and incident["slack_message_ts"]:
+            card_index.remember(SLACK_CHANNEL, incident["slack_message_ts"],
+                                incident["incident_id"], incident["incident_key"])
+        repeat_cache.remember(items, alert_ids, incident["incident_id"])
+
+async def process_grafana_payload_async(payload: Dict[str, Any]) -> list:
+    """
+    process_grafana_payload의 비동기 버전 (aiomysql)
+    DB I/O 대기 중에도 이벤트 루프가 다른 요청을 처리할 수 있음
+    Slack 전송(동기 HTTP)은 스레드에서 실행
+    incident_key별 stripe 락은 asyncio.Lock으로 보유 (이벤트 루프 블로킹 없음)
+
+    Returns: alert별 처리 결과 리스트 (payload 순서)
+    """
+    groups = group_alerts_by_incident_key(payload.get("alerts", []))
+    results: List[Optional[Dict[str, Any]]] = [None] * sum(len(items) for items in groups.values())
+    
+    async with key_locks.hold_async(groups):
+        async with async_db.acquire() as conn:
+            try:
+                repeats = await async_db.find_repeat_alerts(conn, groups) if ALERT_DEDUPE_ENABLED else {}
+                stored = []
+                refresh_cards = []
+                outbox_queued = False
+                
+                for incident_key, items in groups.items():
+                    items = split_repeat_results(results, incident_key, items, repeats)
+                    if not items:
+                        continue
+                    print(f"🔑 Incident Key: {incident_key} (alert {len(items)}개)")
+                    alert_info = representative_alert_info(items)
+                
+                    incident = await async_db.find_or_create_incident(conn, incident_key, alert_info, alert_delta=len(items))
+                    incident_id = incident["incident_id"]
+                    is_new_incident = incident["is_new_incident"]
+                    print(f"{'🆕 신규' if is_new_incident else '🔄 기존'} Incident: {incident_id} (key: {incident_key})")
+                
+                    alert_ids = await async_db.save_alerts_to_db(
+                        conn, [(info, alert) for _, alert, info in items], incident_id, incident_key
+                    )
+                    print(f"✅ Alert {len(alert_ids)}개 저장됨 → incident_id={incident_id}")
+                
+                    if SLACK_OUTBOX_ENABLED:
+                        if is_new_incident and slack_outbox.slack_configured():
+                            outbox_queued = await async_db.enqueue_incident_card(conn, incident, alert_info) or outbox_queued
+                    else:
+                        slack_ts = await asyncio.to_thread(
+                            send_to_slack,
+                            alert_info,
+                            incident_id,
+                            incident_key,
+                            incident["alert_count"],
+                            is_new_incident,
+                            incident["start_time"],
+                            incident_info=incident,
+                            existing_slack_ts=incident["slack_message_ts"]
+                        )
+                        print(f"📤 Slack 전송: ts={slack_ts}")
+                
+                        if is_new_incident and slack_ts:
+                            async with conn.cursor() as cursor:
+                                await cursor.execute(
+                                    "UPDATE incidents SET slack_message_ts = %s, slack_channel = %s WHERE incident_id = %s",
+                                    (slack_ts, SLACK_CHANNEL, incident_id)
+                                )
+                            print(f"💾 Slack message_ts 저장: incident_id={incident_id}, ts={slack_ts}")
+                            incident["slack_message_ts"] = slack_ts
+                
+                    fill_group_results(results, items, alert_ids, incident)
+                    stored.append((items, alert_ids, incident))
+                    if not is_new_incident:
+                        refresh_cards.append(incident)
+            
+                await conn.commit()
+                print(f"✅ 트랜잭션 커밋 완료: {len(results)}개 alert 처리 (반복 알림 {len(repeats)}개)")
+                remember_committed(stored)
+                if outbox_queued:
+                    slack_outbox.notify()
+                for incident in refresh_cards:
+                    card_refresher.request(incident["incident_id"], incident["slack_message_ts"])
+        
+            except Exception as e:
+                await conn.rollback()
+                print(f"❌ 트랜잭션 롤백: {e}")
+                raise
+    
+    return results
+
+
 @app.post("/webhook/grafana")
 async def grafana_webhook(request: Request):
     """
     Grafana Webhook 수신 엔드포인트
     Grafana Alert Rule에서 이 엔드포인트를 호출하도록 설정
+    
+    INGEST_MODE=queue: payload 검증 후 Ingest Queue에 넣고 즉시 202 응답
+                       (큐가 가득 차면 503 + Retry-After)
+    INGEST_MODE=spool: payload 검증 후 로컬 디스크 spool에 기록(fsync)하고 202 응답
+                       (DB 처리는 replayer가 수행, DB 장애 시에도 유실 없음)
+    INGEST_MODE=sync:  요청 안에서 전체 처리 후 응답 (DB_ASYNC=true면 aiomysql 경로 사용)
     """
     try:
-        payload = await request.json()
+        body = await request.body()
+        payload = json.loads(body)
         # 전체 페이로드를 여러 줄로 출력하여 잘림 방지
         payload_str = json.dumps(payload, indent=2, ensure_ascii=False)
         print(f"📥 Grafana webhook 수신 (전체 길이: {len(payload_str)} 문자)")
@@ -297,105 +655,44 @@ async def grafana_webhook(request: Request):
         print("=" * 80)
         
         # Grafana webhook 형식 처리
-        alerts = payload.get("alerts", [])
+        alerts = payload.get("alerts", []) if isinstance(payload, dict) else []
         if not alerts:
             return JSONResponse(
                 status_code=400,
                 content={"error": "No alerts in payload"}
             )
         
-        conn = get_db_connection()
-        results = []
+        if ingest_spool is not None:
+            try:
+                await ingest_spool.append(body)
+            except Exception as e:
+                print(f"❌ Spool 기록 실패: {e}")
+                return JSONResponse(
+                    status_code=503,
+                    headers={"Retry-After": str(INGEST_RETRY_AFTER_SECONDS)},
+                    content={"error": "Ingest spool is unavailable"}
+                )
+            return JSONResponse(status_code=202, content={
+                "status": "accepted",
+                "spooled": len(alerts)
+            })
         
-        try:
-            # 트랜잭션 시작 (autocommit=False로 시작)
-            conn.autocommit(False)
-            
-            for alert in alerts:
-                # 1. Alert 정보 추출
-                alert_info = extract_alert_info(alert)
-                
-                # 2. Incident Key 계산 (사건 유형 키)
-                # rule_uid | cluster | namespace | phase (service, pod, node 제외)
-                incident_key = calculate_incident_key(alert_info["labels"])
-                print(f"🔑 Incident Key 계산: {incident_key}")
-                
-                # 3. Open Incident 찾기 또는 새로 생성
-                # SELECT FOR UPDATE로 Row Lock하여 동시성 문제 해결
-                incident_id, is_new_incident = find_or_create_incident(conn, incident_key, alert_info)
-                print(f"{'🆕 신규' if is_new_incident else '🔄 기존'} Incident: {incident_id} (key: {incident_key})")
-                
-                # 4. grafana_alerts에 원본 저장 (incident_id, incident_key 포함)
-                # 트리거가 alert_count를 자동으로 업데이트
-                alert_id = save_alert_to_db(conn, alert_info, alert, incident_id, incident_key)
-                print(f"✅ Alert 저장됨: alert_id={alert_id} → incident_id={incident_id}")
-                
-                # 5. Incident 정보 조회 (alert_count 등)
-                # 트리거가 업데이트한 alert_count 조회
-                with conn.cursor() as cursor:
-                    cursor.execute(
-                        "SELECT alert_count FROM incidents WHERE incident_id = %s",
-                        (incident_id,)
-                    )
-                    incident = cursor.fetchone()
-                    alert_count = incident["alert_count"] if incident else 1
-                
-                # 6. Slack 전송
-                # Incident 정보 조회 (start_time 등)
-                incident_info = get_incident_info(conn, incident_id)
-                start_time = incident_info["start_time"] if incident_info else datetime.now()
-                
-                # 기존 Incident의 경우 기존 메시지의 ts 조회
-                existing_slack_ts = None
-                if not is_new_incident:
-                    with conn.cursor() as cursor:
-                        cursor.execute(
-                            "SELECT slack_message_ts FROM incidents WHERE incident_id = %s",
-                            (incident_id,)
-                        )
-                        result = cursor.fetchone()
-                        existing_slack_ts = result.get("slack_message_ts") if result else None
-                
-                slack_ts = send_to_slack(
-                    alert_info, 
-                    incident_id, 
-                    incident_key,
-                    alert_count, 
-                    is_new_incident,
-                    start_time,
-                    incident_info=incident_info,  # 이미 조회한 정보 전달
-                    existing_slack_ts=existing_slack_ts  # 기존 메시지의 ts
+        if ingest_queue is not None:
+            if not ingest_queue.submit(payload):
+                return JSONResponse(
+                    status_code=503,
+                    headers={"Retry-After": str(INGEST_RETRY_AFTER_SECONDS)},
+                    content={"error": "Ingest queue is full"}
                 )
-                print(f"📤 Slack 전송: ts={slack_ts}")
-                
-                # 신규 Incident인 경우 slack_message_ts 저장
-                if is_new_incident and slack_ts:
-                    with conn.cursor() as cursor:
-                        cursor.execute(
-                            "UPDATE incidents SET slack_message_ts = %s WHERE incident_id = %s",
-                            (slack_ts, incident_id)
-                        )
-                    print(f"💾 Slack message_ts 저장: incident_id={incident_id}, ts={slack_ts}")
-                
-                results.append({
-                    "alert_id": alert_id,
-                    "incident_id": incident_id,
-                    "incident_key": incident_key,
-                    "is_new_incident": is_new_incident,
-                    "alert_count": alert_count
-                })
-            
-            # 전체 트랜잭션 커밋 (모든 alert 처리 완료 후)
-            conn.commit()
-            print(f"✅ 트랜잭션 커밋 완료: {len(results)}개 alert 처리")
+            return JSONResponse(status_code=202, content={
+                "status": "accepted",
+                "queued": len(alerts)
+            })
         
-        except Exception as e:
-            # 에러 발생 시 롤백
-            conn.rollback()
-            print(f"❌ 트랜잭션 롤백: {e}")
-            raise
-        finally:
-            conn.close()
+        if DB_ASYNC and async_db.is_ready():
+            results = await process_grafana_payload_async(payload)
+        else:
+            results = process_grafana_payload(payload)
         
         return JSONResponse(content={
             "status": "success",
@@ -414,13 +711,22 @@ async def grafana_webhook(request: Request):
 async def health_check():
     """Health check 엔드포인트"""
     try:
-        conn = get_db_connection()
-        conn.close()
+        if DB_ASYNC and async_db.is_ready():
+            await async_db.ping()
+        else:
+            conn = get_db_connection()
+            conn.close()
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
 
 
+# HTTP 인터랙션 응답 시간 (요청 수신 → 200 응답, Slack 제한 3초) / 처리 통계
+interaction_response_latency = LatencyStats()
+http_interaction_counts: Dict[str, int] = {}
+http_interactions_dropped = 0
+
+
 @app.post("/slack/interactions")
 async def slack_interactions(
     request: Request,
@@ -428,172 +734,159 @@ async def slack_interactions(
     x_slack_request_timestamp: str = Header(None, alias="X-Slack-Request-Timestamp")
 ):
     """
-    Slack 인터랙션 처리 (버튼 클릭 등)
+    Slack 인터랙션 처리 (버튼 클릭, Resolve 모달 제출)
+    서명 검증 후 interaction_executor에 넘기고 바로 200 응답 (DB / Grafana / Slack API는 응답 후 처리)
+    처리 결과는 카드 스레드 댓글, 카드 위치를 모르면 response_url로 알림
     """
+    global http_interactions_dropped
+    received = time.monotonic()
     try:
         # 요청 본문 읽기
         body_bytes = await request.body()
         body_str = body_bytes.decode('utf-8')
         
-        # 서명 검증
+        # 서명 검증 (SLACK_SIGNING_SECRET이 설정되어 있으면 서명 헤더가 없는 요청도 거부)
         if x_slack_signature and x_slack_request_timestamp:
             if not verify_slack_signature(x_slack_signature, x_slack_request_timestamp, body_str, SLACK_SIGNING_SECRET):
                 print("❌ Slack 서명 검증 실패")
                 return Response(status_code=401, content="Invalid signature")
+        elif SLACK_SIGNING_SECRET:
+            print("❌ Slack 서명 헤더 없음")
+            return Response(status_code=401, content="Missing signature")
         
         # Payload 파싱
         payload = parse_interaction_payload(body_str)
         if not payload:
             return Response(status_code=400, content="Invalid payload")
         
-        # 버튼 액션 추출
-        action_info = extract_button_action(payload)
-        if not action_info:
+        if payload.get("type") == "view_submission":
+            name, handler = "view_submission", lambda: handle_view_submission(payload)
+        elif extract_button_action(payload):
+            name, handler = "block_actions", lambda: handle_block_actions(payload, "HTTP")
+        else:
             return Response(status_code=400, content="No action found")
         
-        action_id = action_info["action_id"]
-        value = action_info["value"]
-        user = action_info["user"]
-        message_ts = action_info.get("message_ts")
-        channel = action_info.get("channel")
-        
-        incident_id = value.get("incident_id")
-        incident_key = value.get("incident_key")
-        action = value.get("action")
-        
-        print(f"🔘 Slack 인터랙션: {action_id} - incident_id={incident_id}, user={user.get('name', 'unknown')}")
+        if is_resolve_click(payload):
+            # Resolve 모달은 바로 열기 (같은 카드의 대기 작업 뒤에서 열면 trigger_id 만료)
+            http_interaction_counts["resolve_modal"] = http_interaction_counts.get("resolve_modal", 0) + 1
+            if not interaction_executor.submit_urgent(handler, "resolve_modal"):
+                http_interactions_dropped += 1
+                print("⚠️  인터랙션 대기 작업이 가득 차서 처리하지 못했습니다: resolve_modal")
+                send_response_url(payload.get("response_url"), "⚠️ *요청이 많아 처리하지 못했습니다*\n잠시 후 다시 시도해주세요.")
+            return Response(status_code=200)
         
-        # DB 연결
-        conn = get_db_connection()
-        success = False
-        reply_text = ""
+        # 같은 Incident 카드의 작업은 순서대로 (Socket Mode와 같은 실행기)
+        key = interaction_key(payload) or payload.get("trigger_id") or ""
+        http_interaction_counts[name] = http_interaction_counts.get(name, 0) + 1
+        if not interaction_executor.submit(key, handler, name):
+            http_interactions_dropped += 1
+            print(f"⚠️  인터랙션 대기 작업이 가득 차서 처리하지 못했습니다: {name}")
+            send_response_url(payload.get("response_url"), "⚠️ *요청이 많아 처리하지 못했습니다*\n잠시 후 다시 시도해주세요.")
         
-        try:
-            conn.autocommit(False)
-            
-            if action == "ack":
-                success = acknowledge_incident(conn, incident_id, user.get("name", user.get("id", "unknown")))
-                if success:
-                    reply_text = f"👀 *Incident ACK 처리됨*\n- by @{user.get('name', 'unknown')}\n- at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                else:
-                    reply_text = f"❌ *Incident ACK 실패*\n- incident_id: {incident_id}\n- by @{user.get('name', 'unknown')}"
-            
-            elif action == "resolve":
-                success = resolve_incident(conn, incident_id, user.get("name", user.get("id", "unknown")))
-                if success:
-                    reply_text = f"✅ *Incident RESOLVED*\n- by @{user.get('name', 'unknown')}\n- at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                else:
-                    reply_text = f"❌ *Incident Resolve 실패*\n- incident_id: {incident_id}\n- by @{user.get('name', 'unknown')}"
-            
-            elif action.startswith("mute_"):
-                # mute_30m, mute_2h, mute_24h
-                # Mute는 DB 작업이 아니므로 트랜잭션 밖에서 처리
-                duration_map = {
-                    "mute_30m": 30,
-                    "mute_2h": 120,
-                    "mute_24h": 1440
-                }
-                duration_minutes = duration_map.get(action, 30)
-                duration_text = {
-                    "mute_30m": "30분",
-                    "mute_2h": "2시간",
-                    "mute_24h": "24시간"
-                }.get(action, "30분")
-                
-                # Incident 정보 조회 (alertname, cluster, namespace 등)
-                incident_info = get_incident_info(conn, incident_id)
-                if not incident_info:
-                    conn.close()
-                    return Response(status_code=404, content="Incident not found")
-                
-                # 최근 알람에서 alertname 추출
-                with conn.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT alertname, labels
-                        FROM grafana_alerts
-                        WHERE incident_id = %s
-                        ORDER BY received_at DESC
-                        LIMIT 1
-                    """, (incident_id,))
-                    alert = cursor.fetchone()
-                
-                conn.close()  # Mute는 DB 작업이 아니므로 연결 종료
-                
-                if not alert:
-                    return Response(status_code=404, content="Alert not found")
-                
-                # Labels에서 정보 추출
-                labels = alert.get("labels") or {}
-                if isinstance(labels, str):
-                    import json
-                    labels = json.loads(labels)
-                
-                alertname = alert.get("alertname") or labels.get("alertname", "")
-                cluster = labels.get("cluster") or incident_info.get("cluster")
-                namespace = labels.get("namespace") or incident_info.get("namespace")
-                phase = labels.get("phase") or incident_info.get("phase")
-                service = labels.get("service") or incident_info.get("service")
-                
-                # Grafana Silence 생성
-                success = mute_incident_via_grafana(
-                    alertname=alertname,
-                    cluster=cluster,
-                    namespace=namespace,
-                    phase=phase,
-                    service=service,
-                    duration_minutes=duration_minutes,
-                    user=user.get("name", user.get("id", "unknown"))
-                )
-                
-                if success:
-                    reply_text = f"🔕 *Grafana Silence 생성됨*\n- duration: {duration_text}\n- by @{user.get('name', 'unknown')}"
-                else:
-                    reply_text = f"❌ *Grafana Silence 생성 실패*\n- duration: {duration_text}\n- by @{user.get('name', 'unknown')}"
-                
-                # Slack 스레드에 댓글 추가
-                if message_ts and reply_text:
-                    send_thread_reply(message_ts, reply_text, channel)
-                
-                return Response(status_code=200, content="OK")
-            
-            else:
-                return Response(status_code=400, content=f"Unknown action: {action}")
-            
-            # DB 작업 (ack, resolve)만 commit
-            if success:
-                conn.commit()
-            else:
-                conn.rollback()
-                # 실패해도 Slack에 에러 메시지 전송
-                if not reply_text:
-                    reply_text = f"❌ *처리 실패*\n- action: {action}\n- incident_id: {incident_id}"
-        
-        except Exception as e:
-            conn.rollback()
-            print(f"❌ 인터랙션 처리 실패: {e}")
-            import traceback
-            traceback.print_exc()
-            return Response(status_code=500, content=str(e))
-        finally:
-            conn.close()
-        
-        # Slack 스레드에 댓글 추가 (ack, resolve)
-        if message_ts and reply_text:
-            send_thread_reply(message_ts, reply_text, channel)
-        
-        return Response(status_code=200, content="OK")
-        
-        # Slack에 즉시 응답 (3초 이내)
-        return JSONResponse(content={
-            "response_type": "ephemeral",
-            "text": "처리되었습니다."
-        })
+        # view_submission은 빈 응답 → 모달 닫기
+        return Response(status_code=200)
     
     except Exception as e:
         print(f"❌ 오류 발생: {e}")
         import traceback
         traceback.print_exc()
         return Response(status_code=500, content=str(e))
+    finally:
+        interaction_response_latency.record((time.monotonic() - received) * 1000)
+
+
+class MuteRequest(BaseModel):
+    """일괄 Mute 요청"""
+    incident_ids: List[str]
+    duration_minutes: int = 30
+    user: str = "api"
+
+
+def _load_mute_targets(incident_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Mute 대상 label 조회 (동기 경로)"""
+    conn = get_db_connection()
+    try:
+        return get_mute_targets(conn, incident_ids)
+    finally:
+        conn.close()
+
+
+def verify_mute_token(authorization: Optional[str]) -> bool:
+    """Authorization: Bearer <MUTE_API_TOKEN> 확인 (토큰이 설정되지 않았으면 항상 거부)"""
+    if not MUTE_API_TOKEN or not authorization:
+        return False
+    scheme, _, token = authorization.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.strip().encode(), MUTE_API_TOKEN.encode())
+
+
+@app.post("/incidents/mute")
+async def mute_incidents(
+    request: MuteRequest,
+    authorization: str = Header(None, alias="Authorization")
+):
+    """
+    여러 Incident를 한 번에 Grafana Silence로 음소거 (Authorization: Bearer <MUTE_API_TOKEN> 필요)
+    matcher가 같은 Incident는 Silence 하나로 처리하고, 같은 matcher의 활성 Silence는 연장
+    """
+    if not verify_mute_token(authorization):
+        print("❌ 일괄 Mute 인증 실패")
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    incident_ids = list(dict.fromkeys(request.incident_ids))
+    if not incident_ids or len(incident_ids) > MUTE_API_MAX_INCIDENTS:
+        raise HTTPException(status_code=400, detail=f"incident_ids는 1~{MUTE_API_MAX_INCIDENTS}개여야 합니다")
+    if not 0 < request.duration_minutes <= MUTE_API_MAX_DURATION_MINUTES:
+        raise HTTPException(status_code=400, detail=f"duration_minutes는 1~{MUTE_API_MAX_DURATION_MINUTES}분이어야 합니다")
+    user = "".join(ch for ch in request.user if ch.isprintable())[:64] or "api"
+
+    targets = await asyncio.to_thread(_load_mute_targets, incident_ids)
+    results = await silence_manager.mute_many(
+        {incident_id: build_matchers(**target) for incident_id, target in targets.items()},
+        request.duration_minutes,
+        comment=f"Muted via API by {user} for {request.duration_minutes} minutes"
+    )
+
+    muted = {
+        incident_id: {"silence_id": result[0], "outcome": result[1]}
+        for incident_id, result in results.items() if result
+    }
+    failed = [incident_id for incident_id, result in results.items() if not result]
+    not_found = [incident_id for incident_id in incident_ids if incident_id not in targets]
+    print(f"🔕 일괄 Mute: {len(muted)}개 성공, {len(failed)}개 실패, {len(not_found)}개 없음 (by {user})")
+    return {"muted": muted, "failed": failed, "not_found": not_found}
+
+
+@app.get("/stats")
+async def stats():
+    """내부 처리 통계 엔드포인트"""
+    return {
+        "ingest_mode": INGEST_MODE,
+        "db_pool": db_pool.get_pool().stats(),
+        "async_db_pool": async_db.stats(),
+        "ingest": ingest_queue.stats() if ingest_queue else None,
+        "spool": ingest_spool.stats() if ingest_spool else None,
+        "alert_count_reconcile": alert_count_reconcile_stats,
+        "open_incident_index": open_incidents.stats(),
+        "card_index": card_index.stats(),
+        "key_locks": key_locks.stats(),
+        "alert_dedupe": repeat_cache.stats(),
+        "slack_outbox": slack_outbox.dispatcher.stats() if slack_outbox.dispatcher else None,
+        "slack_scheduler": slack_scheduler.get_scheduler().stats(),
+        "card_refresher": card_refresher.stats(),
+        "http_clients": http_clients.registry.stats(),
+        "ai_pool": ai_pool.stats(),
+        "ai_cache": ai_cache.stats(),
+        "similar_incidents": similar_index.stats(),
+        "interactions": interaction_executor.stats(),
+        "slack_interactions": {
+            "requests": dict(http_interaction_counts),
+            "dropped": http_interactions_dropped,
+            "response_latency": interaction_response_latency.snapshot(),
+        },
+        "incident_actions": action_dispatcher.stats(),
+        "grafana_silences": silence_manager.stats(),
+        "socket_mode": importlib.import_module("slack_socket").stats() if socket_mode_client else None
+    }
 
 
 @app.get("/")
@@ -605,21 +898,221 @@ async def root():
         "endpoints": {
             "webhook": "/webhook/grafana",
             "slack_interactions": "/slack/interactions",
-            "health": "/health"
+            "mute_incidents": "/incidents/mute",
+            "health": "/health",
+            "stats": "/stats"
         }
     }
 
 
-# Socket Mode 클라이언트 초기화 (선택사항)
+# Ingest Queue (INGEST_MODE=queue일 때만 사용)
+ingest_queue: Optional[IngestQueue] = None
+# Ingest Spool (INGEST_MODE=spool일 때만 사용)
+ingest_spool: Optional[IngestSpool] = None
+
+
+@app.on_event("startup")
+async def warmup_db_pool():
+    """DB 연결 풀 미리 채우기 (실패해도 요청 시 다시 연결 시도)"""
+    try:
+        await asyncio.to_thread(db_pool.get_pool().warmup)
+    except Exception as e:
+        print(f"⚠️  DB 연결 풀 warmup 실패: {e}")
+
+
+def _warm_open_incident_index() -> tuple:
+    """open incident 인덱스 / 카드 메시지 인덱스 warm-up (동기 경로)"""
+    conn = get_db_connection()
+    try:
+        return open_incidents.warm(conn), card_index.warm(conn, SLACK_CHANNEL)
+    finally:
+        conn.close()
+
+
+@app.on_event("startup")
+async def warm_open_incident_index():
+    """DB의 open incident로 인덱스 채우기 (실패해도 요청 시 DB 조회 후 등록됨)"""
+    try:
+        size, cards = await asyncio.to_thread(_warm_open_incident_index)
+        print(f"✅ Open incident 인덱스 warm-up: {size}개 (카드 {cards}개)")
+    except Exception as e:
+        print(f"⚠️  Open incident 인덱스 warm-up 실패: {e}")
+
+
+def _load_similar_incident_index():
+    """유사 사건 인덱스 로드 (백그라운드 스레드)"""
+    try:
+        size = similar_incidents.load_or_rebuild()
+        print(f"✅ 유사 사건 인덱스 로드: {size}건")
+    except Exception as e:
+        print(f"⚠️  유사 사건 인덱스 로드 실패 (AI 분석은 유사 사건 없이 작동): {e}")
+
+
+@app.on_event("startup")
+async def load_similar_incident_index():
+    """
+    유사 사건 인덱스 파일 로드 (없으면 해결된 Incident로 재구성)
+    기다리지 않음 - 재구성이 오래 걸려도 webhook 처리를 막지 않음
+    """
+    if similar_incidents.SIMILAR_INDEX_ENABLED:
+        asyncio.get_running_loop().run_in_executor(None, _load_similar_incident_index)
+
+
+@app.on_event("startup")
+async def start_async_db_pool():
+    """aiomysql 연결 풀 생성 (DB_ASYNC=true)"""
+    if DB_ASYNC:
+        try:
+            await async_db.init_pool()
+        except Exception as e:
+            print(f"⚠️  aiomysql 연결 풀 생성 실패 (동기 경로로 계속 작동): {e}")
+
+
+@app.on_event("startup")
+async def start_ingest():
+    """Ingest Queue worker 또는 Spool replayer 시작"""
+    global ingest_queue, ingest_spool
+    if INGEST_MODE == "queue":
+        ingest_queue = IngestQueue(process_grafana_payload)
+        await ingest_queue.start()
+    elif INGEST_MODE == "spool":
+        ingest_spool = IngestSpool(process_grafana_payload)
+        await ingest_spool.start()
+
+
+@app.on_event("shutdown")
+async def stop_ingest():
+    """
+    남은 payload를 처리(queue)하거나 디스크에 확정(spool)한 뒤 종료
+    drain은 DB 연결 풀을 사용 → 풀 종료(close_db_pool, 마지막 shutdown hook)보다 먼저 등록
+    """
+    if ingest_queue:
+        await ingest_queue.stop()
+    if ingest_spool:
+        await ingest_spool.stop()
+
+
+# Socket Mode 클라이언트 (선택사항, SLACK_APP_TOKEN이 있을 때만 slack_sdk import)
 socket_mode_client = None
-if SLACK_APP_TOKEN:
+
+
+async def _start_socket_mode():
+    """slack_socket import(스레드) 후 이벤트 루프에서 WebSocket 연결"""
+    global socket_mode_client
     try:
-        from slack_socket import start_socket_mode_client
-        socket_mode_client = start_socket_mode_client(SLACK_APP_TOKEN, SLACK_BOT_TOKEN)
+        slack_socket = await asyncio.to_thread(importlib.import_module, "slack_socket")
+        socket_mode_client = await slack_socket.start_socket_mode_client(SLACK_APP_TOKEN, SLACK_BOT_TOKEN)
     except Exception as e:
         print(f"⚠️  Socket Mode 초기화 실패 (HTTP 방식으로 계속 작동): {e}")
 
 
+@app.on_event("startup")
+async def start_socket_mode():
+    """Socket Mode 연결 시작 (기다리지 않음 - 연결 중에도 webhook 처리)"""
+    if SLACK_APP_TOKEN:
+        asyncio.create_task(_start_socket_mode())
+
+
+@app.on_event("shutdown")
+async def stop_socket_mode():
+    """
+    Socket Mode 연결 종료 후 남은 인터랙션 처리 (Socket Mode / HTTP 공통 실행기)
+    (Slack 전송 큐 종료보다 먼저 등록 → 처리 중 보낸 메시지도 전송됨)
+    """
+    if socket_mode_client:
+        from slack_socket import stop_socket_mode_client
+        await stop_socket_mode_client()
+    await asyncio.to_thread(interaction_executor.shutdown)
+
+
+@app.on_event("startup")
+async def start_silence_manager():
+    """활성 Grafana Silence 캐시 로드 / 주기적 갱신 시작"""
+    await silence_manager.start()
+
+
+@app.on_event("shutdown")
+async def stop_silence_manager():
+    """
+    Silence 캐시 갱신 종료
+    (인터랙션 처리 종료 뒤, 외부 연동 HTTP 연결 종료 전에 등록)
+    """
+    await silence_manager.stop()
+
+
+@app.on_event("startup")
+async def start_slack_outbox():
+    """Slack outbox dispatcher 시작 (SLACK_OUTBOX_ENABLED=true)"""
+    if SLACK_OUTBOX_ENABLED:
+        slack_outbox.dispatcher = SlackOutboxDispatcher()
+        await slack_outbox.dispatcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_slack_outbox():
+    """Slack outbox dispatcher 종료 (미전송 행은 다음 시작 시 전송)"""
+    if slack_outbox.dispatcher:
+        await slack_outbox.dispatcher.stop()
+    # 전송 큐에 남은 메시지 전송
+    await asyncio.to_thread(slack_scheduler.get_scheduler().shutdown)
+    # 전송 큐가 비워진 뒤 외부 연동 HTTP 연결 종료
+    await http_clients.registry.aclose()
+
+
+# alert_count reconciliation 통계
+alert_count_reconcile_stats: Dict[str, Any] = {"runs": 0, "repaired": 0, "last_run_at": None, "last_error": None}
+
+
+def run_alert_count_reconcile() -> int:
+    """alert_count drift 보정 1회 실행"""
+    conn = get_db_connection()
+    try:
+        return reconcile_alert_counts(conn)
+    finally:
+        conn.close()
+
+
+async def alert_count_reconcile_loop():
+    """주기적으로 alert_count drift 보정"""
+    while True:
+        await asyncio.sleep(ALERT_COUNT_RECONCILE_INTERVAL_SECONDS)
+        try:
+            repaired = await asyncio.to_thread(run_alert_count_reconcile)
+            alert_count_reconcile_stats["runs"] += 1
+            alert_count_reconcile_stats["repaired"] += repaired
+            alert_count_reconcile_stats["last_run_at"] = datetime.now().isoformat()
+            if repaired:
+                print(f"🔧 alert_count reconciliation 완료: {repaired}개 보정")
+        except Exception as e:
+            alert_count_reconcile_stats["last_error"] = str(e)
+            print(f"❌ alert_count reconciliation 실패: {e}")
+
+
+alert_count_reconcile_task: Optional[asyncio.Task] = None
+
+
+@app.on_event("startup")
+async def start_alert_count_reconcile():
+    """alert_count reconciliation 작업 시작"""
+    global alert_count_reconcile_task
+    if ALERT_COUNT_RECONCILE_INTERVAL_SECONDS > 0:
+        alert_count_reconcile_task = asyncio.create_task(alert_count_reconcile_loop())
+
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    """
+    DB 연결 풀 종료 (마지막 shutdown hook)
+    FastAPI는 shutdown hook을 등록 순서대로 실행 → ingest drain, 남은 인터랙션, outbox 전송이
+    모두 끝난 뒤 풀을 닫음 (이 hook 뒤에 DB를 쓰는 shutdown hook을 등록하지 않음)
+    """
+    if alert_count_reconcile_task:
+        alert_count_reconcile_task.cancel()
+        await asyncio.gather(alert_count_reconcile_task, return_exceptions=True)
+    db_pool.get_pool().close()
+    await async_db.close_pool()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,250 @@
+"""
+비동기 DB 접근 계층 (aiomysql)
+FastAPI 엔드포인트에서 이벤트 루프를 블로킹하지 않고 DB 작업 수행
+함수 구성과 SQL은 app.py / incident_service.py의 동기 버전과 동일
+"""
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from db_pool import (
+    DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME,
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_MAX_LIFETIME_SECONDS,
+)
+from incident_service import generate_incident_id, build_alert_insert_batches, build_alert_id_query
+from incident_index import open_incidents
+from slack_outbox import build_incident_card_insert
+from alert_dedupe import repeat_cache, build_repeat_lookup_query, build_repeat_update_queries
+
+try:
+    import aiomysql
+    AIOMYSQL_AVAILABLE = True
+except ImportError:
+    AIOMYSQL_AVAILABLE = False
+    print("⚠️  aiomysql이 설치되지 않았습니다. 동기(pymysql) DB 경로를 사용합니다.")
+
+_pool = None
+
+
+async def init_pool():
+    """aiomysql 연결 풀 생성 (앱 시작 시 호출)"""
+    global _pool
+    if not AIOMYSQL_AVAILABLE or _pool is not None:
+        return _pool
+    _pool = await aiomysql.create_pool(
+        host=DB_HOST,
+        port=DB_PORT,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        db=DB_NAME,
+        charset='utf8mb4',
+        cursorclass=aiomysql.DictCursor,
+        autocommit=False,
+        minsize=DB_POOL_MIN_SIZE,
+        maxsize=DB_POOL_MAX_SIZE,
+        pool_recycle=int(DB_POOL_MAX_LIFETIME_SECONDS),
+    )
+    print(f"✅ aiomysql 연결 풀 생성: minsize={DB_POOL_MIN_SIZE}, maxsize={DB_POOL_MAX_SIZE}")
+    return _pool
+
+
+async def close_pool():
+    """aiomysql 연결 풀 종료 (앱 종료 시 호출)"""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+def is_ready() -> bool:
+    """비동기 DB 경로 사용 가능 여부"""
+    return _pool is not None
+
+
+def acquire():
+    """
+    풀에서 연결 대여 (async with acquire() as conn: ...)
+    반납 시 미완료 트랜잭션은 aiomysql이 rollback 처리
+    """
+    return _pool.acquire()
+
+
+def stats() -> Optional[Dict[str, Any]]:
+    """풀 상태"""
+    if _pool is None:
+        return None
+    return {
+        "minsize": _pool.minsize,
+        "maxsize": _pool.maxsize,
+        "size": _pool.size,
+        "free": _pool.freesize,
+        "in_use": _pool.size - _pool.freesize,
+    }
+
+
+async def ping() -> None:
+    """연결 확인 (health check)"""
+    async with acquire() as conn:
+        await conn.ping(reconnect=False)
+
+
+async def find_repeat_alerts(conn, groups: Dict[str, list]) -> Dict[int, Dict[str, Any]]:
+    """
+    반복 알림 분류 및 repeat_count 갱신 (app.find_repeat_alerts의 비동기 버전)
+    주의: commit은 호출자에서 처리
+    """
+    repeats, lookup = repeat_cache.partition(groups)
+    async with conn.cursor() as cursor:
+        if lookup:
+            sql, params = build_repeat_lookup_query(list(lookup))
+            await cursor.execute(sql, params)
+            repeat_cache.resolve_lookup(lookup, await cursor.fetchall(), repeats)
+        for sql, params in build_repeat_update_queries(repeats):
+            await cursor.execute(sql, params)
+    return repeats
+
+
+async def save_alerts_to_db(conn, alerts: List[Tuple[Dict[str, Any], Dict[str, Any]]], incident_id: str, incident_key: str) -> List[int]:
+    """
+    같은 Incident의 알람들을 multi-row INSERT로 저장 (app.save_alerts_to_db의 비동기 버전)
+    주의: commit은 호출자에서 처리
+
+    Returns: 저장된 alert_id 리스트 (alerts 순서)
+    """
+    alert_ids = []
+    async with conn.cursor() as cursor:
+        for sql, params, rows in build_alert_insert_batches(alerts, incident_id, incident_key):
+            await cursor.execute(sql, params)
+            first_id = cursor.lastrowid
+            if rows == 1:
+                alert_ids.append(first_id)
+                continue
+            await cursor.execute(*build_alert_id_query(incident_id, first_id, rows))
+            alert_ids.extend(row["alert_id"] for row in await cursor.fetchall())
+    return alert_ids
+
+
+async def save_alert_to_db(conn, alert_info: Dict[str, Any], raw_payload: Dict[str, Any], incident_id: str, incident_key: str) -> int:
+    """
+    알람 1건을 grafana_alerts 테이블에 저장 (app.save_alert_to_db의 비동기 버전)
+    주의: commit은 호출자에서 처리
+    """
+    return (await save_alerts_to_db(conn, [(alert_info, raw_payload)], incident_id, incident_key))[0]
+
+
+async def find_or_create_incident(conn, incident_key: str, alert_info: Dict[str, Any],
+                                  alert_delta: int = 1) -> Dict[str, Any]:
+    """
+    Open Incident 찾기 또는 새로 생성 (app.find_or_create_incident의 비동기 버전)
+    open incident 인덱스 hit 시 조건부 UPDATE만 수행 (SELECT 생략)
+    주의: commit은 호출자에서 처리
+
+    Returns: Incident snapshot (app.find_or_create_incident와 동일한 형식)
+    """
+    async with conn.cursor() as cursor:
+        cached = open_incidents.get(incident_key)
+        if cached:
+            await cursor.execute("""
+                UPDATE incidents
+                SET last_seen_at = %s,
+                    severity = %s,
+                    status = 'active',
+                    alert_count = LAST_INSERT_ID(alert_count + %s),
+                    updated_at = %s
+                WHERE incident_id = %s
+                  AND status IN ('active', 'acknowledged')
+            """, (
+                datetime.now(),
+                alert_info["severity"],
+                alert_delta,
+                datetime.now(),
+                cached["incident_id"]
+            ))
+            if cursor.rowcount == 1:
+                return open_incidents.hit_snapshot(incident_key, cached, cursor.lastrowid)
+            open_incidents.invalidate(incident_key, cached["incident_id"])
+
+        await cursor.execute("""
+            SELECT incident_id, start_time, slack_message_ts, alert_count
+            FROM incidents
+            WHERE incident_key = %s
+              AND status IN ('active', 'acknowledged')
+            ORDER BY last_seen_at DESC
+            LIMIT 1
+            FOR UPDATE
+        """, (incident_key,))
+        existing = await cursor.fetchone()
+
+        if existing:
+            incident_id = existing["incident_id"]
+            await cursor.execute("""
+                UPDATE incidents
+                SET last_seen_at = %s,
+                    severity = %s,
+                    status = 'active',
+                    alert_count = alert_count + %s,
+                    updated_at = %s
+                WHERE incident_id = %s
+            """, (
+                datetime.now(),
+                alert_info["severity"],
+                alert_delta,
+                datetime.now(),
+                incident_id
+            ))
+            incident = {
+                "incident_id": incident_id,
+                "incident_key": incident_key,
+                "is_new_incident": False,
+                "status": "active",
+                "start_time": existing["start_time"],
+                "slack_message_ts": existing["slack_message_ts"],
+                "alert_count": existing["alert_count"] + alert_delta,
+            }
+        else:
+            incident_id = generate_incident_id()
+            now = datetime.now()
+            await cursor.execute("""
+                INSERT INTO incidents
+                (incident_id, incident_key, status, severity, phase, cluster, namespace, service,
+                 service_category, start_time, first_seen_at, last_seen_at, alert_count)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (
+                incident_id,
+                incident_key,
+                "active",
+                alert_info["severity"],
+                alert_info["phase"],
+                alert_info["cluster"],
+                alert_info["namespace"],
+                alert_info["service"],
+                alert_info.get("service_category"),
+                now,
+                now,
+                now,
+                alert_delta
+            ))
+            incident = {
+                "incident_id": incident_id,
+                "incident_key": incident_key,
+                "is_new_incident": True,
+                "status": "active",
+                "start_time": now,
+                "slack_message_ts": None,
+                "alert_count": alert_delta,
+            }
+
+    # 인덱스 등록은 commit 후 호출자에서 처리
+    return incident
+
+
+async def enqueue_incident_card(conn, incident: Dict[str, Any], alert_info: Dict[str, Any]) -> bool:
+    """
+    신규 Incident 카드 전송을 outbox에 기록 (slack_outbox.enqueue_incident_card의 비동기 버전)
+    주의: commit은 호출자에서 처리
+    """
+    sql, params = build_incident_card_insert(incident, alert_info)
+    async with conn.cursor() as cursor:
+        await cursor.execute(sql, params)
+        return cursor.rowcount > 0
+
@@ -0,0 +1,131 @@
+"""
+Slack HTTP 인터랙션 응답 시간 벤치마크
+서명된 버튼 클릭(block_actions) 요청을 /slack/interactions에 보내고 200 응답까지의 p50 / p95 / p99 측정
+앱을 같은 프로세스에서 ASGI로 호출 (bench_webhook.py와 같은 방식)
+
+사용법:
+    # 실제 처리 (MySQL, Slack / Grafana 설정 필요)
+    python bench_interactions.py --requests 500 --concurrency 50
+    # 처리 시간을 sleep으로 대체 (Grafana Silence 생성 등 느린 처리 가정, DB 불필요)
+    python bench_interactions.py --requests 500 --concurrency 50 --work-ms 2000
+
+응답 시간은 Slack 제한(3초)과 비교, 처리 대기 / 처리 시간은 interaction_executor 통계로 함께 표시
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import time
+from urllib.parse import urlencode
+
+SIGNING_SECRET = "bench-signing-secret"
+os.environ["SLACK_SIGNING_SECRET"] = SIGNING_SECRET
+
+import httpx
+
+import app as receiver
+import incident_actions
+from interaction_executor import interaction_executor
+
+
+def make_body(i: int, incidents: int, action: str) -> str:
+    """버튼 클릭 payload (incidents개의 Incident 카드에 분산, 클릭마다 다른 action_ts)"""
+    incident = i % incidents
+    payload = {
+        "type": "block_actions",
+        "user": {"id": "UBENCH", "name": "bench"},
+        "channel": {"id": "CBENCH"},
+        "message": {"ts": f"1700000000.{incident:06d}"},
+        "response_url": "",
+        "actions": [{
+            "action_id": f"incident_{action}",
+            "action_ts": f"{time.time():.6f}.{i}",
+            "value": json.dumps({"incident_id": f"INC-BENCH-{incident}", "incident_key": "bench", "action": action}),
+        }],
+    }
+    return urlencode({"payload": json.dumps(payload)})
+
+
+def sign(body: str) -> dict:
+    timestamp = str(int(time.time()))
+    digest = hmac.new(SIGNING_SECRET.encode(), f"v0:{timestamp}:{body}".encode(), hashlib.sha256).hexdigest()
+    return {
+        "X-Slack-Signature": f"v0={digest}",
+        "X-Slack-Request-Timestamp": timestamp,
+        "Content-Type": "application/x-www-form-urlencoded",
+    }
+
+
+def percentile(samples: list, p: float) -> float:
+    return round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 1)
+
+
+async def run(total: int, concurrency: int, incidents: int, action: str) -> dict:
+    transport = httpx.ASGITransport(app=receiver.app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            nonlocal errors
+            body = make_body(i, incidents, action)
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/slack/interactions", content=body, headers=sign(body))
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": round(latencies[-1] * 1000, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--incidents", type=int, default=20, help="클릭이 분산될 Incident 카드 수")
+    parser.add_argument("--action", default="mute_30m", help="ack, mute_30m 등")
+    parser.add_argument("--work-ms", type=int, default=0, help="0보다 크면 실제 처리 대신 sleep")
+    args = parser.parse_args()
+
+    if args.work_ms > 0:
+        incident_actions.action_dispatcher.dispatch = lambda *a, **kw: time.sleep(args.work_ms / 1000)
+
+    await receiver.app.router.startup()
+    try:
+        result = await run(args.requests, args.concurrency, args.incidents, args.action)
+        # 응답 후 처리 완료까지 대기 (실행기 통계)
+        while interaction_executor.stats()["pending"]:
+            await asyncio.sleep(0.1)
+    finally:
+        await receiver.app.router.shutdown()
+
+    executor = interaction_executor.stats()
+    print()
+    print(f"{'requests':>8} {'errors':>6} {'elapsed_s':>9} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'max_ms':>8}")
+    print(f"{result['requests']:>8} {result['errors']:>6} {result['elapsed_s']:>9} {result['p50_ms']:>8} "
+          f"{result['p95_ms']:>8} {result['p99_ms']:>8} {result['max_ms']:>8}")
+    print()
+    print(f"처리: completed={executor['completed']}, failed={executor['failed']}, rejected={executor['rejected']}")
+    print(f"대기 시간: {executor['queue_wait']}")
+    print(f"처리 시간: {executor['duration']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+"""
+AI 분석 프롬프트 벤치마크 (기존 알람 JSON vs prompt_context 압축 컨텍스트)
+같은 알람으로 두 방식의 프롬프트를 만들어 토큰 수와 Ollama 추론 시간 비교
+
+사용법:
+    # 합성 알람으로 토큰 수만 비교
+    python bench_prompt.py --alerts 30
+    # DB의 Incident로 비교 (DB_* 환경 변수 필요)
+    python bench_prompt.py --incident-id <incident_id>
+    # Ollama 추론 시간까지 비교 (OLLAMA_BASE_URL, OLLAMA_MODEL)
+    python bench_prompt.py --alerts 30 --ollama --runs 3
+
+토큰 수는 prompt_context.estimate_tokens 추정치, --ollama면 Ollama의 prompt_eval_count(실제 토큰 수)도 표시
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+import http_clients
+from incident_ai import OLLAMA_BASE_URL, OLLAMA_MODEL, PROMPT_TEMPLATE, format_incident_context
+from prompt_context import AI_CONTEXT_TOKEN_BUDGET, build_alert_context, estimate_tokens
+
+
+def legacy_alert_summary(alerts: list) -> str:
+    """기존 방식: 최근 5개 알람, message 200자, labels 전체를 들여쓴 JSON으로"""
+    summary = [
+        {"alertname": alert.get("alertname", "Unknown"), "message": alert.get("message", "")[:200],
+         "labels": alert.get("labels", {})}
+        for alert in alerts[:5]
+    ]
+    return json.dumps(summary, ensure_ascii=False, indent=2)
+
+
+def make_alerts(count: int) -> tuple:
+    """합성 Incident + 알람 (같은 rule의 pod별 반복 알람 + 일부 다른 알람)"""
+    now = datetime.now()
+    incident_info = {
+        "incident_id": "bench", "incident_key": "bench", "severity": "critical", "cluster": "prod-a",
+        "namespace": "payment", "phase": "prod", "service": "payment-api", "status": "active",
+        "start_time": now - timedelta(minutes=count), "alert_count": count,
+    }
+    alerts = []
+    for i in range(count):
+        pod = f"payment-api-7d9f8c-{i % 4}"
+        crash = i % 5 != 4
+        alerts.append({
+            "alertname": "KubePodCrashLooping" if crash else "KubeContainerHighMemory",
+            "message": (f"Pod payment/{pod} (container app) is in waiting state (reason: CrashLoopBackOff), "
+                        f"restarts {10 + i} times in the last 10 minutes." if crash else
+                        f"Container app in pod payment/{pod} memory usage is {85 + i % 10}% of its limit."),
+            "labels": {
+                "alertname": "KubePodCrashLooping" if crash else "KubeContainerHighMemory",
+                "severity": "critical" if crash else "warning",
+                "cluster": "prod-a", "namespace": "payment", "phase": "prod", "service": "payment-api",
+                "service_category": "commerce", "job": "kube-state-metrics", "container": "app",
+                "pod": pod, "grafana_folder": "Kubernetes", "__alert_rule_uid__": "a1b2c3d4",
+                "rule_uid": "a1b2c3d4" if crash else "e5f6g7h8",
+            },
+            "state": "firing",
+            "received_at": now - timedelta(minutes=i),
+            "repeat_count": i % 3,
+        })
+    return incident_info, alerts
+
+
+def load_incident(incident_id: str) -> tuple:
+    from db_pool import get_db_connection
+    from incident_ai import load_analysis_input
+    conn = get_db_connection()
+    try:
+        incident_info, alerts = load_analysis_input(conn, incident_id)
+    finally:
+        conn.close()
+    if not incident_info:
+        raise SystemExit(f"❌ Incident가 없습니다: {incident_id}")
+    return incident_info, alerts
+
+
+def run_ollama(prompt: str, num_predict: int) -> dict:
+    """Ollama 비스트리밍 호출 (프롬프트 처리 / 전체 시간)"""
+    started = time.perf_counter()
+    response = http_clients.post("ollama", f"{OLLAMA_BASE_URL}/api/generate", json={
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": False,
+        "options": {"temperature": 0.7, "num_predict": num_predict},
+    })
+    response.raise_for_status()
+    data = response.json()
+    return {
+        "prompt_eval_count": data.get("prompt_eval_count"),
+        "prompt_eval_ms": round(data.get("prompt_eval_duration", 0) / 1e6, 1),
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=30, help="합성 알람 수")
+    parser.add_argument("--incident-id", help="합성 알람 대신 DB의 Incident 사용")
+    parser.add_argument("--budget", type=int, default=AI_CONTEXT_TOKEN_BUDGET, help="알람 컨텍스트 토큰 예산")
+    parser.add_argument("--ollama", action="store_true", help="Ollama 추론 시간 측정")
+    parser.add_argument("--runs", type=int, default=3, help="--ollama 측정 반복 횟수")
+    parser.add_argument("--num-predict", type=int, default=256, help="--ollama 생성 토큰 상한")
+    args = parser.parse_args()
+
+    incident_info, alerts = load_incident(args.incident_id) if args.incident_id else make_alerts(args.alerts)
+    incident_context = format_incident_context(incident_info)
+
+    started = time.perf_counter()
+    context, info = build_alert_context(alerts, args.budget)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    prompts = {
+        "before": PROMPT_TEMPLATE.format(incident_context=incident_context,
+                                         alert_summary=legacy_alert_summary(alerts), similar_history="없음"),
+        "after": PROMPT_TEMPLATE.format(incident_context=incident_context,
+                                        alert_summary=context, similar_history="없음"),
+    }
+
+    print(f"알람 {len(alerts)}개 → {info['groups']}종류 ({info['included_groups']}종류 포함, "
+          f"{info['omitted_alerts']}건 생략), 컨텍스트 생성 {build_ms:.2f}ms")
+    print()
+    # 프롬프트에 반영된 알람 수 (Grafana 반복 전송 포함)
+    covered = {
+        "before": sum(1 + (alert.get("repeat_count") or 0) for alert in alerts[:5]),
+        "after": info["alerts"] - info["omitted_alerts"],
+    }
+    print(f"{'prompt':<7} {'alerts':>6} {'chars':>7} {'est_tokens':>10}")
+    for name, prompt in prompts.items():
+        print(f"{name:<7} {covered[name]:>6} {len(prompt):>7} {estimate_tokens(prompt):>10}")
+
+    if args.ollama:
+        print()
+        print(f"{'prompt':<7} {'run':>3} {'prompt_tokens':>13} {'prompt_eval_ms':>14} {'total_ms':>9}")
+        for name, prompt in prompts.items():
+            for run in range(args.runs):
+                result = run_ollama(prompt, args.num_predict)
+                print(f"{name:<7} {run + 1:>3} {result['prompt_eval_count']!s:>13} "
+                      f"{result['prompt_eval_ms']:>14} {result['total_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
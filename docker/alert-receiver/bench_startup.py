@@ -0,0 +1,117 @@
+"""
+alert-receiver 시작 시간 벤치마크
+새 Python 프로세스에서 app import 시간과 uvicorn 시작 후 첫 요청 응답까지의 시간 측정
+
+사용법:
+    python bench_startup.py --runs 5
+    python bench_startup.py --runs 5 --path /health   # DB 연결 포함
+
+- import 시간: `import app` 소요 시간 + 시간이 오래 걸린 top-level 모듈 (python -X importtime)
+- 첫 요청: uvicorn 프로세스 시작 → startup hook → GET <path> 200 응답까지
+- langchain / slack_sdk가 시작 시 import되었는지 함께 표시 (지연 import 확인)
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+HEAVY_MODULES = ("langchain", "langchain_community", "slack_sdk")
+
+IMPORT_SCRIPT = f"""
+import sys, time
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+loaded = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(f"{{elapsed:.4f}} {{','.join(loaded) or '-'}}")
+"""
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def measure_import() -> tuple:
+    """새 프로세스에서 import app (초, 시작 시 import된 무거운 모듈)"""
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=HERE, capture_output=True,
+                            text=True, check=True).stdout.strip().splitlines()[-1]
+    elapsed, loaded = output.split(" ", 1)
+    return float(elapsed), loaded
+
+
+def slowest_imports(top: int) -> list:
+    """import app에서 누적 시간이 큰 top-level 모듈 [(모듈, ms)]"""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=HERE,
+                            capture_output=True, text=True).stderr
+    totals = {}
+    for match in _IMPORTTIME_RE.finditer(stderr):
+        _, cumulative, indent, name = match.groups()
+        if len(indent) == 2:  # app이 직접 import한 모듈
+            totals[name] = int(cumulative) / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_request(path: str, timeout: float) -> float:
+    """uvicorn 시작부터 첫 200 응답까지 (초)"""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get(f"http://127.0.0.1:{port}{path}").status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                if process.poll() is not None:
+                    raise SystemExit(f"❌ uvicorn 종료됨 (exit {process.returncode})")
+                time.sleep(0.01)
+        raise SystemExit(f"❌ {timeout:g}초 안에 응답 없음")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/", help="첫 요청 경로")
+    parser.add_argument("--top", type=int, default=8, help="표시할 느린 import 수")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    first_requests = [measure_first_request(args.path, args.timeout) for _ in range(args.runs)]
+
+    import_times = [elapsed for elapsed, _ in imports]
+    print(f"{'metric':<20} {'median_ms':>9} {'min_ms':>8} {'max_ms':>8}")
+    for name, samples in (("import app", import_times), (f"first GET {args.path}", first_requests)):
+        print(f"{name:<20} {statistics.median(samples) * 1000:>9.0f} "
+              f"{min(samples) * 1000:>8.0f} {max(samples) * 1000:>8.0f}")
+    print()
+    print(f"시작 시 import된 무거운 모듈: {imports[-1][1]}")
+    print()
+    print("느린 import (누적 ms):")
+    for name, ms in slowest_imports(args.top):
+        print(f"  {name:<24} {ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Webhook 처리량 벤치마크 (동기 pymysql 경로 vs 비동기 aiomysql 경로)
+앱을 같은 프로세스에서 ASGI로 호출하여 requests/sec 비교
+
+사용법 (MySQL 실행 중, DB_* 환경 변수 설정 필요):
+    python bench_webhook.py --requests 500 --concurrency 50
+
+Slack 전송을 제외하고 DB 처리량만 보려면 SLACK_WEBHOOK_URL, SLACK_BOT_TOKEN을 비워두세요.
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+os.environ["INGEST_MODE"] = "sync"
+
+import httpx
+
+import app as receiver
+
+
+def make_payload(i: int, distinct_keys: int) -> dict:
+    """벤치마크용 Grafana payload (incident_key가 distinct_keys개로 분산)"""
+    return {
+        "status": "firing",
+        "alerts": [{
+            "status": "firing",
+            "labels": {
+                "alertname": f"BenchAlert{i % distinct_keys}",
+                "rule_uid": f"bench-{i % distinct_keys}",
+                "severity": "warning",
+                "cluster": "bench",
+                "namespace": "bench",
+                "phase": "bench",
+            },
+            "annotations": {"description": f"bench alert {uuid.uuid4().hex[:8]}"},
+            "startsAt": "2024-01-01T00:00:00Z",
+            "fingerprint": uuid.uuid4().hex[:16],
+        }],
+    }
+
+
+async def run(mode: str, total: int, concurrency: int, distinct_keys: int) -> dict:
+    receiver.DB_ASYNC = mode == "async"
+    transport = httpx.ASGITransport(app=receiver.app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/webhook/grafana", json=make_payload(i, distinct_keys))
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--distinct-keys", type=int, default=20)
+    args = parser.parse_args()
+
+    await receiver.app.router.startup()
+    try:
+        results = []
+        for mode in ("sync", "async"):
+            results.append(await run(mode, args.requests, args.concurrency, args.distinct_keys))
+    finally:
+        await receiver.app.router.shutdown()
+
+    print()
+    print(f"{'mode':<6} {'requests':>8} {'errors':>6} {'elapsed_s':>9} {'rps':>8} {'p50_ms':>8} {'p99_ms':>8}")
+    for r in results:
+        print(f"{r['mode']:<6} {r['requests']:>8} {r['errors']:>6} {r['elapsed_s']:>9} "
+              f"{r['rps']:>8} {r['p50_ms']:>8} {r['p99_ms']:>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,154 @@
+"""
+Slack Incident 카드 메시지 인덱스
+(channel, message_ts) → (incident_id, incident_key)
+
+- 카드 전송 시(동기 / 비동기 webhook 경로, Slack outbox) 바로 등록
+- 시작 시 DB의 open incident 카드로 warm-up
+- 캐시에 없으면 incidents.idx_slack_message_ts_channel 인덱스로 조회 후 등록
+  (DB에 없는 메시지는 CARD_INDEX_MISS_TTL_SECONDS 동안만 기억 - 전송 직후 ts 저장 / commit 전에 들어온
+   리액션이 카드를 영구히 "카드 아님"으로 만들지 않도록, 등록된 카드는 miss로 덮어쓰지 않음)
+- 리액션 처리에서 Slack API(conversations.history) 호출 / 카드 블록 파싱 없이 Incident 조회
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from db_pool import get_db_connection
+
+CARD_INDEX_SIZE = int(os.getenv("CARD_INDEX_SIZE", "10000"))  # 메모리에 유지할 카드 수
+CARD_INDEX_MISS_TTL_SECONDS = float(os.getenv("CARD_INDEX_MISS_TTL_SECONDS", "30"))  # 카드가 아닌 메시지 기억 시간 (0이면 기억하지 않음)
+
+CardKey = Tuple[str, str]
+CardEntry = Optional[Tuple[str, str]]  # (incident_id, incident_key), 카드가 아니면 None
+
+
+class CardIndex:
+    """스레드 안전한 (channel, message_ts) → Incident LRU"""
+
+    def __init__(self, max_size: int = CARD_INDEX_SIZE, miss_ttl: float = CARD_INDEX_MISS_TTL_SECONDS):
+        self.max_size = max(1, max_size)
+        self.miss_ttl = miss_ttl
+        self._entries: "OrderedDict[CardKey, Tuple[str, str]]" = OrderedDict()
+        self._misses: "OrderedDict[CardKey, float]" = OrderedDict()  # 카드가 아닌 메시지 → 만료 시각 (monotonic)
+        self._lock = threading.Lock()
+
+        # 통계
+        self.hits = 0
+        self.db_lookups = 0
+        self.not_found = 0
+
+    def _put(self, key: CardKey, entry: Tuple[str, str]):
+        with self._lock:
+            self._misses.pop(key, None)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _put_miss(self, key: CardKey):
+        """카드가 아닌 메시지를 짧게 기억 (그 사이 등록된 카드는 덮어쓰지 않음)"""
+        if self.miss_ttl <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._misses[key] = time.monotonic() + self.miss_ttl
+            self._misses.move_to_end(key)
+            while len(self._misses) > self.max_size:
+                self._misses.popitem(last=False)
+
+    def remember(self, channel: str, message_ts: str, incident_id: str, incident_key: Optional[str] = None):
+        """카드 전송 직후 등록"""
+        if channel and message_ts:
+            self._put((channel, message_ts), (incident_id, incident_key))
+
+    def lookup(self, channel: str, message_ts: str) -> CardEntry:
+        """
+        카드 메시지의 Incident 조회 (메모리 → DB 인덱스)
+
+        Returns: (incident_id, incident_key), Incident 카드가 아니면 None
+        """
+        key = (channel, message_ts)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            expires_at = self._misses.get(key)
+            if expires_at is not None:
+                if expires_at > time.monotonic():
+                    self.hits += 1
+                    return None
+                del self._misses[key]
+            self.db_lookups += 1
+
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                # slack_channel이 없는 기존 행(마이그레이션 전 카드)도 message_ts로 찾음
+                cursor.execute("""
+                    SELECT incident_id, incident_key
+                    FROM incidents
+                    WHERE slack_message_ts = %s
+                      AND (slack_channel = %s OR slack_channel IS NULL)
+                    LIMIT 1
+                """, (message_ts, channel))
+                row = cursor.fetchone()
+        finally:
+            conn.close()
+
+        if row is None:
+            with self._lock:
+                self.not_found += 1
+            self._put_miss(key)
+            return None
+        entry = (row["incident_id"], row["incident_key"])
+        self._put(key, entry)
+        return entry
+
+    def warm(self, conn, default_channel: str) -> int:
+        """
+        DB의 open incident 카드로 캐시 채우기
+
+        Args:
+            default_channel: slack_channel이 없는 기존 행에 사용할 채널
+
+        Returns: 등록한 카드 수
+        """
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT incident_id, incident_key, slack_message_ts, slack_channel
+                FROM incidents
+                WHERE status IN ('active', 'acknowledged')
+                  AND slack_message_ts IS NOT NULL
+                ORDER BY last_seen_at DESC
+                LIMIT %s
+            """, (self.max_size,))
+            rows = cursor.fetchall()
+
+        # 최근 incident가 LRU 뒤쪽에 남도록 오래된 순으로 등록
+        for row in reversed(rows):
+            self.remember(row["slack_channel"] or default_channel, row["slack_message_ts"],
+                          row["incident_id"], row["incident_key"])
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """캐시 크기 및 hit / DB 조회 통계"""
+        with self._lock:
+            size = len(self._entries)
+            misses = len(self._misses)
+        lookups = self.hits + self.db_lookups
+        return {
+            "size": size,
+            "cached_misses": misses,
+            "hits": self.hits,
+            "db_lookups": self.db_lookups,
+            "not_found": self.not_found,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+        }
+
+
+# 프로세스 공용 인덱스
+card_index = CardIndex()
@@ -0,0 +1,181 @@
+"""
+Incident 카드 갱신 (chat.update, debounce)
+기존 Incident에 알람이 추가되거나 상태가 바뀌면 Slack 루트 메시지의 Alerts / Status / 최근 발생 시각을 갱신
+
+- Incident당 CARD_REFRESH_INTERVAL_SECONDS에 최대 1회 (구간 내 요청은 하나로 합쳐짐)
+- 갱신 시점의 incidents 값으로 카드를 다시 그림
+- 그린 blocks의 hash가 마지막으로 보낸 카드와 같으면 API 호출 생략
+- chat.update는 SLACK_BOT_TOKEN이 있을 때만 가능 (Webhook 메시지는 수정 불가)
+"""
+import hashlib
+import heapq
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import slack_sender
+from slack_sender import create_incident_card, update_incident_card
+from db_pool import get_db_connection
+
+CARD_REFRESH_ENABLED = os.getenv("CARD_REFRESH_ENABLED", "true").lower() in ("1", "true", "yes")
+CARD_REFRESH_INTERVAL_SECONDS = float(os.getenv("CARD_REFRESH_INTERVAL_SECONDS", "30"))
+CARD_REFRESH_CACHE_SIZE = int(os.getenv("CARD_REFRESH_CACHE_SIZE", "5000"))
+
+
+def blocks_digest(blocks: Dict[str, Any]) -> str:
+    """카드 blocks hash (변경 여부 판단용)"""
+    return hashlib.sha256(json.dumps(blocks, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+class CardRefresher:
+    """Incident별 debounce 후 카드 갱신 (전용 스레드)"""
+
+    def __init__(self, interval: float = CARD_REFRESH_INTERVAL_SECONDS, cache_size: int = CARD_REFRESH_CACHE_SIZE):
+        self.interval = interval
+        self.cache_size = max(1, cache_size)
+
+        self._cond = threading.Condition()
+        self._pending: Dict[str, tuple] = {}  # incident_id → (slack_message_ts, channel)
+        self._due: list = []  # heap[(due_at, incident_id)]
+        self._cards: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # incident_id → {digest, refreshed_at}
+        self._thread: Optional[threading.Thread] = None
+
+        # 통계
+        self.requests = 0
+        self.debounced = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.errors = 0
+
+    def enabled(self) -> bool:
+        return CARD_REFRESH_ENABLED and bool(slack_sender.SLACK_BOT_TOKEN)
+
+    def remember(self, incident_id: str, blocks: Dict[str, Any]):
+        """새로 보낸 카드 등록 (다음 갱신의 hash 비교 기준, debounce 시작 시각)"""
+        with self._cond:
+            self._remember(incident_id, blocks_digest(blocks), time.monotonic())
+
+    def _remember(self, incident_id: str, digest: str, refreshed_at: float):
+        self._cards[incident_id] = {"digest": digest, "refreshed_at": refreshed_at}
+        self._cards.move_to_end(incident_id)
+        while len(self._cards) > self.cache_size:
+            self._cards.popitem(last=False)
+
+    def request(self, incident_id: str, slack_ts: Optional[str], channel: Optional[str] = None):
+        """
+        카드 갱신 요청 (commit 후 호출)
+        마지막 갱신 후 interval이 지나지 않았으면 그 시점까지 미루고, 그 사이 요청은 합쳐짐
+        
+        Args:
+            slack_ts: 카드(스레드 루트 메시지) ts, 없으면 무시
+            channel: 카드가 있는 채널 (기본: SLACK_CHANNEL)
+        """
+        if not slack_ts or not self.enabled():
+            return
+        with self._cond:
+            self.requests += 1
+            if incident_id in self._pending:
+                self._pending[incident_id] = (slack_ts, channel)
+                self.debounced += 1
+                return
+            card = self._cards.get(incident_id)
+            now = time.monotonic()
+            due_at = max(now, card["refreshed_at"] + self.interval) if card else now
+            self._pending[incident_id] = (slack_ts, channel)
+            heapq.heappush(self._due, (due_at, incident_id))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="card-refresher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._due or self._due[0][0] > time.monotonic():
+                    self._cond.wait(timeout=(self._due[0][0] - time.monotonic()) if self._due else None)
+                batch = {}
+                now = time.monotonic()
+                while self._due and self._due[0][0] <= now:
+                    _, incident_id = heapq.heappop(self._due)
+                    batch[incident_id] = self._pending.pop(incident_id)
+            try:
+                self._refresh(batch)
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Incident 카드 갱신 실패: {e}")
+
+    def _refresh(self, batch: Dict[str, tuple]):
+        """due된 Incident들의 현재 값을 한 번에 조회하여 카드 갱신"""
+        placeholders = ", ".join(["%s"] * len(batch))
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT incident_id, incident_key, status, severity, cluster, namespace, phase, service,
+                           alert_count, start_time, last_seen_at
+                    FROM incidents
+                    WHERE incident_id IN ({placeholders})
+                """, list(batch))
+                rows = cursor.fetchall()
+        finally:
+            conn.close()
+
+        for row in rows:
+            incident_id = row["incident_id"]
+            blocks = create_incident_card(
+                incident_id=incident_id,
+                incident_key=row["incident_key"],
+                status=row["status"],
+                severity=row["severity"] or "warning",
+                cluster=row["cluster"] or "",
+                namespace=row["namespace"] or "",
+                phase=row["phase"] or "",
+                service=row["service"] or "",
+                alert_count=row["alert_count"],
+                start_time=row["start_time"],
+                is_new_incident=False,
+                last_seen_at=row["last_seen_at"]
+            )
+            digest = blocks_digest(blocks)
+            with self._cond:
+                card = self._cards.get(incident_id)
+                if card and card["digest"] == digest:
+                    self.unchanged += 1
+                    continue
+                self._remember(incident_id, digest, time.monotonic())
+
+            slack_ts, channel = batch[incident_id]
+            future = update_incident_card(channel or slack_sender.SLACK_CHANNEL, slack_ts, blocks, row["severity"])
+            if future is not None:
+                future.add_done_callback(lambda f, incident_id=incident_id: self._on_done(incident_id, f))
+            self.updated += 1
+
+    def _on_done(self, incident_id: str, future):
+        """chat.update 실패 시 hash를 지워 다음 요청에서 다시 갱신"""
+        if future.exception() is not None:
+            self.errors += 1
+            with self._cond:
+                self._cards.pop(incident_id, None)
+            print(f"❌ Incident 카드 갱신 실패: incident_id={incident_id}: {future.exception()}")
+
+    def stats(self) -> Dict[str, Any]:
+        """갱신 통계"""
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "enabled": self.enabled(),
+            "interval_seconds": self.interval,
+            "pending": pending,
+            "requests": self.requests,
+            "debounced": self.debounced,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "errors": self.errors,
+        }
+
+
+# 프로세스 공용 refresher
+card_refresher = CardRefresher()
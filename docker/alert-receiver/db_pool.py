@@ -0,0 +1,276 @@
+"""
+MySQL 연결 풀
+app.py, slack_socket.py, incident_ai 등 모든 모듈이 공유하는 pymysql 연결 제공자
+- min/max size + overflow 한도
+- checkout 시 pre-ping 검증, max lifetime 초과 연결 교체
+- 대기 시간 / 사용 중 연결 수 통계
+
+사용법은 기존과 동일: conn = get_db_connection() ... conn.close()
+(close()는 실제 연결을 닫지 않고 풀에 반납)
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import pymysql
+
+DB_HOST = os.getenv("DB_HOST", "mysql")
+DB_PORT = int(os.getenv("DB_PORT", "3306"))
+DB_USER = os.getenv("DB_USER", "observer")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "observer123")
+DB_NAME = os.getenv("DB_NAME", "observer")
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "5"))  # max_size 초과 시 임시로 허용하는 연결 수
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+DB_POOL_MAX_LIFETIME_SECONDS = float(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+class PoolTimeoutError(Exception):
+    """풀에서 연결을 얻지 못함 (max_size + overflow 모두 사용 중)"""
+
+
+def create_raw_connection():
+    """MySQL 연결 생성 (풀을 거치지 않음)"""
+    return pymysql.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        charset='utf8mb4',
+        cursorclass=pymysql.cursors.DictCursor
+    )
+
+
+class PooledConnection:
+    """
+    풀에서 빌린 연결 (pymysql Connection 프록시)
+    close() 호출 시 풀에 반납하며, 여러 번 호출해도 안전
+    """
+
+    def __init__(self, pool: "ConnectionPool", conn, created_at: float):
+        self._pool = pool
+        self._conn = conn
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get("_conn")
+        if conn is None:
+            raise pymysql.err.InterfaceError("연결이 이미 풀에 반납되었습니다.")
+        return getattr(conn, name)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool._checkin(conn, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """스레드 안전한 pymysql 연결 풀"""
+
+    def __init__(self, min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE,
+                 max_overflow: int = DB_POOL_MAX_OVERFLOW, timeout: float = DB_POOL_TIMEOUT_SECONDS,
+                 max_lifetime: float = DB_POOL_MAX_LIFETIME_SECONDS, pre_ping: bool = DB_POOL_PRE_PING):
+        self.min_size = min_size
+        self.max_size = max(1, max_size)
+        self.max_overflow = max(0, max_overflow)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.pre_ping = pre_ping
+
+        self._idle = deque()  # (conn, created_at), LIFO로 사용
+        self._size = 0  # 열려 있는 연결 수 (idle + in_use)
+        self._cond = threading.Condition()
+
+        # 통계
+        self.checkouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.ping_failures = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.peak_in_use = 0
+
+    def warmup(self):
+        """min_size만큼 연결을 미리 생성"""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = create_raw_connection()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            self.created += 1
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def connection(self) -> PooledConnection:
+        """
+        풀에서 연결 대여
+
+        Raises: PoolTimeoutError (timeout 동안 연결을 얻지 못함)
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.max_size + self.max_overflow:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeoutError(
+                            f"DB 연결 풀 대기 시간 초과 ({self.timeout}초, size={self._size})"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                else:
+                    conn, created_at = None, None
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = create_raw_connection()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                created_at = time.monotonic()
+                self.created += 1
+            elif not self._validate(conn, created_at):
+                self._discard(conn)
+                continue
+
+            break
+
+        wait = time.monotonic() - started
+        with self._cond:
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            in_use = self._size - len(self._idle)
+            self.peak_in_use = max(self.peak_in_use, in_use)
+
+        return PooledConnection(self, conn, created_at)
+
+    def _validate(self, conn, created_at: float) -> bool:
+        """max lifetime 및 pre-ping 검증"""
+        if self.max_lifetime and time.monotonic() - created_at > self.max_lifetime:
+            return False
+        if self.pre_ping:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                self.ping_failures += 1
+                return False
+        return True
+
+    def _discard(self, conn):
+        """연결을 닫고 풀 크기에서 제외"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self.discarded += 1
+            self._cond.notify()
+
+    def _checkin(self, conn, created_at: float):
+        """
+        연결 반납
+        - 미완료 트랜잭션은 rollback, autocommit은 기본값(False)으로 복원
+        - overflow 연결이거나 상태 복원에 실패한 연결은 닫음
+        """
+        try:
+            conn.rollback()
+            conn.autocommit(False)
+        except Exception:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._size > self.max_size:
+                keep = False
+            else:
+                keep = True
+                self._idle.append((conn, created_at))
+                self._cond.notify()
+
+        if not keep:
+            self._discard(conn)
+
+    def close(self):
+        """idle 연결 모두 종료 (사용 중인 연결은 반납 시 정리되지 않으므로 종료 시점에 호출)"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """풀 상태 및 대기 시간 통계"""
+        with self._cond:
+            idle = len(self._idle)
+            size = self._size
+        return {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "max_overflow": self.max_overflow,
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "overflow": max(0, size - self.max_size),
+            "peak_in_use": self.peak_in_use,
+            "checkouts": self.checkouts,
+            "created": self.created,
+            "discarded": self.discarded,
+            "ping_failures": self.ping_failures,
+            "timeouts": self.timeouts,
+            "waits": self.waits,
+            "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """프로세스 공용 연결 풀 (최초 호출 시 생성)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_db_connection() -> PooledConnection:
+    """MySQL 연결 (공용 풀에서 대여, close() 시 반납)"""
+    return get_pool().connection()
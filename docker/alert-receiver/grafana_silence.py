@@ -1,151 +1,308 @@
 """
 Grafana Silence API 연동
-Slack Mute 버튼 클릭 시 Grafana Silence 생성
+Slack Mute 버튼 클릭 / 🔕 리액션 시 Grafana Silence 생성 또는 연장
+
+- 활성 Silence 캐시: GET /api/v2/silences로 주기적으로 갱신 (다른 replica / Grafana UI에서 만든 Silence 포함)
+  형식이 다른 Silence는 건너뛰고, 갱신이 실패해도 기존 캐시를 유지한 채 다음 주기에 다시 시도
+- 같은 matcher의 활성 Silence가 있으면 새로 만들지 않고 endsAt만 연장 (이미 충분히 길면 API 호출 없음)
+- 같은 matcher에 대한 동시 요청은 하나로 합침 (버튼 더블 클릭, 버튼 + 리액션)
+- 일괄 Mute: 여러 Incident를 한 번에 처리 (같은 matcher는 Silence 하나)
+- HTTP는 공용 비동기 클라이언트(http_clients "grafana") 사용 → 연결 재사용
 """
+import asyncio
 import os
-import httpx
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import http_clients
 
 GRAFANA_URL = os.getenv("GRAFANA_URL", "http://host.docker.internal:32570")
 GRAFANA_USER = os.getenv("GRAFANA_USER", "admin")
 GRAFANA_PASSWORD = os.getenv("GRAFANA_PASSWORD", "admin")
+GRAFANA_SILENCE_REFRESH_SECONDS = int(os.getenv("GRAFANA_SILENCE_REFRESH_SECONDS", "60"))  # 활성 Silence 캐시 갱신 주기 (0이면 시작 시 1번만 로드)
+GRAFANA_SILENCE_TIMEOUT_SECONDS = float(os.getenv("GRAFANA_SILENCE_TIMEOUT_SECONDS", "15"))  # 동기 호출(액션 스레드)의 최대 대기 시간
+
+# 연장 시간이 이보다 짧으면 기존 Silence 그대로 사용 (동시 클릭마다 몇 ms씩 연장하지 않음)
+SILENCE_EXTEND_MIN = timedelta(minutes=1)
+
+SILENCES_URL = f"{GRAFANA_URL}/api/alertmanager/grafana/api/v2/silences"
+CREATED_BY = "Slack Bot"
+
+# Silence matcher로 사용하는 label (순서 = matcher 순서)
+MATCHER_LABELS = ("alertname", "cluster", "namespace", "phase", "service")
+
+MatcherKey = Tuple[Tuple[str, str, bool, bool], ...]
 
 
-def create_grafana_silence(
-    alertname: str,
-    cluster: str = None,
-    namespace: str = None,
-    phase: str = None,
-    service: str = None,
-    duration_minutes: int = 30,
-    comment: str = "Muted from Slack"
-) -> Optional[str]:
+def build_matchers(alertname: str, cluster: str = None, namespace: str = None,
+                   phase: str = None, service: str = None) -> List[Dict[str, Any]]:
     """
-    Grafana Silence 생성
-    
-    Args:
-        alertname: 알람 이름
-        cluster: 클러스터
-        namespace: 네임스페이스
-        phase: 환경
-        service: 서비스
-        duration_minutes: 음소거 시간 (분)
-        comment: 주석
-    
-    Returns: Silence ID 또는 None
+    Silence matcher 생성 (값이 있는 label만)
+
+    Returns: [{"name", "value", "isRegex"}, ...]
     """
-    try:
-        # Grafana API 인증
-        auth = (GRAFANA_USER, GRAFANA_PASSWORD)
-        
-        # Matchers 생성 (labels 기반)
-        matchers = [
-            {
-                "name": "alertname",
-                "value": alertname,
-                "isRegex": False
-            }
-        ]
-        
-        if cluster:
-            matchers.append({
-                "name": "cluster",
-                "value": cluster,
-                "isRegex": False
-            })
-        
-        if namespace:
-            matchers.append({
-                "name": "namespace",
-                "value": namespace,
-                "isRegex": False
-            })
-        
-        if phase:
-            matchers.append({
-                "name": "phase",
-                "value": phase,
-                "isRegex": False
-            })
-        
-        if service:
-            matchers.append({
-                "name": "service",
-                "value": service,
-                "isRegex": False
-            })
-        
-        # 시작/종료 시간
-        starts_at = datetime.now()
-        ends_at = starts_at + timedelta(minutes=duration_minutes)
-        
-        # Grafana Silence 생성 API 호출
-        # Grafana Alerting API: POST /api/alertmanager/grafana/api/v2/silences
-        url = f"{GRAFANA_URL}/api/alertmanager/grafana/api/v2/silences"
-        
+    values = {"alertname": alertname, "cluster": cluster, "namespace": namespace,
+              "phase": phase, "service": service}
+    return [
+        {"name": name, "value": values[name], "isRegex": False}
+        for name in MATCHER_LABELS
+        if values[name]
+    ]
+
+
+def matcher_key(matchers: Iterable[Dict[str, Any]]) -> MatcherKey:
+    """순서와 무관한 matcher 비교 키"""
+    return tuple(sorted(
+        (m["name"], m["value"], bool(m.get("isRegex", False)), bool(m.get("isEqual", True)))
+        for m in matchers
+    ))
+
+
+def _format_time(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class SilenceManager:
+    """활성 Silence 캐시 기반 Silence 생성 / 연장 (이벤트 루프에서 작동)"""
+
+    def __init__(self, refresh_seconds: int = GRAFANA_SILENCE_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._active: Dict[MatcherKey, Dict[str, Any]] = {}  # matcher → {"id", "starts_at", "ends_at", "updated"}
+        self._inflight: Dict[MatcherKey, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # 통계
+        self.created = 0
+        self.extended = 0
+        self.reused = 0
+        self.failed = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.last_refresh_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def _auth(self) -> Tuple[str, str]:
+        return (GRAFANA_USER, GRAFANA_PASSWORD)
+
+    async def start(self):
+        """
+        캐시 로드 / 주기적 갱신 시작 (기다리지 않음 - Grafana 응답이 느려도 시작을 막지 않음)
+        로드 전이나 실패해도 Mute 요청은 작동 (캐시에 없으면 새로 생성)
+        """
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """주기적 갱신 종료"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                # 예상하지 못한 오류도 갱신 주기를 멈추지 않음 (기존 캐시 유지)
+                self.refresh_errors += 1
+                self.last_error = str(e)
+                print(f"❌ Grafana Silence 캐시 갱신 실패: {e}")
+            if self.refresh_seconds <= 0:
+                return
+            await asyncio.sleep(self.refresh_seconds)
+
+    async def refresh(self) -> bool:
+        """
+        GET /api/v2/silences로 활성 Silence 캐시 교체
+
+        Returns: 성공 여부
+        """
+        started = time.monotonic()
+        try:
+            response = await http_clients.registry.arequest("grafana", "GET", SILENCES_URL, auth=self._auth)
+            response.raise_for_status()
+            silences = response.json()
+        except Exception as e:
+            self.refresh_errors += 1
+            self.last_error = str(e)
+            print(f"⚠️  Grafana Silence 목록 조회 실패: {e}")
+            return False
+
+        if not isinstance(silences, list):
+            self.refresh_errors += 1
+            self.last_error = f"unexpected response: {type(silences).__name__}"
+            print(f"⚠️  Grafana Silence 목록 형식 오류: {self.last_error}")
+            return False
+
+        now = datetime.now(timezone.utc)
+        active: Dict[MatcherKey, Dict[str, Any]] = {}
+        skipped = 0
+        for silence in silences:
+            try:
+                if (silence.get("status") or {}).get("state") != "active":
+                    continue
+                ends_at = _parse_time(silence["endsAt"])
+                if ends_at <= now:
+                    continue
+                key = matcher_key(silence.get("matchers") or [])
+                entry = {"id": silence["id"], "starts_at": _parse_time(silence["startsAt"]),
+                         "ends_at": ends_at, "updated": started}
+            except Exception as e:
+                # 형식이 다른 Silence 1건 때문에 캐시 전체를 버리지 않음
+                skipped += 1
+                self.last_error = f"invalid silence: {e}"
+                continue
+            # 같은 matcher의 Silence가 여러 개면 가장 늦게 끝나는 것 사용
+            if key not in active or active[key]["ends_at"] < ends_at:
+                active[key] = entry
+        if skipped:
+            print(f"⚠️  Grafana Silence {skipped}건 건너뜀 (형식 오류): {self.last_error}")
+
+        # 조회 중에 이 프로세스가 만들거나 연장한 Silence는 유지 (응답에 반영되지 않았을 수 있음)
+        for key, entry in self._active.items():
+            if entry["updated"] >= started and (key not in active or active[key]["ends_at"] < entry["ends_at"]):
+                active[key] = entry
+
+        self._active = active
+        self.refreshes += 1
+        self.last_refresh_at = datetime.now().isoformat()
+        return True
+
+    async def mute(self, matchers: List[Dict[str, Any]], duration_minutes: int,
+                   comment: str = "Muted from Slack") -> Optional[Tuple[str, str]]:
+        """
+        같은 matcher의 활성 Silence를 연장하거나 새로 생성
+
+        Args:
+            matchers: build_matchers() 결과
+            duration_minutes: 지금부터 음소거할 시간 (분)
+            comment: 주석
+
+        Returns: (silence_id, "created" | "extended" | "existing"), 실패 시 None
+        """
+        key = matcher_key(matchers)
+        # 같은 matcher를 처리 중이면 끝날 때까지 기다린 뒤 캐시 기준으로 다시 판단
+        while key in self._inflight:
+            await asyncio.shield(self._inflight[key])
+
+        done = asyncio.get_running_loop().create_future()
+        self._inflight[key] = done
+        try:
+            return await self._mute(key, matchers, duration_minutes, comment)
+        finally:
+            del self._inflight[key]
+            done.set_result(None)
+
+    async def _mute(self, key: MatcherKey, matchers: List[Dict[str, Any]], duration_minutes: int,
+                    comment: str) -> Optional[Tuple[str, str]]:
+        now = datetime.now(timezone.utc)
+        ends_at = now + timedelta(minutes=duration_minutes)
+
+        existing = self._active.get(key)
+        if existing and existing["ends_at"] <= now:
+            existing = None
+        if existing and existing["ends_at"] + SILENCE_EXTEND_MIN >= ends_at:
+            self.reused += 1
+            return existing["id"], "existing"
+
         payload = {
             "matchers": matchers,
-            "startsAt": starts_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
-            "endsAt": ends_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "startsAt": _format_time(existing["starts_at"] if existing else now),
+            "endsAt": _format_time(ends_at),
             "comment": comment,
-            "createdBy": "Slack Bot"
+            "createdBy": CREATED_BY,
         }
-        
-        response = httpx.post(
-            url,
-            json=payload,
-            auth=auth,
-            timeout=10.0
-        )
-        response.raise_for_status()
-        
-        result = response.json()
-        silence_id = result.get("silenceID")
-        
-        print(f"✅ Grafana Silence 생성 성공: silence_id={silence_id}, duration={duration_minutes}분")
-        return silence_id
-        
-    except Exception as e:
-        print(f"❌ Grafana Silence 생성 실패: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
-
-
-def mute_incident_via_grafana(
-    alertname: str,
-    cluster: str = None,
-    namespace: str = None,
-    phase: str = None,
-    service: str = None,
-    duration_minutes: int = 30,
-    user: str = "unknown"
-) -> bool:
-    """
-    Incident를 Grafana Silence로 음소거
-    
-    Args:
-        alertname: 알람 이름
-        cluster: 클러스터
-        namespace: 네임스페이스
-        phase: 환경
-        service: 서비스
-        duration_minutes: 음소거 시간 (분)
-        user: 사용자
-    
-    Returns: 성공 여부
-    """
-    comment = f"Muted from Slack by {user} for {duration_minutes} minutes"
-    silence_id = create_grafana_silence(
-        alertname=alertname,
-        cluster=cluster,
-        namespace=namespace,
-        phase=phase,
-        service=service,
-        duration_minutes=duration_minutes,
-        comment=comment
-    )
-    
-    return silence_id is not None
+        if existing:
+            # id를 포함하면 Alertmanager가 같은 Silence를 갱신
+            payload["id"] = existing["id"]
+
+        try:
+            response = await http_clients.apost("grafana", SILENCES_URL, json=payload, auth=self._auth)
+            response.raise_for_status()
+            silence_id = response.json().get("silenceID")
+        except Exception as e:
+            self.failed += 1
+            self.last_error = str(e)
+            print(f"❌ Grafana Silence {'연장' if existing else '생성'} 실패: {e}")
+            return None
+
+        self._active[key] = {"id": silence_id, "starts_at": existing["starts_at"] if existing else now,
+                             "ends_at": ends_at, "updated": time.monotonic()}
+        if existing:
+            self.extended += 1
+            print(f"✅ Grafana Silence 연장: silence_id={silence_id}, duration={duration_minutes}분")
+            return silence_id, "extended"
+        self.created += 1
+        print(f"✅ Grafana Silence 생성: silence_id={silence_id}, duration={duration_minutes}분")
+        return silence_id, "created"
+
+    async def mute_many(self, targets: Dict[str, List[Dict[str, Any]]], duration_minutes: int,
+                        comment: str = "Muted from Slack") -> Dict[str, Optional[Tuple[str, str]]]:
+        """
+        일괄 Mute (matcher가 같은 대상은 Silence 하나로 처리)
+
+        Args:
+            targets: 대상 ID(incident_id 등) → matchers
+
+        Returns: 대상 ID → mute() 결과
+        """
+        groups: Dict[MatcherKey, List[str]] = {}
+        matchers_by_key: Dict[MatcherKey, List[Dict[str, Any]]] = {}
+        for target_id, matchers in targets.items():
+            key = matcher_key(matchers)
+            groups.setdefault(key, []).append(target_id)
+            matchers_by_key[key] = matchers
+
+        keys = list(groups)
+        results = await asyncio.gather(*(self.mute(matchers_by_key[key], duration_minutes, comment) for key in keys))
+        return {target_id: result for key, result in zip(keys, results) for target_id in groups[key]}
+
+    def mute_blocking(self, matchers: List[Dict[str, Any]], duration_minutes: int,
+                      comment: str = "Muted from Slack") -> Optional[Tuple[str, str]]:
+        """
+        동기 코드(액션 처리 스레드)에서 mute() 호출 - 이벤트 루프에서 실행 후 결과 대기
+        이벤트 루프 안에서는 호출하지 않음 (await mute() 사용)
+        """
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            self.failed += 1
+            print("❌ Grafana Silence 관리자가 시작되지 않았습니다")
+            return None
+        future = asyncio.run_coroutine_threadsafe(self.mute(matchers, duration_minutes, comment), loop)
+        try:
+            return future.result(timeout=GRAFANA_SILENCE_TIMEOUT_SECONDS)
+        except Exception as e:
+            future.cancel()
+            self.failed += 1
+            print(f"❌ Grafana Silence 요청 대기 실패: {e}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """캐시 크기 및 생성 / 연장 / 재사용 통계"""
+        return {
+            "active_silences": len(self._active),
+            "created": self.created,
+            "extended": self.extended,
+            "reused": self.reused,
+            "failed": self.failed,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "last_refresh_at": self.last_refresh_at,
+            "last_error": self.last_error,
+        }
+
 
+# 프로세스 공용 관리자
+silence_manager = SilenceManager()
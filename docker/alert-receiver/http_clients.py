@@ -0,0 +1,199 @@
+"""
+외부 연동 HTTP 클라이언트 (연결 재사용)
+Slack API / Slack Webhook / Grafana / Ollama 호출이 upstream별 keep-alive 클라이언트를 공유
+
+- 요청마다 새 연결과 TLS handshake를 만들지 않음
+- upstream별 연결 한도 / timeout
+- slack_sdk WebClient도 프로세스에서 하나만 생성
+- upstream별 요청 수 / 오류 / 지연 시간 통계
+- 종료 시 registry.aclose()로 연결 정리
+
+사용법:
+    response = http_clients.post("grafana", url, json=payload, auth=auth)
+    response = await http_clients.apost("grafana", url, json=payload, auth=auth)
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import httpx
+
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20"))  # upstream당
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "10"))  # upstream당
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "3"))
+
+# upstream별 응답 대기 timeout (초)
+UPSTREAM_TIMEOUTS = {
+    "slack_api": float(os.getenv("SLACK_HTTP_TIMEOUT_SECONDS", "10")),
+    "slack_webhook": float(os.getenv("SLACK_WEBHOOK_TIMEOUT_SECONDS", "5")),
+    "grafana": float(os.getenv("GRAFANA_HTTP_TIMEOUT_SECONDS", "10")),
+    "ollama": float(os.getenv("OLLAMA_HTTP_TIMEOUT_SECONDS", "120")),  # LLM 생성은 오래 걸림
+}
+
+SLACK_API_BASE_URL = "https://slack.com/api/"
+
+LATENCY_SAMPLES = 512  # p95 계산용 최근 표본 수
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS
+    )
+
+
+def _timeout(upstream: str) -> httpx.Timeout:
+    return httpx.Timeout(UPSTREAM_TIMEOUTS[upstream], connect=HTTP_CONNECT_TIMEOUT_SECONDS)
+
+
+class UpstreamStats:
+    """upstream별 요청 지연 시간 통계"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._samples = deque(maxlen=LATENCY_SAMPLES)
+
+    def record(self, elapsed_ms: float, error: bool):
+        self.requests += 1
+        if error:
+            self.errors += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self._samples.append(elapsed_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        samples = sorted(self._samples)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.requests, 1) if self.requests else 0,
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1) if samples else 0,
+            "max_ms": round(self.max_ms, 1),
+        }
+
+
+class ClientRegistry:
+    """upstream별 httpx.Client / AsyncClient와 공용 Slack WebClient 관리"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[str, httpx.Client] = {}
+        self._async_clients: Dict[str, httpx.AsyncClient] = {}
+        self._web_client = None
+        self._web_client_token: Optional[str] = None
+        self._stats: Dict[str, UpstreamStats] = {name: UpstreamStats() for name in UPSTREAM_TIMEOUTS}
+
+    def client(self, upstream: str) -> httpx.Client:
+        """동기 클라이언트 (최초 호출 시 생성, 스레드 간 공유)"""
+        client = self._clients.get(upstream)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(upstream)
+                if client is None:
+                    client = self._clients[upstream] = httpx.Client(limits=_limits(), timeout=_timeout(upstream))
+        return client
+
+    def async_client(self, upstream: str) -> httpx.AsyncClient:
+        """비동기 클라이언트 (이벤트 루프에서만 사용)"""
+        client = self._async_clients.get(upstream)
+        if client is None:
+            with self._lock:
+                client = self._async_clients.get(upstream)
+                if client is None:
+                    client = self._async_clients[upstream] = httpx.AsyncClient(limits=_limits(), timeout=_timeout(upstream))
+        return client
+
+    def web_client(self, token: str):
+        """
+        공용 slack_sdk WebClient (views_open, conversations_history, Socket Mode 등)
+        token이 바뀌면 새로 생성
+        """
+        if self._web_client is None or self._web_client_token != token:
+            from slack_sdk import WebClient
+            with self._lock:
+                if self._web_client is None or self._web_client_token != token:
+                    self._web_client = WebClient(token=token, timeout=int(UPSTREAM_TIMEOUTS["slack_api"]))
+                    self._web_client_token = token
+        return self._web_client
+
+    @contextmanager
+    def timed(self, upstream: str):
+        """블록 실행 시간을 upstream 통계에 기록 (WebClient 호출 등 httpx 외 요청용)"""
+        started = time.monotonic()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            self.record(upstream, (time.monotonic() - started) * 1000, error)
+
+    def record(self, upstream: str, elapsed_ms: float, error: bool):
+        with self._lock:
+            self._stats[upstream].record(elapsed_ms, error)
+
+    def request(self, upstream: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """동기 요청 (5xx 응답과 연결 오류는 오류로 집계)"""
+        started = time.monotonic()
+        response = None
+        try:
+            response = self.client(upstream).request(method, url, **kwargs)
+            return response
+        finally:
+            self.record(upstream, (time.monotonic() - started) * 1000,
+                        response is None or response.status_code >= 500)
+
+    async def arequest(self, upstream: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """비동기 요청 (5xx 응답과 연결 오류는 오류로 집계)"""
+        started = time.monotonic()
+        response = None
+        try:
+            response = await self.async_client(upstream).request(method, url, **kwargs)
+            return response
+        finally:
+            self.record(upstream, (time.monotonic() - started) * 1000,
+                        response is None or response.status_code >= 500)
+
+    def close(self):
+        """동기 클라이언트 종료"""
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            client.close()
+
+    async def aclose(self):
+        """동기 + 비동기 클라이언트 종료 (shutdown 시 호출)"""
+        with self._lock:
+            async_clients, self._async_clients = self._async_clients, {}
+        for client in async_clients.values():
+            await client.aclose()
+        self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """upstream별 지연 시간 통계"""
+        with self._lock:
+            return {
+                name: dict(stats.snapshot(), open_client=name in self._clients or name in self._async_clients)
+                for name, stats in self._stats.items()
+            }
+
+
+# 프로세스 공용 registry
+registry = ClientRegistry()
+
+
+def post(upstream: str, url: str, **kwargs) -> httpx.Response:
+    """registry.request("POST", ...) 단축"""
+    return registry.request(upstream, "POST", url, **kwargs)
+
+
+async def apost(upstream: str, url: str, **kwargs) -> httpx.Response:
+    """registry.arequest("POST", ...) 단축"""
+    return await registry.arequest(upstream, "POST", url, **kwargs)
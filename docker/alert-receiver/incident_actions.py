@@ -0,0 +1,671 @@
+"""
+Incident 액션 디스패처 (Ack / Resolve / Mute / AI 분석)
+HTTP 인터랙션(/slack/interactions)과 Socket Mode(버튼, 리액션, 모달 제출)가 같은 처리 경로 사용
+
+- 멱등성 캐시: (action, incident_id, Slack action_ts / event_id / view id)가 같은 요청은 O(1)로 무시
+  (Slack 재전송, 같은 요청의 중복 수신)
+- 이미 같은 시간 이상 Mute한 Incident는 Grafana Silence / 스레드 댓글 없이 종료 (버튼 더블 클릭)
+- ACK / Resolve는 open incident 인덱스(프로세스별 힌트 - 다른 replica의 변경은 모름)로 건너뛰지 않고
+  항상 DB에서 판단, 이미 목표 상태면 스레드 댓글 없이 종료
+- ACK / Resolve UPDATE에 상태 조건 → 인덱스에 없는 Incident나 다른 replica와의 경합에서도 한 번만 반영
+- Mute는 grafana_silence.silence_manager 경유 → 같은 matcher의 활성 Silence는 새로 만들지 않고 연장
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import http_clients
+import slack_sender
+from ai_worker import ai_pool, AIQueueFull  # AI 분석 작업 풀
+from card_refresher import card_refresher  # 카드 갱신 (chat.update debounce)
+from db_pool import get_db_connection
+from grafana_silence import build_matchers, silence_manager
+from incident_index import open_incidents
+from incident_service import acknowledge_incident, resolve_incident, get_incident_info, get_mute_targets
+from similar_incidents import similar_index  # 해결된 Incident 유사도 검색 인덱스
+from slack_interactions import extract_button_action
+from slack_scheduler import PRIORITY_NORMAL
+from slack_sender import send_thread_reply, send_response_url, post_thread_message, StreamingThreadMessage  # 모든 메시지 전송은 전송 큐 경유
+
+ACTION_IDEMPOTENCY_TTL_SECONDS = int(os.getenv("ACTION_IDEMPOTENCY_TTL_SECONDS", "600"))  # 처리한 요청 기억 시간
+ACTION_IDEMPOTENCY_SIZE = int(os.getenv("ACTION_IDEMPOTENCY_SIZE", "10000"))  # 기억할 최대 요청 수
+
+# Mute 액션 → (분, 표시)
+MUTE_DURATIONS = {
+    "mute_30m": (30, "30분"),
+    "mute_2h": (120, "2시간"),
+    "mute_24h": (1440, "24시간"),
+}
+
+# 액션별 목표 상태 (이미 이 상태면 처리하지 않음)
+TARGET_STATES = {
+    "ack": ("acknowledged", "resolved"),
+    "resolve": ("resolved",),
+}
+
+IdempotencyKey = Tuple[str, str, str]
+
+
+class IdempotencyCache:
+    """처리한 (action, incident_id, dedupe_id) 기록 (TTL 고정 → 삽입 순서 = 만료 순서)"""
+
+    def __init__(self, max_size: int = ACTION_IDEMPOTENCY_SIZE, ttl: int = ACTION_IDEMPOTENCY_TTL_SECONDS):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._seen: "OrderedDict[IdempotencyKey, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: IdempotencyKey) -> bool:
+        """
+        처음 보는 요청이면 기록
+
+        Returns: 처음 보는 요청이면 True, TTL 안에 이미 받은 요청이면 False
+        """
+        now = time.monotonic()
+        with self._lock:
+            # 앞쪽(오래된 항목)부터 만료분 제거 - 요청당 상수 시간 (amortized)
+            while self._seen:
+                oldest_key, expires_at = next(iter(self._seen.items()))
+                if expires_at > now:
+                    break
+                del self._seen[oldest_key]
+            if key in self._seen:
+                return False
+            # 크기 초과분은 중복 확인 뒤에 제거 (가장 오래된 항목의 재전송도 중복으로 판단)
+            while len(self._seen) >= self.max_size:
+                self._seen.popitem(last=False)
+            self._seen[key] = now + self.ttl
+            return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._seen)
+
+
+def user_name_of(user: Dict[str, Any]) -> str:
+    return user.get("name", user.get("id", "unknown"))
+
+
+def reply(text: str, channel: Optional[str], message_ts: Optional[str], response_url: Optional[str] = None):
+    """
+    액션 결과 알림 (전송 큐 경유)
+    카드 스레드 댓글, 카드 위치를 모르면 response_url로 ephemeral 메시지
+    """
+    if channel and message_ts:
+        # 같은 스레드에 아직 전송되지 않은 댓글이 있으면 하나로 합쳐짐
+        send_thread_reply(message_ts, text, channel)
+    elif response_url:
+        send_response_url(response_url, text, channel)
+
+
+def interaction_key(payload: Dict[str, Any]) -> Optional[str]:
+    """
+    인터랙션 처리 순서 key (interaction_executor) - HTTP / Socket Mode 공통
+    Incident 카드 message_ts (버튼 / 모달 제출), 없으면 incident_id
+    """
+    if payload.get("type") == "view_submission":
+        try:
+            metadata = json.loads(payload.get("view", {}).get("private_metadata") or "{}")
+        except ValueError:
+            return None
+        return metadata.get("message_ts") or metadata.get("incident_id")
+
+    key = payload.get("message", {}).get("ts")
+    if not key:
+        try:
+            key = json.loads(payload["actions"][0]["value"]).get("incident_id")
+        except (KeyError, IndexError, TypeError, ValueError):
+            key = None
+    return key
+
+
+class ActionDispatcher:
+    """버튼 / 리액션 / 모달 제출 공용 Incident 액션 처리"""
+
+    def __init__(self):
+        self.idempotency = IdempotencyCache()
+        self._lock = threading.Lock()
+        self._muted_until: Dict[str, float] = {}  # incident_id → 이 프로세스에서 만든 Silence 만료 시각
+
+        # 통계
+        self.actions: Dict[str, int] = {}
+        self.duplicates = 0
+        self.noops = 0
+        self.failed = 0
+
+    def _accept(self, action: str, incident_id: str, dedupe_id: Optional[str]) -> bool:
+        """멱등성 확인 (같은 요청이면 False)"""
+        if dedupe_id and not self.idempotency.add((action, incident_id, dedupe_id)):
+            with self._lock:
+                self.duplicates += 1
+            print(f"🔁 중복 인터랙션 무시: action={action}, incident_id={incident_id}, id={dedupe_id}")
+            return False
+        with self._lock:
+            self.actions[action] = self.actions.get(action, 0) + 1
+        return True
+
+    def _noop(self, action: str, incident_id: str, reason: str):
+        with self._lock:
+            self.noops += 1
+        print(f"⏭️  {reason}: action={action}, incident_id={incident_id}")
+
+    def dispatch(self, action: str, incident_id: str, user: Dict[str, Any], channel: Optional[str],
+                 message_ts: Optional[str], dedupe_id: Optional[str] = None,
+                 incident_key: Optional[str] = None, trigger_id: Optional[str] = None,
+                 response_url: Optional[str] = None):
+        """
+        Incident 액션 처리 (interaction_executor 등 이벤트 루프 밖의 스레드에서 호출)
+
+        Args:
+            action: ack, resolve, mute_30m / mute_2h / mute_24h, ai_analysis
+            user: Slack 사용자 {"id", "name"}
+            channel, message_ts: Incident 카드 위치 (결과 댓글 / 카드 갱신)
+            dedupe_id: 버튼 action_ts, 리액션 event_id - 같은 값으로 다시 들어온 요청은 무시
+            trigger_id: 있으면 resolve는 모달을 열고 제출 시 처리 (resolve_with_details)
+            response_url: 카드 위치를 모를 때 결과를 알릴 인터랙션 response_url
+        """
+        if not action or not incident_id:
+            print(f"⚠️  action 또는 incident_id가 없음: action={action}, incident_id={incident_id}")
+            return
+        if not self._accept(action, incident_id, dedupe_id):
+            return
+
+        try:
+            if action in TARGET_STATES:
+                self._update_status(action, incident_id, incident_key, user, channel, message_ts, trigger_id,
+                                    response_url)
+            elif action in MUTE_DURATIONS:
+                self._mute(action, incident_id, user, channel, message_ts, response_url)
+            elif action == "ai_analysis":
+                # AI 분석은 AI 작업 풀에서 처리 (같은 Incident의 진행 중 분석은 결과 공유)
+                request_ai_analysis(incident_id, channel, message_ts)
+            else:
+                print(f"⚠️  알 수 없는 액션: {action}")
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            print(f"❌ 인터랙션 처리 실패: {e}")
+            import traceback
+            traceback.print_exc()
+            reply(f"❌ *처리 중 오류 발생*\n- action: {action}\n- error: {str(e)}", channel, message_ts, response_url)
+
+    def _update_status(self, action: str, incident_id: str, incident_key: Optional[str], user: Dict[str, Any],
+                       channel: Optional[str], message_ts: Optional[str], trigger_id: Optional[str],
+                       response_url: Optional[str] = None):
+        """
+        ACK / Resolve (이미 목표 상태면 아무것도 하지 않음)
+        목표 상태 판단은 DB 기준 (상태 조건 UPDATE + 실패 시 재조회) - open incident 인덱스는
+        다른 replica가 다시 active로 만든 경우를 모르므로 건너뛰는 데 쓰지 않음
+        """
+        targets = TARGET_STATES[action]
+
+        if action == "resolve" and trigger_id and slack_sender.SLACK_BOT_TOKEN:
+            # Resolve는 모달 제출 시 처리 (조치 내용 / 근본 원인 없이 Resolve하지 않음)
+            if not self._open_resolve_modal(incident_id, incident_key, channel, message_ts, trigger_id):
+                with self._lock:
+                    self.failed += 1
+                retry_text = "⚠️ *Resolve 창을 열지 못했습니다*\n잠시 후 Resolve 버튼을 다시 눌러주세요."
+                if response_url:
+                    send_response_url(response_url, retry_text, channel)
+                else:
+                    reply(retry_text, channel, message_ts, response_url)
+            return
+
+        conn = get_db_connection()
+        current = None
+        try:
+            conn.autocommit(False)
+            if action == "ack":
+                success = acknowledge_incident(conn, incident_id, user_name_of(user))
+            else:
+                success = resolve_incident(conn, incident_id, user_name_of(user))
+            if success:
+                conn.commit()
+                # 인덱스는 commit이 성공한 뒤에만 갱신 (rollback된 상태가 인덱스에 남지 않음)
+                if action == "ack":
+                    open_incidents.update(incident_id, status="acknowledged")
+                else:
+                    open_incidents.remove(incident_id)
+            else:
+                conn.rollback()
+                current = get_incident_info(conn, incident_id)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        if not success and current and current.get("status") in targets:
+            # UPDATE 상태 조건에 걸림 → 다른 요청 / replica가 먼저 처리
+            self._noop(action, incident_id, "이미 처리된 Incident")
+            return
+
+        name = user.get("name", "unknown")
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if success:
+            card_refresher.request(incident_id, message_ts, channel)  # 카드 Status 갱신
+            if action == "resolve":
+                similar_index.index_incident(incident_id)  # 유사 사건 인덱스에 추가
+                reply_text = f"✅ *Incident RESOLVED*\n- by @{name}\n- at {now}"
+            else:
+                reply_text = f"👀 *Incident ACK 처리됨*\n- by @{name}\n- at {now}"
+        elif action == "resolve":
+            reply_text = f"❌ *Incident Resolve 실패*\n- incident_id: {incident_id}\n- by @{name}"
+        else:
+            reply_text = f"❌ *Incident ACK 실패*\n- incident_id: {incident_id}\n- by @{name}"
+
+        reply(reply_text, channel, message_ts, response_url)
+
+    def _open_resolve_modal(self, incident_id: str, incident_key: Optional[str], channel: Optional[str],
+                            message_ts: Optional[str], trigger_id: str) -> bool:
+        """Resolve 모달 열기 (trigger_id는 3초 안에 사용해야 함), 이미 Resolve된 Incident면 열지 않음"""
+        if open_incidents.status(incident_id) is None:
+            # 인덱스에 없음 → 이미 Resolve됐는지 DB로 확인 (PK 조회)
+            conn = get_db_connection()
+            try:
+                incident_info = get_incident_info(conn, incident_id)
+            finally:
+                conn.close()
+            if incident_info and incident_info.get("status") == "resolved":
+                self._noop("resolve", incident_id, "이미 처리된 Incident")
+                return True
+
+        try:
+            web_client = http_clients.registry.web_client(slack_sender.SLACK_BOT_TOKEN)
+            # channel과 message_ts를 모달에 전달하기 위해 private_metadata에 포함
+            modal = create_resolve_modal(incident_id, incident_key, channel, message_ts)
+            with http_clients.registry.timed("slack_api"):
+                web_client.views_open(trigger_id=trigger_id, view=modal)
+            print(f"✅ Resolve 모달 열기 성공: incident_id={incident_id}")
+            return True
+        except Exception as e:
+            print(f"❌ 모달 열기 실패: {e}")
+            return False
+
+    def _mute(self, action: str, incident_id: str, user: Dict[str, Any],
+              channel: Optional[str], message_ts: Optional[str], response_url: Optional[str] = None):
+        """Grafana Silence 생성 / 연장 (이미 요청 시간 이상 Mute했으면 생략)"""
+        duration_minutes, duration_text = MUTE_DURATIONS[action]
+        until = time.time() + duration_minutes * 60
+        with self._lock:
+            already_muted = self._muted_until.get(incident_id, 0) >= until
+        if already_muted:
+            self._noop(action, incident_id, "이미 Mute된 Incident")
+            return
+
+        # Incident + 최근 알람의 label 조회 (alertname, cluster, namespace 등)
+        conn = get_db_connection()
+        try:
+            target = get_mute_targets(conn, [incident_id]).get(incident_id)
+        finally:
+            conn.close()  # Grafana 호출 동안 DB 연결을 잡지 않음
+
+        if not target:
+            print(f"⚠️  Mute 대상 Incident / 알람을 찾을 수 없습니다: incident_id={incident_id}")
+            reply(f"❌ *Grafana Silence 생성 실패*\n- Incident 또는 알람을 찾을 수 없습니다: {incident_id}",
+                  channel, message_ts, response_url)
+            return
+
+        # 같은 matcher의 활성 Silence가 있으면 연장 (silence_manager, 이벤트 루프에서 실행)
+        result = silence_manager.mute_blocking(
+            build_matchers(**target),
+            duration_minutes,
+            comment=f"Muted from Slack by {user_name_of(user)} for {duration_minutes} minutes"
+        )
+
+        name = user.get("name", "unknown")
+        if result:
+            now = time.time()
+            with self._lock:
+                self._muted_until = {key: value for key, value in self._muted_until.items() if value > now}
+                self._muted_until[incident_id] = until
+            silence_id, outcome = result
+            if outcome == "existing":
+                self._noop(action, incident_id, f"같은 조건의 Silence가 이미 활성 상태 (silence_id={silence_id})")
+                return
+            verb = "연장됨" if outcome == "extended" else "생성됨"
+            reply_text = f"🔕 *Grafana Silence {verb}*\n- duration: {duration_text}\n- by @{name}"
+        else:
+            reply_text = f"❌ *Grafana Silence 생성 실패*\n- duration: {duration_text}\n- by @{name}"
+
+        reply(reply_text, channel, message_ts, response_url)
+
+    def resolve_with_details(self, incident_id: str, user: Dict[str, Any], channel: Optional[str],
+                             message_ts: Optional[str], action_taken: str = "", root_cause: str = "",
+                             dedupe_id: Optional[str] = None):
+        """
+        Resolve 모달 제출 처리 (Resolve + 조치 내용 / 근본 원인 저장)
+        빈 응답으로 모달은 바로 닫히므로, 처리 실패는 원본 메시지 스레드에 알림
+
+        Args:
+            dedupe_id: view id - 같은 모달 제출이 다시 들어오면 무시
+        """
+        if not incident_id or not self._accept("resolve_submit", incident_id, dedupe_id):
+            return
+
+        conn = get_db_connection()
+        current = None
+        try:
+            conn.autocommit(False)
+            success = resolve_incident(conn, incident_id, user_name_of(user), action_taken, root_cause)
+            if success:
+                conn.commit()
+                open_incidents.remove(incident_id)
+            else:
+                conn.rollback()
+                current = get_incident_info(conn, incident_id)
+        except Exception as e:
+            conn.rollback()
+            with self._lock:
+                self.failed += 1
+            print(f"❌ 모달 제출 처리 실패: {e}")
+            import traceback
+            traceback.print_exc()
+            if channel and message_ts:
+                post_thread_message(channel, message_ts,
+                                    f"❌ *Incident Resolve 실패*\n- incident_id: {incident_id}\n- error: {e}")
+            return
+        finally:
+            conn.close()
+
+        if not success:
+            if current and current.get("status") == "resolved":
+                self._noop("resolve_submit", incident_id, "이미 처리된 Incident")
+            elif channel and message_ts:
+                post_thread_message(channel, message_ts,
+                                    f"❌ *Incident Resolve 실패*\n- incident_id: {incident_id}")
+            return
+
+        print(f"✅ Incident Resolve 완료: {incident_id}")
+        card_refresher.request(incident_id, message_ts, channel)
+        similar_index.index_incident(incident_id)  # action_taken / root_cause 포함하여 색인
+
+        # 원본 메시지 스레드에 댓글 추가
+        if channel and message_ts and slack_sender.SLACK_BOT_TOKEN:
+            reply_text = f"✅ *Incident RESOLVED*\n- by @{user.get('name', 'unknown')}\n- at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            if action_taken:
+                reply_text += f"\n- *조치 내용:* {action_taken[:200]}"
+            if root_cause:
+                reply_text += f"\n- *근본 원인:* {root_cause[:200]}"
+            post_thread_message(channel, message_ts, reply_text)
+
+    def stats(self) -> Dict[str, Any]:
+        """액션별 처리 수 / 중복 / no-op 통계"""
+        with self._lock:
+            return {
+                "actions": dict(self.actions),
+                "duplicates": self.duplicates,
+                "noops": self.noops,
+                "failed": self.failed,
+                "idempotency_keys": len(self.idempotency),
+            }
+
+
+# 프로세스 공용 디스패처 (HTTP / Socket Mode 공통)
+action_dispatcher = ActionDispatcher()
+
+
+def handle_block_actions(payload: Dict[str, Any], source: str = "HTTP"):
+    """
+    버튼 클릭 payload 처리 (HTTP 인터랙션 / Socket Mode 공통)
+
+    Args:
+        source: 로그용 경로 이름
+    """
+    action_info = extract_button_action(payload)
+    if not action_info:
+        print("⚠️  버튼 액션을 찾을 수 없음")
+        return
+
+    value = action_info["value"]
+    user = action_info["user"]
+    print(f"🔘 Slack 인터랙션 ({source}): {action_info['action_id']} - incident_id={value.get('incident_id')}, user={user.get('name', 'unknown')}")
+    action_dispatcher.dispatch(
+        action=value.get("action"),
+        incident_id=value.get("incident_id"),
+        user=user,
+        channel=action_info.get("channel"),
+        message_ts=action_info.get("message_ts"),
+        dedupe_id=action_info.get("action_ts"),
+        incident_key=value.get("incident_key"),
+        trigger_id=action_info.get("trigger_id"),
+        response_url=action_info.get("response_url"),
+    )
+
+
+def is_resolve_click(payload: Dict[str, Any]) -> bool:
+    """
+    모달을 여는 Resolve 버튼 클릭인지 확인
+    trigger_id는 3초 안에 사용해야 하므로 같은 카드의 순서 대기열(interaction_executor)을 거치지 않고 바로 처리
+    """
+    if not slack_sender.SLACK_BOT_TOKEN:
+        return False
+    action_info = extract_button_action(payload)
+    return bool(action_info and action_info["trigger_id"] and action_info["value"].get("action") == "resolve")
+
+
+def handle_view_submission(payload: Dict[str, Any]):
+    """View Submission (Resolve 모달 제출) payload 처리 (HTTP 인터랙션 / Socket Mode 공통)"""
+    view = payload.get("view", {})
+    try:
+        metadata = json.loads(view.get("private_metadata") or "{}")
+    except ValueError as e:
+        print(f"❌ 모달 제출 파싱 실패: {e}")
+        return
+
+    # 입력값 추출
+    values = view.get("state", {}).get("values", {})
+    action_taken = values.get("action_taken", {}).get("action_input", {}).get("value") or ""
+    root_cause = values.get("root_cause", {}).get("root_cause_input", {}).get("value") or ""
+    incident_id = metadata.get("incident_id")
+
+    print(f"📝 모달 제출: incident_id={incident_id}, action_taken={action_taken[:50]}..., root_cause={root_cause[:50]}...")
+    action_dispatcher.resolve_with_details(
+        incident_id=incident_id,
+        user=payload.get("user", {}),
+        channel=metadata.get("channel"),
+        message_ts=metadata.get("message_ts"),
+        action_taken=action_taken,
+        root_cause=root_cause,
+        dedupe_id=view.get("id"),
+    )
+
+
+def run_ai_analysis(incident_id: str, on_text=None) -> Optional[Dict[str, Any]]:
+    """
+    AI 작업 풀 워커에서 실행: Incident / 관련 알람 조회 후 analyze_incident
+    AI_STREAMING_ENABLED면 생성 중인 텍스트를 on_text로 전달
+    
+    Returns: 분석 결과, Incident가 없으면 None
+    """
+    from incident_ai import analyze_incident, analyze_incident_stream, load_analysis_input, AI_STREAMING_ENABLED
+    
+    conn = get_db_connection()
+    try:
+        incident_info, formatted_alerts = load_analysis_input(conn, incident_id)
+    finally:
+        conn.close()  # 추론 동안 DB 연결을 잡지 않음
+    
+    if not incident_info:
+        print(f"⚠️  AI 분석: Incident 정보를 찾을 수 없습니다: {incident_id}")
+        return None
+    
+    print(f"🤖 AI 분석 시작: incident_id={incident_id}, alerts={len(formatted_alerts)}")
+    if AI_STREAMING_ENABLED:
+        analysis = analyze_incident_stream(incident_info, formatted_alerts, on_text)
+    else:
+        analysis = analyze_incident(incident_info, formatted_alerts)
+    print(f"🤖 AI 분석 완료: incident_id={incident_id}, suggestion={bool(analysis.get('action_taken_suggestion'))}, root_cause={bool(analysis.get('root_cause_analysis'))}")
+    return analysis
+
+
+def request_ai_analysis(incident_id: str, channel: str, message_ts: str):
+    """
+    AI 분석 요청 (AI 작업 풀에 넣고 바로 반환)
+    - 같은 Incident의 분석이 대기 / 진행 중이면 그 결과를 공유
+    - 대기 순서를 스레드에 알리고, 완료되면 결과를 스레드에 댓글로 추가
+    - AI_STREAMING_ENABLED면 안내 메시지를 생성 중인 텍스트로 갱신하다가 최종 결과로 교체
+    """
+    from incident_ai import AI_STREAMING_ENABLED
+    
+    if not (message_ts and channel and slack_sender.SLACK_BOT_TOKEN):
+        print(f"⚠️  SLACK_BOT_TOKEN, message_ts, 또는 channel이 없어 AI 분석 결과를 전송할 수 없습니다.")
+        return
+    
+    try:
+        job, is_new_subscriber, position = ai_pool.submit(
+            incident_id, lambda job: run_ai_analysis(incident_id, job.progress), subscriber=(channel, message_ts)
+        )
+    except AIQueueFull as e:
+        print(f"⚠️  {e}: incident_id={incident_id}")
+        post_thread_message(channel, message_ts, "⚠️ *AI 분석 요청이 많습니다*\n잠시 후 다시 시도해주세요.", PRIORITY_NORMAL)
+        return
+    
+    if not is_new_subscriber:
+        # 같은 스레드에서 이미 요청한 분석 → 결과는 한 번만 전송
+        print(f"🔁 AI 분석 이미 진행 중: incident_id={incident_id}")
+        return
+    
+    if position:
+        placeholder = f"🤖 *AI 분석 대기 중...* (대기 순서: {position}번째)"
+    else:
+        placeholder = "🤖 *AI 분석 시작 중...*"
+    print(f"✅ AI 분석 요청: incident_id={incident_id}, position={position}")
+    
+    if AI_STREAMING_ENABLED:
+        stream = StreamingThreadMessage(channel, message_ts, placeholder)
+        job.add_listener(lambda text: stream.update(format_ai_progress(text)))
+        reply = stream.finish
+    else:
+        post_thread_message(channel, message_ts, placeholder)
+        reply = lambda text, priority: post_thread_message(channel, message_ts, text, priority)
+    
+    job.future.add_done_callback(lambda future: post_ai_analysis_result(future, incident_id, channel, message_ts, reply))
+
+
+def format_ai_progress(text: str) -> str:
+    """생성 중인 AI 응답 표시 (Slack 메시지 길이 제한 내 마지막 부분)"""
+    return f"🤖 *AI 분석 중...*\n```{text[-2500:]}```"
+
+
+def post_ai_analysis_result(future, incident_id: str, channel: str, message_ts: str, reply):
+    """
+    AI 분석 결과(또는 실패 사유)를 스레드에 전송
+    
+    Args:
+        reply: reply(text, priority) - 새 댓글 또는 스트리밍 메시지 최종 갱신
+    """
+    error = future.exception()
+    if isinstance(error, TimeoutError):
+        print(f"⚠️  AI 분석 시간 초과: incident_id={incident_id}")
+        reply(f"⏱️ *AI 분석 시간 초과*\n{error}", PRIORITY_NORMAL)
+        return
+    if error is not None:
+        print(f"⚠️  AI 분석 오류: {error}")
+        reply(f"❌ *AI 분석 오류*\n{error}", PRIORITY_NORMAL)
+        return
+    
+    analysis = future.result()
+    if analysis is None:
+        reply("❌ *AI 분석 실패*\nIncident 정보를 찾을 수 없습니다.", PRIORITY_NORMAL)
+        return
+    
+    # AI 분석 결과를 스레드에 코멘트로 추가
+    if analysis.get("action_taken_suggestion") or analysis.get("root_cause_analysis"):
+        ai_comment = "*🤖 AI 분석 결과*\n\n"
+        if analysis.get("action_taken_suggestion"):
+            ai_comment += f"*조치 제안:*\n{analysis.get('action_taken_suggestion')}\n\n"
+        if analysis.get("root_cause_analysis"):
+            ai_comment += f"*근본 원인 분석:*\n{analysis.get('root_cause_analysis')}"
+        
+        reply(ai_comment, PRIORITY_NORMAL)
+        print(f"✅ AI 분석 코멘트 전송 예약: incident_id={incident_id}, channel={channel}, thread_ts={message_ts}")
+    else:
+        print(f"⚠️  AI 분석 결과가 비어있습니다: incident_id={incident_id}")
+        reply("⚠️ *AI 분석 결과가 비어있습니다.*", PRIORITY_NORMAL)
+
+
+def create_resolve_modal(incident_id: str, incident_key: str, channel: str = None, message_ts: str = None) -> dict:
+    """
+    Resolve 모달 생성 (AI 제안은 나중에 업데이트)
+    """
+    # AI 분석은 모달을 먼저 열고 나중에 비동기로 처리
+    # trigger_id가 만료되기 전에 모달을 열어야 함
+    
+    # 모달 블록 구성 (AI 분석 없이 먼저 모달 열기)
+    blocks = [
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": f"*Incident ID:* `{incident_id}`\n*Signature:* `{incident_key}`"
+            }
+        },
+        {
+            "type": "divider"
+        },
+        {
+            "type": "input",
+            "block_id": "action_taken",
+            "element": {
+                "type": "plain_text_input",
+                "action_id": "action_input",
+                "multiline": True,
+                "placeholder": {
+                    "type": "plain_text",
+                    "text": "조치 내용을 입력하세요 (예: 서비스 재시작, 설정 변경 등)"
+                }
+            },
+            "label": {
+                "type": "plain_text",
+                "text": "조치 내용"
+            },
+            "optional": True
+        },
+        {
+            "type": "input",
+            "block_id": "root_cause",
+            "element": {
+                "type": "plain_text_input",
+                "action_id": "root_cause_input",
+                "multiline": True,
+                "placeholder": {
+                    "type": "plain_text",
+                    "text": "근본 원인을 입력하세요"
+                }
+            },
+            "label": {
+                "type": "plain_text",
+                "text": "근본 원인"
+            },
+            "optional": True
+        }
+    ]
+    
+    return {
+        "type": "modal",
+        "title": {
+            "type": "plain_text",
+            "text": "Incident Resolve"
+        },
+        "submit": {
+            "type": "plain_text",
+            "text": "Resolve"
+        },
+        "close": {
+            "type": "plain_text",
+            "text": "Cancel"
+        },
+        "blocks": blocks,
+        "private_metadata": json.dumps({
+            "incident_id": incident_id,
+            "incident_key": incident_key,
+            "channel": channel,
+            "message_ts": message_ts
+        })
+    }
+
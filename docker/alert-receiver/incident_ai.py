@@ -1,88 +1,36 @@
 """
 Incident AI 분석 모듈
 LangChain과 Ollama를 사용하여 로컬 AI로 Incident 분석 및 조치 제안
+
+langchain은 첫 LangChain 분석 시 import (앱 시작 / 스트리밍 경로에서는 import하지 않음)
+LLM과 LLMChain은 프로세스에서 한 번만 생성하여 재사용
 """
 import os
 import json
-from typing import Dict, Any, Optional
+import threading
+import time
+from typing import Dict, Any, Optional, Callable, Iterator, Tuple
 from datetime import datetime
 
-try:
-    from langchain_community.llms import Ollama
-    from langchain.prompts import PromptTemplate
-    from langchain.chains import LLMChain
-    LANGCHAIN_AVAILABLE = True
-except ImportError:
-    LANGCHAIN_AVAILABLE = False
-    print("⚠️  langchain 또는 langchain-community가 설치되지 않았습니다.")
+import http_clients
+from ai_cache import AI_CACHE_ENABLED, ai_cache, analysis_digest
+from prompt_context import AI_CONTEXT_MAX_ALERTS, build_alert_context
+from similar_incidents import SIMILAR_INDEX_ENABLED, format_similar_incidents, similar_index
 
 # Ollama 설정
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")  # mistral 모델 사용
 
+# 프롬프트 버전 (프롬프트 / 모델 변경 시 올리면 이전 AI 분석 캐시를 사용하지 않음)
+PROMPT_VERSION = f"sre-v3:{OLLAMA_MODEL}"
 
-def get_ai_llm():
-    """
-    Ollama LLM 인스턴스 생성
-    """
-    if not LANGCHAIN_AVAILABLE:
-        return None
-    
-    try:
-        llm = Ollama(
-            base_url=OLLAMA_BASE_URL,
-            model=OLLAMA_MODEL,
-            temperature=0.7
-        )
-        return llm
-    except Exception as e:
-        print(f"⚠️  Ollama 연결 실패: {e}")
-        return None
+# 스트리밍: Slack 스레드에 생성 중인 결과를 표시 (LangChain 대신 Ollama API 직접 호출)
+AI_STREAMING_ENABLED = os.getenv("AI_STREAMING_ENABLED", "true").lower() in ("1", "true", "yes")
 
 
-def analyze_incident(incident_info: Dict[str, Any], alerts: list) -> Dict[str, str]:
-    """
-    Incident를 AI로 분석하여 조치 제안 및 근본 원인 분석
-    
-    Args:
-        incident_info: Incident 정보 (incident_id, status, severity, cluster, namespace, phase, service 등)
-        alerts: 관련 알람 리스트 (alertname, message, labels 등)
-    
-    Returns:
-        {
-            "action_taken_suggestion": "제안된 조치 내용",
-            "root_cause_analysis": "근본 원인 분석",
-            "similar_incidents": "유사한 사건 패턴"
-        }
-    """
-    if not LANGCHAIN_AVAILABLE:
-        return {
-            "action_taken_suggestion": None,
-            "root_cause_analysis": None,
-            "similar_incidents": None
-        }
-    
-    llm = get_ai_llm()
-    if not llm:
-        return {
-            "action_taken_suggestion": None,
-            "root_cause_analysis": None,
-            "similar_incidents": None
-        }
-    
-    # 알람 정보 요약
-    alert_summary = []
-    for alert in alerts[:5]:  # 최대 5개만
-        alert_summary.append({
-            "alertname": alert.get("alertname", "Unknown"),
-            "message": alert.get("message", "")[:200],  # 처음 200자만
-            "labels": alert.get("labels", {})
-        })
-    
-    # 프롬프트 템플릿 (Google SRE 스타일 기반)
-    prompt_template = PromptTemplate(
-        input_variables=["incident_context", "alert_summary"],
-        template="""당신은 Google SRE(Site Reliability Engineering) 원칙을 따르는 DevOps 엔지니어입니다. 
+# 프롬프트 템플릿 (Google SRE 스타일 기반)
+# LangChain PromptTemplate과 스트리밍 경로(str.format)가 같은 템플릿 사용
+PROMPT_TEMPLATE = """당신은 Google SRE(Site Reliability Engineering) 원칙을 따르는 DevOps 엔지니어입니다. 
 다음 알람 정보를 분석하여 명확하고 실행 가능한 인시던트 코멘트를 작성해주세요.
 
 **인시던트 정보:**
@@ -91,12 +39,15 @@ def analyze_incident(incident_info: Dict[str, Any], alerts: list) -> Dict[str, s
 **관련 알람:**
 {alert_summary}
 
+**과거 유사 사건 (해결됨):**
+{similar_history}
+
 **지침:**
 1. Google SRE의 "Blameless Postmortem" 원칙을 따르며, 객관적이고 사실 기반으로 분석하세요.
 2. 모든 응답은 반드시 한글로 작성하세요.
 3. 조치 제안은 구체적이고 실행 가능해야 하며, 우선순위를 명시하세요.
 4. 근본 원인 분석은 알람 패턴, 시스템 상태, 리소스 사용량 등을 종합적으로 고려하세요.
-5. 유사 사건이 있다면 패턴을 간단히 설명하고, 없다면 "없음"으로 표시하세요.
+5. 과거 유사 사건이 있다면 그 근본 원인과 조치 내용을 참고하여 패턴을 간단히 설명하고, 없다면 "없음"으로 표시하세요.
 
 **응답 형식 (JSON):**
 {{
@@ -107,18 +58,96 @@ def analyze_incident(incident_info: Dict[str, Any], alerts: list) -> Dict[str, s
 
 **중요:** 모든 필드의 값은 반드시 한글로 작성하세요. 영어나 다른 언어를 사용하지 마세요.
 """
-    )
+
+EMPTY_ANALYSIS = {
+    "action_taken_suggestion": None,
+    "root_cause_analysis": None,
+    "similar_incidents": None
+}
+
+# LangChain 객체 (get_analysis_chain 최초 호출 시 생성)
+_chain_lock = threading.Lock()
+_llm = None
+_chain = None
+_langchain_missing = False
+
+
+def get_ai_llm():
+    """
+    Ollama LLM 인스턴스 (최초 호출 시 langchain import 후 생성, 이후 재사용)
+    langchain이 없거나 생성에 실패하면 None
+    """
+    global _llm, _langchain_missing
+    if _llm is not None or _langchain_missing:
+        return _llm
     
-    try:
-        # Incident 정보 포맷팅
-        start_time_str = ""
-        if incident_info.get("start_time"):
-            if isinstance(incident_info.get("start_time"), datetime):
-                start_time_str = incident_info.get("start_time").strftime("%Y-%m-%d %H:%M:%S")
-            else:
-                start_time_str = str(incident_info.get("start_time", ""))
+    with _chain_lock:
+        if _llm is not None or _langchain_missing:
+            return _llm
+        try:
+            from langchain_community.llms import Ollama
+        except ImportError:
+            _langchain_missing = True
+            print("⚠️  langchain 또는 langchain-community가 설치되지 않았습니다.")
+            return None
         
-        incident_context_text = f"""- Incident ID: {incident_info.get("incident_id", "Unknown")}
+        try:
+            started = time.monotonic()
+            _llm = Ollama(
+                base_url=OLLAMA_BASE_URL,
+                model=OLLAMA_MODEL,
+                temperature=0.7
+            )
+            print(f"🤖 Ollama LLM 생성: {time.monotonic() - started:.2f}초 (langchain import 포함)")
+        except Exception as e:
+            print(f"⚠️  Ollama 연결 실패: {e}")
+        return _llm
+
+
+def get_analysis_chain():
+    """
+    분석용 LLMChain (PROMPT_TEMPLATE + 공용 LLM, 한 번만 생성)
+    langchain이 없거나 LLM 생성에 실패하면 None
+    """
+    global _chain
+    if _chain is not None:
+        return _chain
+    
+    llm = get_ai_llm()
+    if llm is None:
+        return None
+    
+    with _chain_lock:
+        if _chain is None:
+            from langchain.prompts import PromptTemplate
+            from langchain.chains import LLMChain
+            prompt_template = PromptTemplate(
+                input_variables=["incident_context", "alert_summary", "similar_history"],
+                template=PROMPT_TEMPLATE
+            )
+            _chain = LLMChain(llm=llm, prompt=prompt_template)
+        return _chain
+
+
+def summarize_alerts(alerts: list) -> str:
+    """
+    프롬프트에 넣을 알람 요약 (prompt_context: 공통 labels 분리, 중복 묶음, AI_CONTEXT_TOKEN_BUDGET 이내)
+    """
+    alert_summary, info = build_alert_context(alerts)
+    print(f"🤖 알람 컨텍스트: {info['alerts']}건 → {info['included_groups']}/{info['groups']}종류, ~{info['tokens']} tokens")
+    return alert_summary
+
+
+def format_incident_context(incident_info: Dict[str, Any]) -> str:
+    """프롬프트에 넣을 Incident 정보"""
+    start_time_str = ""
+    if incident_info.get("start_time"):
+        if isinstance(incident_info.get("start_time"), datetime):
+            start_time_str = incident_info.get("start_time").strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            start_time_str = str(incident_info.get("start_time", ""))
+    
+    return f"""- Incident ID: {incident_info.get("incident_id", "Unknown")}
 - Severity: {incident_info.get("severity", "Unknown")}
 - Cluster: {incident_info.get("cluster", "Unknown")}
 - Namespace: {incident_info.get("namespace", "Unknown")}
@@ -127,51 +156,239 @@ def analyze_incident(incident_info: Dict[str, Any], alerts: list) -> Dict[str, s
 - Status: {incident_info.get("status", "Unknown")}
 - 발생 시각: {start_time_str}
 - 알람 개수: {incident_info.get("alert_count", 0)}"""
+
+
+def parse_analysis(result: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    LLM 응답에서 분석 결과 추출
+    
+    Returns: (분석 결과, JSON 파싱 성공 여부)
+    """
+    try:
+        # JSON 부분만 추출 (마크다운 코드 블록 제거)
+        result_clean = result.strip()
+        if "```json" in result_clean:
+            result_clean = result_clean.split("```json")[1].split("```")[0].strip()
+        elif "```" in result_clean:
+            result_clean = result_clean.split("```")[1].split("```")[0].strip()
         
-        alert_summary_text = json.dumps(alert_summary, ensure_ascii=False, indent=2)
+        parsed = json.loads(result_clean)
+        return {
+            "action_taken_suggestion": parsed.get("action_taken_suggestion"),
+            "root_cause_analysis": parsed.get("root_cause_analysis"),
+            "similar_incidents": parsed.get("similar_incidents")
+        }, True
+    except json.JSONDecodeError:
+        # JSON 파싱 실패 시 텍스트에서 추출 시도
+        print(f"⚠️  AI 응답 JSON 파싱 실패, 원본: {result[:200]}")
+        return {
+            "action_taken_suggestion": result[:500] if result else None,
+            "root_cause_analysis": None,
+            "similar_incidents": None
+        }, False
+
+
+def find_similar_incidents(incident_info: Dict[str, Any], alerts: list) -> list:
+    """과거 유사 사건 조회 (similar_incidents 인덱스, DB 조회 없음)"""
+    if not SIMILAR_INDEX_ENABLED:
+        return []
+    try:
+        return similar_index.similar_to(incident_info, alerts)
+    except Exception as e:
+        print(f"⚠️  유사 사건 조회 실패: {e}")
+        return []
+
+
+def _cache_lookup(incident_info: Dict[str, Any], alert_summary: str,
+                  similar: list) -> Tuple[Optional[str], str, Optional[Dict[str, Any]]]:
+    """
+    AI 분석 캐시 조회 (incident_key + 알람 요약 + 유사 사건 + 프롬프트 버전)
+    
+    Returns: (incident_key, digest, 캐시된 결과 또는 None)
+    """
+    incident_key = incident_info.get("incident_key")
+    digest = analysis_digest([alert_summary], PROMPT_VERSION, [hit["incident_id"] for hit in similar])
+    if AI_CACHE_ENABLED and incident_key:
+        cached = ai_cache.get(incident_key, digest)
+        if cached:
+            print(f"⚡ AI 분석 캐시 사용: incident_key={incident_key}")
+            return incident_key, digest, cached
+    return incident_key, digest, None
+
+
+def _cache_store(incident_key: Optional[str], digest: str, analysis: Dict[str, Any]):
+    """파싱에 성공한 결과만 캐시"""
+    if AI_CACHE_ENABLED and incident_key and (analysis["action_taken_suggestion"] or analysis["root_cause_analysis"]):
+        ai_cache.put(incident_key, digest, PROMPT_VERSION, analysis)
+
+
+def analyze_incident(incident_info: Dict[str, Any], alerts: list) -> Dict[str, str]:
+    """
+    Incident를 AI로 분석하여 조치 제안 및 근본 원인 분석
+    
+    Args:
+        incident_info: Incident 정보 (incident_id, status, severity, cluster, namespace, phase, service 등)
+        alerts: 관련 알람 리스트 (최근 수신 순, alertname, message, labels, state, received_at 등)
+    
+    Returns:
+        {
+            "action_taken_suggestion": "제안된 조치 내용",
+            "root_cause_analysis": "근본 원인 분석",
+            "similar_incidents": "유사한 사건 패턴"
+        }
+    
+    해결된 과거 유사 사건(similar_incidents 인덱스) 상위 SIMILAR_TOP_K개를 프롬프트에 포함
+    incident_key와 요약된 알람이 이전 분석과 같으면 캐시된 결과 반환 (LLM 실행 없음)
+    """
+    alert_summary = summarize_alerts(alerts)
+    similar = find_similar_incidents(incident_info, alerts)
+    incident_key, digest, cached = _cache_lookup(incident_info, alert_summary, similar)
+    if cached:
+        return cached
+    
+    try:
+        chain = get_analysis_chain()
+        if chain is None:
+            return dict(EMPTY_ANALYSIS)
         
         # 프롬프트 실행
         print(f"🤖 LangChain 프롬프트 실행 시작...")
-        chain = LLMChain(llm=llm, prompt=prompt_template)
         result = chain.run(
-            incident_context=incident_context_text,
-            alert_summary=alert_summary_text
+            incident_context=format_incident_context(incident_info),
+            alert_summary=alert_summary,
+            similar_history=format_similar_incidents(similar)
         )
         print(f"🤖 LangChain 프롬프트 실행 완료, 결과 길이: {len(result) if result else 0}")
         
-        # JSON 파싱 시도
-        try:
-            # JSON 부분만 추출 (마크다운 코드 블록 제거)
-            result_clean = result.strip()
-            if "```json" in result_clean:
-                result_clean = result_clean.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_clean:
-                result_clean = result_clean.split("```")[1].split("```")[0].strip()
-            
-            parsed = json.loads(result_clean)
-            return {
-                "action_taken_suggestion": parsed.get("action_taken_suggestion"),
-                "root_cause_analysis": parsed.get("root_cause_analysis"),
-                "similar_incidents": parsed.get("similar_incidents")
-            }
-        except json.JSONDecodeError:
-            # JSON 파싱 실패 시 텍스트에서 추출 시도
-            print(f"⚠️  AI 응답 JSON 파싱 실패, 원본: {result[:200]}")
-            return {
-                "action_taken_suggestion": result[:500] if result else None,
-                "root_cause_analysis": None,
-                "similar_incidents": None
-            }
+        analysis, parsed = parse_analysis(result)
+        if parsed:
+            _cache_store(incident_key, digest, analysis)
+        return analysis
     
     except Exception as e:
         print(f"❌ AI 분석 실패: {e}")
         import traceback
         traceback.print_exc()
-        return {
-            "action_taken_suggestion": None,
-            "root_cause_analysis": None,
-            "similar_incidents": None
-        }
+        return dict(EMPTY_ANALYSIS)
+
+
+def stream_ollama(prompt: str) -> Iterator[str]:
+    """
+    Ollama /api/generate 스트리밍 호출 (생성되는 대로 토큰 반환)
+    공용 keep-alive 클라이언트(http_clients "ollama") 사용
+    """
+    with http_clients.registry.timed("ollama"):
+        with http_clients.registry.client("ollama").stream(
+            "POST",
+            f"{OLLAMA_BASE_URL}/api/generate",
+            json={
+                "model": OLLAMA_MODEL,
+                "prompt": prompt,
+                "stream": True,
+                "options": {"temperature": 0.7}
+            }
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ollama 오류: {chunk['error']}")
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    break
+
+
+def analyze_incident_stream(incident_info: Dict[str, Any], alerts: list,
+                            on_text: Optional[Callable[[str], None]] = None) -> Dict[str, str]:
+    """
+    analyze_incident의 스트리밍 버전 (LangChain 대신 Ollama 토큰 스트림 직접 사용)
+    
+    Args:
+        on_text: 토큰이 도착할 때마다 지금까지 생성된 전체 텍스트로 호출 (진행 표시용)
+    
+    Returns: analyze_incident와 같은 형식 (캐시도 공유)
+    """
+    alert_summary = summarize_alerts(alerts)
+    similar = find_similar_incidents(incident_info, alerts)
+    incident_key, digest, cached = _cache_lookup(incident_info, alert_summary, similar)
+    if cached:
+        return cached
+    
+    prompt = PROMPT_TEMPLATE.format(
+        incident_context=format_incident_context(incident_info),
+        alert_summary=alert_summary,
+        similar_history=format_similar_incidents(similar)
+    )
+    
+    try:
+        print(f"🤖 Ollama 스트리밍 시작...")
+        started = time.monotonic()
+        first_token_at = None
+        result = ""
+        for token in stream_ollama(prompt):
+            if first_token_at is None:
+                first_token_at = time.monotonic()
+                print(f"🤖 첫 토큰 수신: {first_token_at - started:.1f}초")
+            result += token
+            if on_text:
+                on_text(result)
+        print(f"🤖 Ollama 스트리밍 완료: {time.monotonic() - started:.1f}초, 결과 길이: {len(result)}")
+        
+        analysis, parsed = parse_analysis(result)
+        if parsed:
+            _cache_store(incident_key, digest, analysis)
+        return analysis
+    
+    except Exception as e:
+        print(f"❌ AI 분석 실패 (스트리밍): {e}")
+        import traceback
+        traceback.print_exc()
+        return dict(EMPTY_ANALYSIS)
+
+
+def load_analysis_input(conn, incident_id: str) -> tuple:
+    """
+    AI 분석 입력 조회 (Incident 정보 + 최근 알람 AI_CONTEXT_MAX_ALERTS개)
+    
+    Returns: (incident_info, formatted_alerts) - Incident가 없으면 (None, [])
+    """
+    from incident_service import get_incident_info
+    incident_info = get_incident_info(conn, incident_id)
+    if not incident_info:
+        return None, []
+    
+    # 관련 알람 조회
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT alertname, message, labels, annotations, state, received_at, repeat_count
+            FROM grafana_alerts
+            WHERE incident_id = %s
+            ORDER BY received_at DESC
+            LIMIT %s
+        """, (incident_id, AI_CONTEXT_MAX_ALERTS))
+        alerts = cursor.fetchall()
+    
+    # 알람 데이터 포맷팅
+    formatted_alerts = []
+    for alert in alerts:
+        labels = alert.get("labels") or {}
+        if isinstance(labels, str):
+            labels = json.loads(labels)
+        
+        formatted_alerts.append({
+            "alertname": alert.get("alertname", ""),
+            "message": alert.get("message", ""),
+            "labels": labels,
+            "annotations": alert.get("annotations", {}),
+            "state": alert.get("state"),
+            "received_at": alert.get("received_at"),
+            "repeat_count": alert.get("repeat_count") or 0
+        })
+    
+    return incident_info, formatted_alerts
 
 
 def get_incident_analysis_for_modal(incident_id: str, conn) -> Dict[str, str]:
@@ -189,37 +406,11 @@ def get_incident_analysis_for_modal(incident_id: str, conn) -> Dict[str, str]:
         }
     """
     try:
-        # Incident 정보 조회
-        from incident_service import get_incident_info
-        incident_info = get_incident_info(conn, incident_id)
+        # Incident 정보 및 관련 알람 조회
+        incident_info, formatted_alerts = load_analysis_input(conn, incident_id)
         if not incident_info:
             return {"action_taken_suggestion": None, "root_cause_analysis": None}
         
-        # 관련 알람 조회
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT alertname, message, labels, annotations
-                FROM grafana_alerts
-                WHERE incident_id = %s
-                ORDER BY received_at DESC
-                LIMIT 10
-            """, (incident_id,))
-            alerts = cursor.fetchall()
-        
-        # 알람 데이터 포맷팅
-        formatted_alerts = []
-        for alert in alerts:
-            labels = alert.get("labels") or {}
-            if isinstance(labels, str):
-                labels = json.loads(labels)
-            
-            formatted_alerts.append({
-                "alertname": alert.get("alertname", ""),
-                "message": alert.get("message", ""),
-                "labels": labels,
-                "annotations": alert.get("annotations", {})
-            })
-        
         # AI 분석
         analysis = analyze_incident(incident_info, formatted_alerts)
         
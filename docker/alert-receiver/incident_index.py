@@ -0,0 +1,146 @@
+"""
+Open Incident 인메모리 인덱스
+incident_key → {incident_id, status, start_time, slack_message_ts}
+- 시작 시 DB의 open incident(active, acknowledged)로 warm-up
+- 알림 처리 / ACK / Resolve / 모달 resolve 경로에서 DB commit이 성공한 뒤에만 갱신
+  (rollback된 상태가 인덱스에 남지 않음)
+- HTTP 경로와 Socket Mode 경로가 같은 프로세스의 인덱스를 공유
+
+인덱스는 힌트로만 사용: 조회 성공 시에도 DB UPDATE에 open 상태 조건을 걸어 검증하고,
+검증에 실패하면(다른 replica에서 resolve 등) 항목을 제거한 뒤 DB 조회로 돌아감
+"""
+import threading
+from typing import Any, Dict, Optional
+
+INDEX_FIELDS = ("incident_id", "status", "start_time", "slack_message_ts")
+
+
+class OpenIncidentIndex:
+    """스레드 안전한 incident_key → open incident 인덱스"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, Dict[str, Any]] = {}
+        self._key_by_id: Dict[str, str] = {}
+
+        # 통계
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, incident_key: str) -> Optional[Dict[str, Any]]:
+        """open incident 조회 (복사본 반환)"""
+        with self._lock:
+            entry = self._by_key.get(incident_key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(entry)
+
+    def peek(self, incident_key: str) -> Optional[Dict[str, Any]]:
+        """통계에 집계하지 않는 조회 (복사본 반환)"""
+        with self._lock:
+            entry = self._by_key.get(incident_key)
+            return dict(entry) if entry is not None else None
+
+    def status(self, incident_id: str) -> Optional[str]:
+        """incident_id의 상태 (인덱스에 없으면 None - resolve됐거나 아직 로드되지 않음)"""
+        with self._lock:
+            incident_key = self._key_by_id.get(incident_id)
+            if incident_key is None:
+                return None
+            return self._by_key[incident_key]["status"]
+
+    def put(self, incident_key: str, incident: Dict[str, Any]):
+        """open incident 등록/갱신 (incident snapshot에서 필요한 필드만 저장)"""
+        entry = {field: incident.get(field) for field in INDEX_FIELDS}
+        with self._lock:
+            previous = self._by_key.get(incident_key)
+            if previous and previous["incident_id"] != entry["incident_id"]:
+                self._key_by_id.pop(previous["incident_id"], None)
+            self._by_key[incident_key] = entry
+            self._key_by_id[entry["incident_id"]] = incident_key
+
+    def update(self, incident_id: str, **fields):
+        """인덱스에 있는 incident의 필드 갱신 (status, slack_message_ts 등)"""
+        with self._lock:
+            incident_key = self._key_by_id.get(incident_id)
+            if incident_key is None:
+                return
+            entry = self._by_key[incident_key]
+            for field, value in fields.items():
+                if field in INDEX_FIELDS:
+                    entry[field] = value
+
+    def remove(self, incident_id: str):
+        """incident 제거 (resolve 시)"""
+        with self._lock:
+            incident_key = self._key_by_id.pop(incident_id, None)
+            if incident_key is not None:
+                self._by_key.pop(incident_key, None)
+
+    def invalidate(self, incident_key: str, incident_id: str):
+        """DB 검증에 실패한 항목 제거"""
+        with self._lock:
+            entry = self._by_key.get(incident_key)
+            if entry and entry["incident_id"] == incident_id:
+                self._by_key.pop(incident_key, None)
+                self._key_by_id.pop(incident_id, None)
+                self.stale += 1
+
+    def hit_snapshot(self, incident_key: str, cached: Dict[str, Any], alert_count: int) -> Dict[str, Any]:
+        """
+        인덱스 hit + 조건부 UPDATE 성공 시 Incident snapshot 생성 (find_or_create_incident 반환 형식)
+        UPDATE가 Row Lock을 기다리는 동안 생성자가 slack_message_ts를 저장했을 수 있으므로 인덱스를 다시 확인
+        인덱스의 status 갱신은 commit 후 호출자가 put()으로 처리
+        """
+        current = self.peek(incident_key)
+        if current and current["incident_id"] == cached["incident_id"]:
+            cached = current
+        return {
+            "incident_id": cached["incident_id"],
+            "incident_key": incident_key,
+            "is_new_incident": False,
+            "status": "active",
+            "start_time": cached["start_time"],
+            "slack_message_ts": cached["slack_message_ts"],
+            "alert_count": alert_count,
+        }
+
+    def warm(self, conn) -> int:
+        """
+        DB의 open incident로 인덱스 채우기
+
+        Returns: 등록한 incident 수
+        """
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT incident_key, incident_id, status, start_time, slack_message_ts
+                FROM incidents
+                WHERE status IN ('active', 'acknowledged')
+                ORDER BY last_seen_at ASC
+            """)
+            rows = cursor.fetchall()
+
+        # last_seen_at 오름차순 → 같은 key가 여러 개면 최근 incident가 남음
+        for row in rows:
+            self.put(row["incident_key"], row)
+        return len(self._by_key)
+
+    def stats(self) -> Dict[str, Any]:
+        """인덱스 크기 및 hit/miss 통계"""
+        with self._lock:
+            size = len(self._by_key)
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+        }
+
+
+# 프로세스 공용 인덱스
+open_incidents = OpenIncidentIndex()
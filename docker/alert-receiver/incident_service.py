@@ -1,16 +1,97 @@
 """
 Incident 비즈니스 로직 (Ack, Resolve, Mute)
 """
+import hashlib
+import json
+import os
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 import pymysql
 
 
+# multi-row INSERT 1회에 넣는 최대 alert 수 (max_allowed_packet 초과 방지)
+ALERT_INSERT_BATCH_SIZE = int(os.getenv("ALERT_INSERT_BATCH_SIZE", "500"))
+# alert_count reconciliation 대상: open incident + 최근 N시간 내 변경된 incident
+ALERT_COUNT_RECONCILE_LOOKBACK_HOURS = int(os.getenv("ALERT_COUNT_RECONCILE_LOOKBACK_HOURS", "24"))
+
+
+def generate_incident_id() -> str:
+    """
+    Incident ID 생성 (에피소드 ID, 매번 새로 생성)
+    형식: INC-YYYYMMDDHHMMSS-{random_hex}
+    이번에 대응한 사건(episode)의 고유 ID
+    """
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    random_suffix = hashlib.sha256(f"{timestamp}{os.urandom(16)}".encode()).hexdigest()[:8]
+    return f"INC-{timestamp}-{random_suffix}"
+
+
+def build_alert_insert_batches(alerts: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+                               incident_id: str, incident_key: str) -> List[Tuple[str, list, int]]:
+    """
+    grafana_alerts multi-row INSERT 문 생성 (동기/비동기 경로 공용)
+    
+    Args:
+        alerts: [(alert_info, raw_payload), ...]
+    
+    Returns: [(sql, params, 행 수), ...] - ALERT_INSERT_BATCH_SIZE 단위로 분할
+    """
+    now = datetime.now()
+    batches = []
+    for start in range(0, len(alerts), ALERT_INSERT_BATCH_SIZE):
+        chunk = alerts[start:start + ALERT_INSERT_BATCH_SIZE]
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(chunk))
+        sql = f"""
+            INSERT INTO grafana_alerts
+            (incident_id, incident_key, received_at, state, rule_uid, alertname, message, labels, annotations, raw_payload,
+             fingerprint, starts_at, last_seen_at)
+            VALUES {placeholders}
+        """
+        params = []
+        for alert_info, raw_payload in chunk:
+            params.extend((
+                incident_id,
+                incident_key,
+                now,
+                alert_info["state"],
+                alert_info["rule_uid"],
+                alert_info["alertname"],
+                alert_info["message"],
+                json.dumps(alert_info["labels"]),
+                json.dumps(alert_info["annotations"]),
+                json.dumps(raw_payload),
+                alert_info.get("fingerprint"),
+                alert_info.get("starts_at"),
+                now
+            ))
+        batches.append((sql, params, len(chunk)))
+    return batches
+
+
+def build_alert_id_query(incident_id: str, first_id: int, rows: int) -> Tuple[str, list]:
+    """
+    multi-row INSERT로 저장한 alert_id 재조회 쿼리 (동기/비동기 경로 공용)
+    lastrowid는 첫 번째 행의 id뿐이고 나머지 id 간격은 auto_increment_increment에 따라 달라지므로
+    (Galera / 멀티 소스 복제 등에서 1이 아님) first_id + i로 계산하지 않고 다시 읽음
+    같은 Incident의 INSERT는 incidents 행 Lock(find_or_create_incident)으로 직렬화되므로
+    incident_id + alert_id >= first_id 범위의 앞 rows개가 이번 INSERT의 행
+
+    Returns: (sql, params) - alert_id 오름차순 (INSERT 행 순서)
+    """
+    sql = """
+        SELECT alert_id FROM grafana_alerts
+        WHERE incident_id = %s AND alert_id >= %s
+        ORDER BY alert_id
+        LIMIT %s
+    """
+    return sql, [incident_id, first_id, rows]
+
+
 def acknowledge_incident(conn, incident_id: str, user: str) -> bool:
     """
-    Incident를 Acknowledged 상태로 변경
+    Incident를 Acknowledged 상태로 변경 (active 상태일 때만)
     
-    Returns: 성공 여부
+    Returns: 성공 여부 (이미 ACK / Resolve된 Incident면 False)
     """
     try:
         with conn.cursor() as cursor:
@@ -21,24 +102,30 @@ def acknowledge_incident(conn, incident_id: str, user: str) -> bool:
                     acknowledged_by = %s,
                     updated_at = %s
                 WHERE incident_id = %s
+                  AND status = 'active'
             """, (
                 datetime.now(),
                 user,
                 datetime.now(),
                 incident_id
             ))
-            # commit 제거: 호출자에서 처리
+            # commit 제거: 호출자에서 처리 (open incident 인덱스도 commit 후 호출자에서 갱신)
             return cursor.rowcount > 0
     except Exception as e:
         print(f"❌ Incident ACK 실패: {e}")
         return False
 
 
-def resolve_incident(conn, incident_id: str, user: str) -> bool:
+def resolve_incident(conn, incident_id: str, user: str,
+                     action_taken: Optional[str] = None, root_cause: Optional[str] = None) -> bool:
     """
-    Incident를 Resolved 상태로 변경
+    Incident를 Resolved 상태로 변경 (아직 Resolve되지 않았을 때만)
+    
+    Args:
+        action_taken: 조치 내용 (Resolve 모달 입력값)
+        root_cause: 근본 원인 (Resolve 모달 입력값)
     
-    Returns: 성공 여부
+    Returns: 성공 여부 (이미 Resolve된 Incident면 False)
     """
     try:
         with conn.cursor() as cursor:
@@ -47,15 +134,20 @@ def resolve_incident(conn, incident_id: str, user: str) -> bool:
                 SET status = 'resolved',
                     resolved_time = %s,
                     resolved_by = %s,
+                    action_taken = COALESCE(%s, action_taken),
+                    root_cause = COALESCE(%s, root_cause),
                     updated_at = %s
                 WHERE incident_id = %s
+                  AND status <> 'resolved'
             """, (
                 datetime.now(),
                 user,
+                action_taken or None,
+                root_cause or None,
                 datetime.now(),
                 incident_id
             ))
-            # commit 제거: 호출자에서 처리
+            # commit 제거: 호출자에서 처리 (open incident 인덱스도 commit 후 호출자에서 제거)
             return cursor.rowcount > 0
     except Exception as e:
         print(f"❌ Incident Resolve 실패: {e}")
@@ -81,3 +173,83 @@ def get_incident_info(conn, incident_id: str) -> Optional[Dict[str, Any]]:
         print(f"❌ Incident 정보 조회 실패: {e}")
         return None
 
+
+def get_mute_targets(conn, incident_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Mute 대상 label 조회 (Incident + 최근 알람, 여러 Incident를 쿼리 1번으로)
+    알람 labels 값을 우선 사용하고, 없으면 Incident 컬럼 사용
+
+    Returns: incident_id → {"alertname", "cluster", "namespace", "phase", "service"}
+             (Incident 또는 알람이 없으면 결과에서 제외)
+    """
+    if not incident_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(incident_ids))
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT i.incident_id, i.cluster, i.namespace, i.phase, i.service, a.alertname, a.labels
+            FROM incidents i
+            JOIN grafana_alerts a ON a.alert_id = (
+                SELECT alert_id FROM grafana_alerts
+                WHERE incident_id = i.incident_id
+                ORDER BY received_at DESC
+                LIMIT 1
+            )
+            WHERE i.incident_id IN ({placeholders})
+        """, list(incident_ids))
+        rows = cursor.fetchall()
+
+    targets = {}
+    for row in rows:
+        labels = row.get("labels") or {}
+        if isinstance(labels, str):
+            labels = json.loads(labels)
+        targets[row["incident_id"]] = {
+            "alertname": row.get("alertname") or labels.get("alertname", ""),
+            "cluster": labels.get("cluster") or row.get("cluster"),
+            "namespace": labels.get("namespace") or row.get("namespace"),
+            "phase": labels.get("phase") or row.get("phase"),
+            "service": labels.get("service") or row.get("service"),
+        }
+    return targets
+
+
+
+def reconcile_alert_counts(conn, lookback_hours: int = ALERT_COUNT_RECONCILE_LOOKBACK_HOURS) -> int:
+    """
+    incidents.alert_count와 실제 grafana_alerts 개수의 불일치(drift) 보정
+    - 대상: open incident + 최근 lookback_hours 내 변경된 incident
+    - 불일치 행만 COUNT(*)로 다시 계산 (행 단위 commit, 처리 중인 트랜잭션과 충돌 최소화)
+    
+    Returns: 보정한 incident 수
+    """
+    since = datetime.now() - timedelta(hours=lookback_hours)
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT i.incident_id, i.alert_count, COUNT(a.alert_id) AS actual_count
+            FROM incidents i
+            LEFT JOIN grafana_alerts a ON a.incident_id = i.incident_id
+            WHERE i.status IN ('active', 'acknowledged')
+               OR i.updated_at >= %s
+            GROUP BY i.incident_id, i.alert_count
+            HAVING i.alert_count <> actual_count
+        """, (since,))
+        drifted = cursor.fetchall()
+    
+    repaired = 0
+    for row in drifted:
+        with conn.cursor() as cursor:
+            # 조회 이후 새 alert가 들어왔을 수 있으므로 UPDATE 시점에 다시 계산
+            cursor.execute("""
+                UPDATE incidents
+                SET alert_count = (
+                    SELECT COUNT(*) FROM grafana_alerts
+                    WHERE incident_id = %s
+                )
+                WHERE incident_id = %s
+            """, (row["incident_id"], row["incident_id"]))
+        conn.commit()
+        repaired += 1
+        print(f"🔧 alert_count 보정: {row['incident_id']} {row['alert_count']} → {row['actual_count']}")
+    
+    return repaired
@@ -0,0 +1,197 @@
+"""
+Webhook Ingest Queue
+Grafana webhook 수신(검증 후 즉시 202 응답)과 처리(DB 저장, Slack 전송)를 분리
+- bounded asyncio.Queue: 가득 차면 submit 실패 → 호출자가 503 응답 (backpressure)
+- worker pool: 각 worker가 동기 처리 함수를 스레드에서 실행 (이벤트 루프 블로킹 방지)
+- graceful shutdown: 신규 수신 중단 후 남은 payload를 drain
+- 일시적인 DB 오류(DB 장애, 연결 끊김, 연결 풀 고갈)는 backoff 재시도, 그 외 실패와
+  종료 시 처리하지 못한 payload는 dead-letter 파일에 기록 (버리지 않음)
+"""
+import asyncio
+import json
+import os
+import time
+import traceback
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from ingest_spool import TRANSIENT_DB_ERRORS
+
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "1000"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+INGEST_DRAIN_TIMEOUT_SECONDS = float(os.getenv("INGEST_DRAIN_TIMEOUT_SECONDS", "30"))
+INGEST_RETRY_MAX_SECONDS = float(os.getenv("INGEST_RETRY_MAX_SECONDS", "30"))  # 일시적인 DB 오류 재시도 간격 상한
+INGEST_DEAD_LETTER_PATH = os.getenv("INGEST_DEAD_LETTER_PATH", "./data/ingest-dead-letter.jsonl")
+
+
+class IngestQueue:
+    """
+    Webhook payload 처리 큐
+
+    Args:
+        handler: payload 1건을 처리하는 동기 함수 (worker 스레드에서 실행)
+        maxsize: 큐 최대 길이
+        workers: worker 개수
+        dead_letter_path: 처리하지 못한 payload를 기록할 JSONL 파일
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Any],
+                 maxsize: int = INGEST_QUEUE_SIZE, workers: int = INGEST_WORKERS,
+                 dead_letter_path: str = INGEST_DEAD_LETTER_PATH):
+        self.handler = handler
+        self.maxsize = maxsize
+        self.dead_letter_path = dead_letter_path
+        self.num_workers = max(1, workers)
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.accepting = False
+
+        # 통계
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.in_progress = 0
+        self.last_error: Optional[str] = None
+
+    async def start(self):
+        """worker 시작 (이벤트 루프 안에서 호출)"""
+        self.queue = asyncio.Queue(maxsize=self.maxsize)
+        self.workers = [
+            asyncio.create_task(self._worker(i))
+            for i in range(self.num_workers)
+        ]
+        self.accepting = True
+        print(f"✅ Ingest Queue 시작: workers={self.num_workers}, maxsize={self.maxsize}")
+
+    def submit(self, payload: Dict[str, Any]) -> bool:
+        """
+        payload를 큐에 추가
+
+        Returns: 성공 여부 (큐가 가득 찼거나 종료 중이면 False)
+        """
+        if not self.accepting or self.queue is None:
+            self.rejected += 1
+            return False
+
+        try:
+            self.queue.put_nowait((time.monotonic(), payload))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            print(f"⚠️  Ingest Queue 가득 참: size={self.queue.qsize()}")
+            return False
+
+        self.accepted += 1
+        return True
+
+    def _write_dead_letter(self, payload: Dict[str, Any], error: str):
+        directory = os.path.dirname(self.dead_letter_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.dead_letter_path, "a") as f:
+            f.write(json.dumps({
+                "failed_at": datetime.now().isoformat(),
+                "error": error,
+                "payload": payload,
+            }, ensure_ascii=False, default=str) + "\n")
+
+    async def _dead_letter(self, payload: Dict[str, Any], error: str):
+        """처리하지 못한 payload를 dead-letter 파일에 기록 (기록도 실패하면 로그만 남김)"""
+        try:
+            await asyncio.to_thread(self._write_dead_letter, payload, error)
+        except Exception as e:
+            print(f"❌ Ingest dead-letter 기록 실패: {e} (error={error})")
+            return
+        self.dead_lettered += 1
+        print(f"⚠️  Ingest payload dead-letter 기록: {self.dead_letter_path}, error={error}")
+
+    async def _process(self, worker_id: int, payload: Dict[str, Any]):
+        """
+        payload 1건 처리 (성공 또는 dead-letter 기록까지)
+        일시적인 DB 오류(TRANSIENT_DB_ERRORS)는 backoff 재시도, 그 외 오류는 바로 dead-letter
+        """
+        delay = 0.5
+        while True:
+            try:
+                await asyncio.to_thread(self.handler, payload)
+                return
+            except TRANSIENT_DB_ERRORS as e:
+                # DB 장애 / 연결 끊김 / 풀 고갈: 복구될 때까지 대기 (큐가 차면 수신 측이 503으로 backpressure)
+                self.last_error = str(e)
+                print(f"⚠️  Ingest worker-{worker_id} DB 오류, {delay:.1f}초 후 재시도: {e}")
+            self.retries += 1
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # drain 시간 초과로 종료: 재시도 중인 payload는 dead-letter에 남김
+                await self._dead_letter(payload, f"shutdown while retrying: {self.last_error}")
+                raise
+            delay = min(delay * 2, INGEST_RETRY_MAX_SECONDS)
+
+    async def _worker(self, worker_id: int):
+        while True:
+            enqueued_at, payload = await self.queue.get()
+            self.in_progress += 1
+            try:
+                await self._process(worker_id, payload)
+                self.processed += 1
+                waited = time.monotonic() - enqueued_at
+                print(f"✅ Ingest worker-{worker_id} 처리 완료 (수신 후 {waited:.3f}초)")
+            except Exception as e:
+                # 처리 실패는 worker를 중단시키지 않음
+                self.failed += 1
+                self.last_error = str(e)
+                print(f"❌ Ingest worker-{worker_id} 처리 실패: {e}")
+                traceback.print_exc()
+                await self._dead_letter(payload, str(e))
+            finally:
+                self.in_progress -= 1
+                self.queue.task_done()
+
+    async def stop(self, timeout: float = INGEST_DRAIN_TIMEOUT_SECONDS):
+        """
+        graceful shutdown
+        신규 수신을 중단하고 큐에 남은 payload를 timeout까지 처리한 뒤 worker 종료
+        남은 payload 처리에 DB 연결 풀을 사용하므로 풀을 닫기 전에 호출
+        """
+        self.accepting = False
+        if self.queue is None:
+            return
+
+        remaining = self.queue.qsize()
+        print(f"⏳ Ingest Queue drain 시작: 남은 payload={remaining}")
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+            print("✅ Ingest Queue drain 완료")
+        except asyncio.TimeoutError:
+            print(f"⚠️  Ingest Queue drain 시간 초과: 미처리 payload={self.queue.qsize()}")
+
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+        # drain하지 못한 payload는 버리지 않고 dead-letter에 기록
+        while not self.queue.empty():
+            _, payload = self.queue.get_nowait()
+            self.queue.task_done()
+            await self._dead_letter(payload, "not processed before shutdown")
+
+    def stats(self) -> Dict[str, Any]:
+        """큐 상태 및 처리 통계"""
+        return {
+            "accepting": self.accepting,
+            "workers": self.num_workers,
+            "maxsize": self.maxsize,
+            "depth": self.queue.qsize() if self.queue else 0,
+            "in_progress": self.in_progress,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,476 @@
+"""
+Webhook Ingest Spool (로컬 디스크 write-ahead log)
+수신한 Grafana webhook 본문을 DB 처리 전에 로컬 디스크에 먼저 기록
+- append-only segment 파일 (segment-000000000001.log, ...)
+- record 형식: [length: uint32][crc32: uint32][body]
+- fsync batching: 짧은 구간(SPOOL_FSYNC_INTERVAL_MS) 동안 모인 record를 한 번의 fsync로 확정
+- replayer: checkpoint 이후의 record를 순서대로 DB 파이프라인에 전달하고 진행 위치를 기록
+  (MySQL 장애 시 재시도하며 대기 → 장애 동안 수신한 alert 유실 없음)
+- checkpoint / segment 파일 작업은 스레드에서 실행 (이벤트 루프 블로킹 방지)
+- 종료 시 처리 중인 record는 SPOOL_STOP_TIMEOUT_SECONDS까지 끝내고 checkpoint 저장 (재시작 시 중복 처리 방지)
+"""
+import asyncio
+import json
+import os
+import struct
+import time
+import traceback
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pymysql
+
+from db_pool import PoolTimeoutError
+
+SPOOL_DIR = os.getenv("SPOOL_DIR", "./spool")
+SPOOL_SEGMENT_MAX_BYTES = int(os.getenv("SPOOL_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+SPOOL_FSYNC_INTERVAL_MS = float(os.getenv("SPOOL_FSYNC_INTERVAL_MS", "5"))
+SPOOL_FSYNC_BATCH = int(os.getenv("SPOOL_FSYNC_BATCH", "64"))
+SPOOL_MAX_ATTEMPTS = int(os.getenv("SPOOL_MAX_ATTEMPTS", "5"))  # 일시적인 DB 오류 외 실패 시 dead-letter 이동 기준
+SPOOL_RETRY_MAX_SECONDS = float(os.getenv("SPOOL_RETRY_MAX_SECONDS", "30"))
+SPOOL_STOP_TIMEOUT_SECONDS = float(os.getenv("SPOOL_STOP_TIMEOUT_SECONDS", "10"))  # 종료 시 처리 중인 record 대기 시간
+
+RECORD_HEADER = struct.Struct(">II")  # length, crc32
+CHECKPOINT_FILE = "checkpoint.json"
+DEAD_LETTER_FILE = "dead-letter.jsonl"
+
+# 일시적인 DB 오류 (DB 장애, 연결 끊김, 연결 풀 고갈) - record를 버리지 않고 무한 재시도
+TRANSIENT_DB_ERRORS = (pymysql.err.OperationalError, pymysql.err.InterfaceError, PoolTimeoutError)
+
+
+class SpoolCorruptionError(Exception):
+    """CRC 불일치 등 record 손상"""
+
+
+def segment_name(seq: int) -> str:
+    return f"segment-{seq:012d}.log"
+
+
+def read_record(f) -> Optional[Tuple[bytes, int]]:
+    """
+    현재 위치에서 record 1건 읽기
+
+    Returns: (body, record 전체 길이) 또는 None (아직 record가 완전히 기록되지 않음)
+    Raises: SpoolCorruptionError (CRC 불일치)
+    """
+    header = f.read(RECORD_HEADER.size)
+    if len(header) < RECORD_HEADER.size:
+        return None
+    length, crc = RECORD_HEADER.unpack(header)
+    body = f.read(length)
+    if len(body) < length:
+        return None
+    if zlib.crc32(body) != crc:
+        raise SpoolCorruptionError(f"CRC 불일치 (length={length})")
+    return body, RECORD_HEADER.size + length
+
+
+class IngestSpool:
+    """
+    append-only segment 파일 기반 spool + replayer
+
+    Args:
+        handler: payload 1건을 처리하는 동기 함수 (replayer가 스레드에서 실행)
+        directory: spool 디렉토리
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Any], directory: str = SPOOL_DIR):
+        self.handler = handler
+        self.directory = directory
+        self.accepting = False
+
+        # writer 상태
+        self._fd: Optional[int] = None
+        self._seq = 0
+        self._size = 0
+        self._retired_fds: List[int] = []
+        self._pending: List[asyncio.Future] = []
+        self._flush_event: Optional[asyncio.Event] = None
+        self._durable_event: Optional[asyncio.Event] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._replayer_task: Optional[asyncio.Task] = None
+
+        # replayer 상태 (checkpoint)
+        self._cp_seq = 0
+        self._cp_offset = 0
+
+        # 통계
+        self.appended = 0
+        self.appended_bytes = 0
+        self.fsyncs = 0
+        self.replayed = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.corrupted = 0
+        self.last_error: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # 시작 / 종료
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        """복구(손상된 tail 정리) 후 flusher, replayer 시작"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_checkpoint()
+        self._recover()
+
+        self._flush_event = asyncio.Event()
+        self._durable_event = asyncio.Event()
+        self._stop_event = asyncio.Event()
+        self._replayer_task = asyncio.create_task(self._replayer())
+        self._tasks = [
+            asyncio.create_task(self._flusher()),
+            self._replayer_task,
+        ]
+        self.accepting = True
+        print(f"✅ Ingest Spool 시작: dir={self.directory}, segment={self._seq}, "
+              f"checkpoint=({self._cp_seq}, {self._cp_offset})")
+
+    async def stop(self, timeout: float = SPOOL_STOP_TIMEOUT_SECONDS):
+        """
+        신규 수신 중단, 대기 중인 record fsync 후 종료
+        처리 중인 record는 timeout까지 끝내고 checkpoint를 저장한 뒤 replayer 종료
+        (중간에 끊으면 DB에는 반영됐는데 checkpoint가 남지 않아 재시작 시 다시 처리됨)
+        처리되지 않은 record는 디스크에 남아 다음 시작 시 replay됨
+        """
+        self.accepting = False
+        if self._fd is not None:
+            await asyncio.to_thread(os.fsync, self._fd)
+            for fut in self._pending:
+                if not fut.done():
+                    fut.set_result(None)
+            self._pending = []
+
+        if self._replayer_task is not None:
+            self._stop_event.set()
+            self._durable_event.set()  # 새 데이터 대기 중이면 깨움
+            try:
+                await asyncio.wait_for(asyncio.shield(self._replayer_task), timeout=timeout)
+            except asyncio.TimeoutError:
+                print(f"⚠️  Spool replayer 종료 대기 시간 초과 ({timeout}초): 처리 중인 record는 다음 시작 시 다시 처리")
+            except Exception:
+                pass  # replayer 오류는 아래 gather에서 정리
+            self._replayer_task = None
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        for fd in self._retired_fds + ([self._fd] if self._fd is not None else []):
+            os.close(fd)
+        self._retired_fds = []
+        self._fd = None
+        print(f"✅ Ingest Spool 종료: 미처리 backlog={self.backlog_bytes()} bytes")
+
+    # ------------------------------------------------------------------
+    # writer
+    # ------------------------------------------------------------------
+
+    def _segments(self) -> List[int]:
+        seqs = []
+        for name in os.listdir(self.directory):
+            if name.startswith("segment-") and name.endswith(".log"):
+                seqs.append(int(name[len("segment-"):-len(".log")]))
+        return sorted(seqs)
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, segment_name(seq))
+
+    def _open_segment(self, seq: int):
+        path = self._segment_path(seq)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._seq = seq
+        self._size = os.fstat(self._fd).st_size
+
+    def _recover(self):
+        """
+        마지막 segment의 불완전/손상된 tail record를 잘라내고 쓰기용으로 연다
+        (프로세스 중단 시 fsync되지 않은 마지막 record가 일부만 기록될 수 있음)
+        """
+        seqs = self._segments()
+        if not seqs:
+            self._open_segment(max(1, self._cp_seq))
+            return
+
+        last = seqs[-1]
+        path = self._segment_path(last)
+        valid = 0
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    record = read_record(f)
+                except SpoolCorruptionError:
+                    record = None
+                if record is None:
+                    break
+                valid += record[1]
+
+        size = os.path.getsize(path)
+        if valid < size:
+            print(f"⚠️  Spool 손상된 tail 정리: {segment_name(last)} {size} → {valid} bytes")
+            with open(path, "r+b") as f:
+                f.truncate(valid)
+                os.fsync(f.fileno())
+
+        self._open_segment(last)
+
+    def _rotate(self):
+        """현재 segment를 확정(fsync)하고 다음 segment로 전환"""
+        old_fd = self._fd
+        os.fsync(old_fd)
+        # flusher가 fsync 중일 수 있으므로 close는 flusher에서 처리
+        self._retired_fds.append(old_fd)
+        self._open_segment(self._seq + 1)
+
+    async def append(self, body: bytes):
+        """
+        webhook 본문을 spool에 기록하고 fsync 완료까지 대기
+
+        Raises: RuntimeError (spool이 수신 중이 아님), OSError (디스크 오류)
+        """
+        if not self.accepting or self._fd is None:
+            raise RuntimeError("Ingest Spool이 수신 중이 아닙니다.")
+
+        record = RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body
+        if self._size > 0 and self._size + len(record) > SPOOL_SEGMENT_MAX_BYTES:
+            self._rotate()
+
+        os.write(self._fd, record)
+        self._size += len(record)
+        self.appended += 1
+        self.appended_bytes += len(record)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append(fut)
+        if len(self._pending) >= SPOOL_FSYNC_BATCH:
+            self._flush_event.set()
+        await fut
+
+    async def _flusher(self):
+        """모인 record를 한 번의 fsync로 확정 (group commit)"""
+        interval = SPOOL_FSYNC_INTERVAL_MS / 1000.0
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+
+            if not self._pending:
+                continue
+
+            batch, self._pending = self._pending, []
+            try:
+                await asyncio.to_thread(os.fsync, self._fd)
+                self.fsyncs += 1
+                for fut in batch:
+                    if not fut.done():
+                        fut.set_result(None)
+            except OSError as e:
+                self.last_error = str(e)
+                print(f"❌ Spool fsync 실패: {e}")
+                for fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+            while self._retired_fds:
+                os.close(self._retired_fds.pop())
+            self._durable_event.set()
+
+    # ------------------------------------------------------------------
+    # replayer
+    # ------------------------------------------------------------------
+
+    def _load_checkpoint(self):
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        try:
+            with open(path) as f:
+                cp = json.load(f)
+            self._cp_seq = int(cp.get("segment", 0))
+            self._cp_offset = int(cp.get("offset", 0))
+        except FileNotFoundError:
+            seqs = self._segments()
+            self._cp_seq = seqs[0] if seqs else 1
+            self._cp_offset = 0
+
+    def _save_checkpoint(self):
+        """checkpoint 원자적 교체 (tmp 파일 작성 후 os.replace)"""
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"segment": self._cp_seq, "offset": self._cp_offset}, f)
+        os.replace(tmp, path)
+
+    def _dead_letter(self, body: bytes, error: str):
+        """반복 실패한 record를 dead-letter 파일로 이동"""
+        path = os.path.join(self.directory, DEAD_LETTER_FILE)
+        with open(path, "a") as f:
+            f.write(json.dumps({
+                "segment": self._cp_seq,
+                "offset": self._cp_offset,
+                "error": error,
+                "body": body.decode("utf-8", errors="replace"),
+            }, ensure_ascii=False) + "\n")
+        self.dead_lettered += 1
+        print(f"⚠️  Spool record dead-letter 이동: segment={self._cp_seq}, offset={self._cp_offset}, error={error}")
+
+    async def _sleep_unless_stopping(self, delay: float) -> bool:
+        """재시도 대기 (종료 요청 시 바로 깨어남)
+
+        Returns: 종료 요청 여부
+        """
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        return self._stop_event.is_set()
+
+    async def _wait_for_data(self):
+        self._durable_event.clear()
+        try:
+            await asyncio.wait_for(self._durable_event.wait(), timeout=1.0)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _process(self, body: bytes) -> bool:
+        """
+        record 1건 처리 (성공 또는 dead-letter 이동까지 재시도)
+        일시적인 DB 오류(TRANSIENT_DB_ERRORS)는 무한 재시도, JSON 파싱 오류는 바로 dead-letter,
+        그 외 오류(데이터 오류 등)는 SPOOL_MAX_ATTEMPTS 후 dead-letter
+
+        Returns: 처리 완료 여부 (False: 재시도 중 종료 요청 → checkpoint를 옮기지 않음)
+        """
+        try:
+            payload = json.loads(body)
+        except ValueError as e:
+            self.last_error = str(e)
+            await asyncio.to_thread(self._dead_letter, body, f"invalid JSON: {e}")
+            return True
+
+        attempts = 0
+        delay = 0.5
+        while True:
+            try:
+                await asyncio.to_thread(self.handler, payload)
+                self.replayed += 1
+                return True
+            except TRANSIENT_DB_ERRORS as e:
+                # DB 장애 / 연결 끊김 / 풀 고갈: record를 버리지 않고 복구될 때까지 대기
+                self.last_error = str(e)
+                print(f"⚠️  Spool replay DB 오류, {delay:.1f}초 후 재시도: {e}")
+            except Exception as e:
+                attempts += 1
+                self.last_error = str(e)
+                print(f"❌ Spool replay 실패 ({attempts}/{SPOOL_MAX_ATTEMPTS}): {e}")
+                traceback.print_exc()
+                if attempts >= SPOOL_MAX_ATTEMPTS:
+                    await asyncio.to_thread(self._dead_letter, body, str(e))
+                    return True
+            self.retries += 1
+            if await self._sleep_unless_stopping(delay):
+                return False
+            delay = min(delay * 2, SPOOL_RETRY_MAX_SECONDS)
+
+    async def _replayer(self):
+        """checkpoint 이후 record를 순서대로 처리하고 처리 완료한 segment는 삭제"""
+        f = None
+        f_seq = None
+        try:
+            while not self._stop_event.is_set():
+                if f_seq != self._cp_seq:
+                    if f:
+                        f.close()
+                        f = None
+                    path = self._segment_path(self._cp_seq)
+                    if not os.path.exists(path):
+                        later = [s for s in self._segments() if s > self._cp_seq]
+                        if later:
+                            self._cp_seq, self._cp_offset = later[0], 0
+                            await asyncio.to_thread(self._save_checkpoint)
+                        else:
+                            await self._wait_for_data()
+                        continue
+                    f = open(path, "rb")
+                    f_seq = self._cp_seq
+
+                f.seek(self._cp_offset)
+                try:
+                    record = read_record(f)
+                except SpoolCorruptionError as e:
+                    # 손상된 record 이후는 경계를 알 수 없으므로 segment 나머지를 건너뜀
+                    self.corrupted += 1
+                    self.last_error = str(e)
+                    print(f"❌ Spool record 손상: segment={self._cp_seq}, offset={self._cp_offset}: {e}")
+                    if self._cp_seq == self._seq:
+                        self._rotate()
+                    await self._advance_segment(f)
+                    f, f_seq = None, None
+                    continue
+
+                if record is None:
+                    # 현재 segment 끝: 다음 segment가 있으면 이동, 없으면 새 데이터 대기
+                    if self._cp_seq < self._seq:
+                        await self._advance_segment(f)
+                        f, f_seq = None, None
+                    else:
+                        await self._wait_for_data()
+                    continue
+
+                body, length = record
+                if not await self._process(body):
+                    return
+                self._cp_offset += length
+                await asyncio.to_thread(self._save_checkpoint)
+        finally:
+            if f:
+                f.close()
+
+    def _remove_segment(self, seq: int):
+        try:
+            os.remove(self._segment_path(seq))
+        except FileNotFoundError:
+            pass
+
+    async def _advance_segment(self, f):
+        """처리 완료한 segment 삭제 후 checkpoint를 다음 segment로 이동"""
+        f.close()
+        done_seq = self._cp_seq
+        self._cp_seq, self._cp_offset = done_seq + 1, 0
+        await asyncio.to_thread(self._save_checkpoint)
+        await asyncio.to_thread(self._remove_segment, done_seq)
+
+    # ------------------------------------------------------------------
+    # 통계
+    # ------------------------------------------------------------------
+
+    def backlog_bytes(self) -> int:
+        """checkpoint 이후 아직 처리되지 않은 바이트 수"""
+        total = 0
+        for seq in self._segments():
+            if seq < self._cp_seq:
+                continue
+            size = os.path.getsize(self._segment_path(seq))
+            total += size - (self._cp_offset if seq == self._cp_seq else 0)
+        return max(0, total)
+
+    def stats(self) -> Dict[str, Any]:
+        """spool 상태 및 처리 통계"""
+        return {
+            "accepting": self.accepting,
+            "directory": self.directory,
+            "segment": self._seq,
+            "checkpoint": {"segment": self._cp_seq, "offset": self._cp_offset},
+            "backlog_bytes": self.backlog_bytes(),
+            "pending_fsync": len(self._pending),
+            "appended": self.appended,
+            "appended_bytes": self.appended_bytes,
+            "fsyncs": self.fsyncs,
+            "avg_fsync_batch": round(self.appended / self.fsyncs, 2) if self.fsyncs else 0,
+            "replayed": self.replayed,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered,
+            "corrupted": self.corrupted,
+            "last_error": self.last_error,
+        }
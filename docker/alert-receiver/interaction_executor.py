@@ -0,0 +1,210 @@
+"""
+Slack 인터랙션 작업 실행기
+Socket Mode / HTTP 인터랙션은 Slack에 먼저 응답(ack)하고, 실제 처리(DB, Grafana, Slack API)는 여기서 실행
+
+- 고정 크기 스레드 풀 (INTERACTION_WORKERS) + 최대 대기 작업 수 (INTERACTION_QUEUE_MAX)
+- 같은 key(Incident)의 작업은 들어온 순서대로 하나씩 실행 (ACK → Resolve 순서 보장)
+- 서로 다른 key의 작업은 병렬 실행
+- 순서 대기 없이 바로 실행할 작업(Resolve 모달 열기 - trigger_id 3초 제한)은 별도의 작은 스레드 풀에서 실행
+  (기본 실행기(asyncio / Slack SDK 공용)와 분리, 대기 시간 / 처리 시간을 따로 집계)
+- 대기 시간 / 처리 시간 통계
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Tuple
+
+INTERACTION_WORKERS = int(os.getenv("INTERACTION_WORKERS", "4"))
+INTERACTION_QUEUE_MAX = int(os.getenv("INTERACTION_QUEUE_MAX", "200"))
+INTERACTION_URGENT_WORKERS = int(os.getenv("INTERACTION_URGENT_WORKERS", "2"))  # 바로 실행할 작업(Resolve 모달 열기) 스레드 수
+
+LATENCY_SAMPLES = 512  # p95 / p99 계산용 최근 표본 수
+
+Task = Tuple[Callable[[], Any], str, float]  # (함수, 이름, 등록 시각)
+
+
+class LatencyStats:
+    """지연 시간 통계 (최근 표본 기준 p95 / p99)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._samples: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def record(self, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self._samples.append(elapsed_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        samples = sorted(self._samples)
+
+        def percentile(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))], 1) if samples else 0
+
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0,
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max_ms, 1),
+        }
+
+
+class KeyedExecutor:
+    """key별 순서를 보장하는 제한된 스레드 풀"""
+
+    def __init__(self, workers: int = INTERACTION_WORKERS, max_pending: int = INTERACTION_QUEUE_MAX,
+                 urgent_workers: int = INTERACTION_URGENT_WORKERS):
+        self.workers = max(1, workers)
+        self.urgent_workers = max(1, urgent_workers)
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="interaction")
+        self._urgent_pool = ThreadPoolExecutor(max_workers=self.urgent_workers, thread_name_prefix="interaction-urgent")
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[Task]] = {}  # key → 실행 중인 작업 뒤에 대기 중인 작업
+        self._pending = 0
+
+        # 통계
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.queue_wait = LatencyStats()
+        self.duration = LatencyStats()
+        self._urgent_pending = 0
+        self.urgent_submitted = 0
+        self.urgent_rejected = 0
+        self.urgent_failed = 0
+        self.urgent_queue_wait = LatencyStats()
+        self.urgent_duration = LatencyStats()
+
+    def submit(self, key: str, fn: Callable[[], Any], name: str = "") -> bool:
+        """
+        작업 등록 (바로 반환)
+
+        Args:
+            key: 순서를 보장할 단위 (Incident 카드 message_ts 또는 incident_id)
+            fn: 실행할 함수 (인자 없음)
+            name: 로그 / 통계용 이름
+
+        Returns: 등록 여부 (대기 작업이 가득 차면 False)
+        """
+        task = (fn, name, time.monotonic())
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                return False
+            self.submitted += 1
+            self._pending += 1
+            queue = self._queues.get(key)
+            if queue is not None:
+                # 같은 key의 작업이 실행 중 → 끝나면 이어서 실행
+                queue.append(task)
+                return True
+            self._queues[key] = deque()
+        self._pool.submit(self._run, key, task)
+        return True
+
+    def submit_urgent(self, fn: Callable[[], Any], name: str = "") -> bool:
+        """
+        순서 대기 없이 바로 실행할 작업 등록 (전용 스레드 풀, 바로 반환)
+
+        Returns: 등록 여부 (대기 작업이 가득 차면 False)
+        """
+        task = (fn, name, time.monotonic())
+        with self._lock:
+            if self._urgent_pending >= self.max_pending:
+                self.urgent_rejected += 1
+                return False
+            self.urgent_submitted += 1
+            self._urgent_pending += 1
+        self._urgent_pool.submit(self._run_urgent, task)
+        return True
+
+    def _run_urgent(self, task: Task):
+        fn, name, enqueued_at = task
+        started = time.monotonic()
+        failed = False
+        try:
+            fn()
+        except Exception as e:
+            failed = True
+            print(f"❌ 인터랙션 처리 실패 ({name}): {e}")
+            import traceback
+            traceback.print_exc()
+        finished = time.monotonic()
+
+        with self._lock:
+            self._urgent_pending -= 1
+            if failed:
+                self.urgent_failed += 1
+            self.urgent_queue_wait.record((started - enqueued_at) * 1000)
+            self.urgent_duration.record((finished - started) * 1000)
+
+    def _run(self, key: str, task: Task):
+        while task is not None:
+            fn, name, enqueued_at = task
+            started = time.monotonic()
+            failed = False
+            try:
+                fn()
+            except Exception as e:
+                failed = True
+                print(f"❌ 인터랙션 처리 실패 ({name}): {e}")
+                import traceback
+                traceback.print_exc()
+            finished = time.monotonic()
+
+            with self._lock:
+                self._pending -= 1
+                if failed:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+                self.queue_wait.record((started - enqueued_at) * 1000)
+                self.duration.record((finished - started) * 1000)
+                queue = self._queues[key]
+                if queue:
+                    task = queue.popleft()
+                else:
+                    del self._queues[key]
+                    task = None
+
+    def shutdown(self, wait: bool = True):
+        """남은 작업 처리 후 종료"""
+        self._urgent_pool.shutdown(wait=wait)
+        self._pool.shutdown(wait=wait)
+
+    def stats(self) -> Dict[str, Any]:
+        """대기 작업 / 처리 시간 통계"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "pending_max": self.max_pending,
+                "active_keys": len(self._queues),
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "failed": self.failed,
+                "queue_wait": self.queue_wait.snapshot(),
+                "duration": self.duration.snapshot(),
+                "urgent": {
+                    "workers": self.urgent_workers,
+                    "pending": self._urgent_pending,
+                    "submitted": self.urgent_submitted,
+                    "rejected": self.urgent_rejected,
+                    "failed": self.urgent_failed,
+                    "queue_wait": self.urgent_queue_wait.snapshot(),
+                    "duration": self.urgent_duration.snapshot(),
+                },
+            }
+
+
+# 프로세스 공용 실행기 (Socket Mode / HTTP 인터랙션 공통)
+interaction_executor = KeyedExecutor()
@@ -0,0 +1,121 @@
+"""
+incident_key별 애플리케이션 락 (lock striping)
+같은 incident_key의 알람은 메모리에서 직렬화하고, 다른 key는 병렬로 처리
+- incident_key를 해시하여 고정 개수(stripe)의 락 중 하나에 매핑
+- payload에 여러 key가 있으면 stripe 번호 오름차순으로 획득 (교착 방지)
+- 락 대기 시간 히스토그램으로 경합 확인
+
+DB 락(SELECT FOR UPDATE, trg_prevent_duplicate_open_incident)은 replica 간 안전장치로 유지
+"""
+import asyncio
+import os
+import threading
+import time
+import zlib
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Iterable, List
+
+KEY_LOCK_STRIPES = int(os.getenv("KEY_LOCK_STRIPES", "64"))
+
+# 대기 시간 히스토그램 구간 (ms, 이하)
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class KeyLockStripes:
+    """
+    incident_key → stripe 락
+    동기 경로(Ingest worker 스레드)는 threading.Lock, 비동기 경로(이벤트 루프)는 asyncio.Lock 사용
+    """
+
+    def __init__(self, stripes: int = KEY_LOCK_STRIPES):
+        self.stripes = max(1, stripes)
+        self._thread_locks = [threading.Lock() for _ in range(self.stripes)]
+        self._async_locks = [asyncio.Lock() for _ in range(self.stripes)]
+        self._stats_lock = threading.Lock()
+
+        # 통계
+        self.acquisitions = 0
+        self.contended = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def stripe_of(self, incident_key: str) -> int:
+        """incident_key의 stripe 번호"""
+        return zlib.crc32(incident_key.encode()) % self.stripes
+
+    def stripes_for(self, incident_keys: Iterable[str]) -> List[int]:
+        """획득할 stripe 번호 (중복 제거, 오름차순)"""
+        return sorted({self.stripe_of(key) for key in incident_keys})
+
+    @contextmanager
+    def hold(self, incident_keys: Iterable[str]):
+        """
+        동기 경로용: with key_locks.hold(keys): ...
+        """
+        started = time.monotonic()
+        contended = False
+        acquired = []
+        try:
+            for stripe in self.stripes_for(incident_keys):
+                lock = self._thread_locks[stripe]
+                if not lock.acquire(blocking=False):
+                    contended = True
+                    lock.acquire()
+                acquired.append(lock)
+            self._record(time.monotonic() - started, contended)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    @asynccontextmanager
+    async def hold_async(self, incident_keys: Iterable[str]):
+        """
+        비동기 경로용: async with key_locks.hold_async(keys): ...
+        """
+        started = time.monotonic()
+        contended = False
+        acquired = []
+        try:
+            for stripe in self.stripes_for(incident_keys):
+                lock = self._async_locks[stripe]
+                if lock.locked():
+                    contended = True
+                await lock.acquire()
+                acquired.append(lock)
+            self._record(time.monotonic() - started, contended)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def _record(self, wait: float, contended: bool):
+        """락 대기 시간 기록"""
+        wait_ms = wait * 1000
+        bucket = next((i for i, limit in enumerate(WAIT_BUCKETS_MS) if wait_ms <= limit), len(WAIT_BUCKETS_MS))
+        with self._stats_lock:
+            self.acquisitions += 1
+            if contended:
+                self.contended += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.histogram[bucket] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """락 경합 및 대기 시간 히스토그램"""
+        with self._stats_lock:
+            histogram = {f"le_{limit}ms": count for limit, count in zip(WAIT_BUCKETS_MS, self.histogram)}
+            histogram["gt_%dms" % WAIT_BUCKETS_MS[-1]] = self.histogram[-1]
+            return {
+                "stripes": self.stripes,
+                "acquisitions": self.acquisitions,
+                "contended": self.contended,
+                "avg_wait_ms": round(self.total_wait / self.acquisitions * 1000, 3) if self.acquisitions else 0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "wait_histogram": histogram,
+            }
+
+
+# 프로세스 공용 락
+key_locks = KeyLockStripes()
@@ -0,0 +1,177 @@
+"""
+AI 분석 프롬프트용 알람 컨텍스트 (토큰 예산 기반)
+알람마다 전체 labels JSON을 넣지 않고 압축된 텍스트로 변환
+
+- 모든 알람에 같은 label은 "공통 labels"로 한 번만 표시, 알람별로는 다른 label만 표시
+- 같은 알람(alertname + severity + state)은 한 줄로 묶고 횟수 표시, 알람마다 다른 label 값은 모아서 표시
+  (예: pod=api-0|api-1|api-2), message는 가장 최근 것만
+- severity → firing 여부 → 최근 수신 순으로 정렬
+- AI_CONTEXT_TOKEN_BUDGET을 넘는 알람 종류는 생략하고 생략 건수만 표시
+"""
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from slack_scheduler import severity_priority
+
+AI_CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "512"))  # 알람 컨텍스트 최대 토큰 (추정)
+AI_CONTEXT_MAX_ALERTS = int(os.getenv("AI_CONTEXT_MAX_ALERTS", "50"))  # DB에서 읽는 최근 알람 수
+AI_CONTEXT_MESSAGE_CHARS = int(os.getenv("AI_CONTEXT_MESSAGE_CHARS", "160"))  # 알람 종류별 message 길이
+AI_CONTEXT_LABEL_VALUES = 5  # label별 표시할 최대 값 수
+
+# 분석에 도움이 되지 않는 label (Grafana 내부 값)
+IGNORED_LABELS = {"__alert_rule_uid__", "__alert_rule_namespace_uid__", "rule_uid", "grafana_folder"}
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토큰 수 추정 (tokenizer 없이)
+    ASCII 4글자당 1토큰, 한글 등 그 외 문자는 1글자당 1토큰
+    """
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def _clean_labels(labels: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        key: str(value)
+        for key, value in (labels or {}).items()
+        if key not in IGNORED_LABELS and value not in (None, "")
+    }
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    return ", ".join(f"{key}={value}" for key, value in sorted(labels.items()))
+
+
+def _format_label_values(label_values: Dict[str, List[str]]) -> str:
+    parts = []
+    for key, values in sorted(label_values.items()):
+        shown = "|".join(values[:AI_CONTEXT_LABEL_VALUES])
+        if len(values) > AI_CONTEXT_LABEL_VALUES:
+            shown += f"|+{len(values) - AI_CONTEXT_LABEL_VALUES}"
+        parts.append(f"{key}={shown}")
+    return ", ".join(parts)
+
+
+def _format_time(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.strftime("%m-%d %H:%M:%S")
+    return str(value) if value else ""
+
+
+def group_alerts(alerts: List[Dict[str, Any]]) -> Tuple[Dict[str, str], List[Dict[str, Any]]]:
+    """
+    알람을 공통 labels와 중복 제거된 알람 종류로 변환
+
+    Returns: (공통 labels, [{alertname, state, severity, label_values(다른 것만, 최근 순), message, count, last_received_at}])
+        알람 종류는 severity → firing 여부 → 최근 수신 순
+    """
+    cleaned = [_clean_labels(alert.get("labels")) for alert in alerts]
+    common: Dict[str, str] = dict(cleaned[0]) if cleaned else {}
+    for labels in cleaned[1:]:
+        common = {key: value for key, value in common.items() if labels.get(key) == value}
+    # 알람 이름 / severity는 알람 종류마다 따로 표시
+    common.pop("alertname", None)
+    common.pop("severity", None)
+
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    for order, (alert, labels) in enumerate(zip(alerts, cleaned)):
+        alertname = alert.get("alertname") or labels.get("alertname") or "Unknown"
+        severity = labels.get("severity")
+        key = (alertname, severity, alert.get("state") or "")
+        group = groups.get(key)
+        if group is None:
+            # 알람은 최근 수신 순으로 들어오므로 처음 본 알람이 가장 최근 값
+            group = groups[key] = {
+                "alertname": alertname,
+                "state": alert.get("state"),
+                "severity": severity,
+                "label_values": {},
+                "message": _SPACE_RE.sub(" ", alert.get("message") or "").strip(),
+                "count": 0,
+                "last_received_at": alert.get("received_at"),
+                "order": order,
+            }
+        group["count"] += 1 + (alert.get("repeat_count") or 0)
+        for label, value in labels.items():
+            if label in common or label in ("alertname", "severity"):
+                continue
+            values = group["label_values"].setdefault(label, [])
+            if value not in values:
+                values.append(value)
+
+    ranked = sorted(
+        groups.values(),
+        key=lambda g: (severity_priority(g["severity"]), g["state"] == "resolved", g["order"])
+    )
+    return common, ranked
+
+
+def format_group(group: Dict[str, Any], message_chars: int = AI_CONTEXT_MESSAGE_CHARS) -> str:
+    """알람 종류 1줄"""
+    parts = [f"- [{group['severity'] or '-'}] {group['alertname']}"]
+    if group["count"] > 1:
+        parts.append(f" ×{group['count']}")
+    meta = [value for value in (group["state"], _format_time(group["last_received_at"])) if value]
+    if meta:
+        parts.append(f" ({', '.join(meta)})")
+    if group["label_values"]:
+        parts.append(f" {_format_label_values(group['label_values'])}")
+    if group["message"]:
+        message = group["message"]
+        if len(message) > message_chars:
+            message = message[:message_chars] + "…"
+        parts.append(f" | {message}")
+    return "".join(parts)
+
+
+def build_alert_context(alerts: List[Dict[str, Any]],
+                        token_budget: int = AI_CONTEXT_TOKEN_BUDGET) -> Tuple[str, Dict[str, Any]]:
+    """
+    프롬프트의 "관련 알람" 섹션 생성
+
+    Args:
+        alerts: 최근 수신 순 알람 (alertname, message, labels, state, received_at, repeat_count)
+        token_budget: 섹션 최대 토큰 (추정)
+
+    Returns: (컨텍스트 텍스트, {alerts, groups, included_groups, omitted_alerts, tokens})
+    """
+    if not alerts:
+        return "없음", {"alerts": 0, "groups": 0, "included_groups": 0, "omitted_alerts": 0, "tokens": 1}
+
+    common, groups = group_alerts(alerts)
+    total = sum(group["count"] for group in groups)
+    lines = []
+    if common:
+        lines.append(f"공통 labels: {_format_labels(common)}")
+    lines.append(f"알람 {total}건, {len(groups)}종류 (심각도 / 최근 순):")
+
+    # 생략 안내 줄을 위한 여유분
+    used = estimate_tokens("\n".join(lines)) + 16
+    included = 0
+    for group in groups:
+        line = format_group(group)
+        cost = estimate_tokens(line) + 1
+        if included and used + cost > token_budget:
+            break
+        lines.append(line)
+        used += cost
+        included += 1
+
+    omitted = groups[included:]
+    omitted_alerts = sum(group["count"] for group in omitted)
+    if omitted:
+        lines.append(f"(이하 {len(omitted)}종류 {omitted_alerts}건 생략)")
+
+    text = "\n".join(lines)
+    return text, {
+        "alerts": total,
+        "groups": len(groups),
+        "included_groups": included,
+        "omitted_alerts": omitted_alerts,
+        "tokens": estimate_tokens(text),
+    }
@@ -0,0 +1,379 @@
+"""
+해결된 Incident 유사도 검색 인덱스 (AI 프롬프트의 과거 유사 사건)
+incident_key, alertname, labels, action_taken, root_cause로 BM25(TF-IDF 계열) 역색인 구성
+
+- 프로세스 메모리 역색인 → 요청마다 incidents 테이블을 스캔하지 않음 (조회 수 ms)
+- Incident가 resolve되면 해당 Incident만 추가/갱신 (증분 색인, 백그라운드 스레드)
+  초기 로드 / 재구성이 끝난 뒤에 반영 (로드가 인덱스를 교체하면서 그 사이 색인한 Incident를 잃지 않도록)
+- SIMILAR_INDEX_PATH JSON 파일에 저장 → 재시작 시 로드
+- 전체 재구성 CLI:
+    python similar_incidents.py rebuild
+    python similar_incidents.py search "KubePodCrashLooping payment"
+"""
+import json
+import math
+import os
+import queue
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from db_pool import get_db_connection
+
+SIMILAR_INDEX_ENABLED = os.getenv("SIMILAR_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+SIMILAR_INDEX_PATH = os.getenv("SIMILAR_INDEX_PATH", "./data/similar_incidents.json")
+SIMILAR_TOP_K = int(os.getenv("SIMILAR_TOP_K", "3"))
+SIMILAR_MIN_SCORE = float(os.getenv("SIMILAR_MIN_SCORE", "1.0"))  # 이보다 낮은 점수는 유사 사건으로 보지 않음
+
+INDEX_VERSION = 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 색인하지 않는 label (값이 Incident마다 달라 유사도에 도움이 되지 않음)
+IGNORED_LABELS = {"__alert_rule_uid__", "rule_uid", "grafana_folder", "instance", "pod", "container_id"}
+
+_TOKEN_RE = re.compile(r"[\w.\-]+", re.UNICODE)
+
+# 해결된 Incident + 최근 알람 1개 (incident_id 조건은 호출자가 추가)
+_DOCUMENT_SQL = """
+    SELECT i.incident_id, i.incident_key, i.severity, i.cluster, i.namespace, i.service,
+           i.action_taken, i.root_cause, i.resolved_time,
+           a.alertname, a.labels
+    FROM incidents i
+    LEFT JOIN grafana_alerts a ON a.alert_id = (
+        SELECT MAX(alert_id) FROM grafana_alerts WHERE incident_id = i.incident_id
+    )
+    WHERE i.status = 'resolved'
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """소문자 단어 토큰 (한글 포함)"""
+    return [token for token in _TOKEN_RE.findall((text or "").lower()) if len(token) > 1]
+
+
+def label_terms(labels: Dict[str, Any]) -> List[str]:
+    """label을 key=value 토큰과 값 토큰으로 변환"""
+    terms = []
+    for key, value in sorted((labels or {}).items()):
+        if key in IGNORED_LABELS or value in (None, ""):
+            continue
+        value = str(value).lower()
+        terms.append(f"{key.lower()}={value}")
+        terms.extend(tokenize(value))
+    return terms
+
+
+def document_terms(incident_key: Optional[str], alertname: Optional[str], labels: Dict[str, Any],
+                   action_taken: Optional[str] = None, root_cause: Optional[str] = None) -> List[str]:
+    """Incident 문서 / 검색 질의 공용 토큰"""
+    terms = []
+    if incident_key:
+        terms.append(f"key={incident_key}")
+    if alertname:
+        terms.append(f"alertname={alertname.lower()}")
+        terms.extend(tokenize(alertname))
+    terms.extend(label_terms(labels))
+    terms.extend(tokenize(action_taken))
+    terms.extend(tokenize(root_cause))
+    return terms
+
+
+def _row_to_document(row: Dict[str, Any]) -> Dict[str, Any]:
+    labels = row.get("labels") or {}
+    if isinstance(labels, (str, bytes)):
+        labels = json.loads(labels)
+    resolved_time = row.get("resolved_time")
+    return {
+        "incident_id": row["incident_id"],
+        "incident_key": row["incident_key"],
+        "alertname": row.get("alertname") or labels.get("alertname"),
+        "service": row.get("service"),
+        "action_taken": row.get("action_taken"),
+        "root_cause": row.get("root_cause"),
+        "resolved_time": resolved_time.isoformat() if hasattr(resolved_time, "isoformat") else resolved_time,
+        "terms": document_terms(row["incident_key"], row.get("alertname") or labels.get("alertname"), labels,
+                                row.get("action_taken"), row.get("root_cause")),
+    }
+
+
+class SimilarIncidentIndex:
+    """해결된 Incident BM25 역색인 (스레드 안전)"""
+
+    def __init__(self, path: str = SIMILAR_INDEX_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()  # 파일 쓰기 + rename 직렬화 (나중 snapshot이 항상 나중에 기록됨)
+        self._loaded = threading.Event()  # 초기 로드 / 재구성 완료 → 증분 색인 시작
+        self._docs: Dict[str, Dict[str, Any]] = {}  # incident_id → {메타데이터, length}
+        self._postings: Dict[str, Dict[str, int]] = {}  # term → {incident_id: tf}
+        self._total_length = 0
+        self._dirty = False
+        self._updates: "queue.Queue[str]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+        # 통계
+        self.searches = 0
+        self.total_search_ms = 0.0
+        self.indexed = 0
+        self.errors = 0
+
+    # ------------------------------------------------------------------
+    # 색인
+    # ------------------------------------------------------------------
+    def add(self, document: Dict[str, Any]):
+        """문서 추가 (같은 incident_id는 교체)"""
+        terms = document.pop("terms")
+        with self._lock:
+            self._remove(document["incident_id"])
+            counts = Counter(terms)
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[document["incident_id"]] = tf
+            document["length"] = len(terms)
+            document["terms"] = dict(counts)
+            self._docs[document["incident_id"]] = document
+            self._total_length += len(terms)
+            self._dirty = True
+
+    def _remove(self, incident_id: str):
+        old = self._docs.pop(incident_id, None)
+        if old is None:
+            return
+        for term in old["terms"]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(incident_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= old["length"]
+
+    def index_incident(self, incident_id: str):
+        """해결된 Incident 1건을 DB에서 읽어 색인 (resolve commit 후, 백그라운드)"""
+        if not SIMILAR_INDEX_ENABLED:
+            return
+        self._updates.put(incident_id)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run_updates, name="similar-index", daemon=True)
+                self._thread.start()
+
+    def mark_loaded(self):
+        """초기 로드 / 재구성 완료 (실패해도 호출 - 대기 중인 증분 색인 시작)"""
+        self._loaded.set()
+
+    def _run_updates(self):
+        # 로드 전에 들어온 Incident는 큐에서 대기 → 로드가 인덱스를 교체한 뒤 반영
+        self._loaded.wait()
+        while True:
+            incident_ids = [self._updates.get()]
+            while True:
+                try:
+                    incident_ids.append(self._updates.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                conn = get_db_connection()
+                try:
+                    placeholders = ", ".join(["%s"] * len(incident_ids))
+                    with conn.cursor() as cursor:
+                        cursor.execute(_DOCUMENT_SQL + f" AND i.incident_id IN ({placeholders})", incident_ids)
+                        rows = cursor.fetchall()
+                finally:
+                    conn.close()
+                for row in rows:
+                    self.add(_row_to_document(row))
+                self.indexed += len(rows)
+                self.save()
+                print(f"🔎 유사 사건 인덱스 갱신: {len(rows)}건 (전체 {len(self._docs)}건)")
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️  유사 사건 인덱스 갱신 실패: {e}")
+
+    def rebuild(self, conn) -> int:
+        """해결된 Incident 전체로 인덱스 재구성 (CLI / 인덱스 파일이 없을 때)"""
+        with conn.cursor() as cursor:
+            cursor.execute(_DOCUMENT_SQL)
+            rows = cursor.fetchall()
+        with self._lock:
+            self._docs, self._postings, self._total_length = {}, {}, 0
+            for row in rows:
+                self.add(_row_to_document(row))
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # 검색
+    # ------------------------------------------------------------------
+    def search(self, terms: List[str], k: int = SIMILAR_TOP_K, exclude: Optional[str] = None,
+               min_score: float = SIMILAR_MIN_SCORE) -> List[Dict[str, Any]]:
+        """
+        BM25 상위 k개 해결된 Incident
+
+        Returns: [{incident_id, incident_key, alertname, service, action_taken, root_cause, resolved_time, score}]
+        """
+        started = time.monotonic()
+        with self._lock:
+            n = len(self._docs)
+            if n == 0:
+                return []
+            avgdl = self._total_length / n
+            scores: Dict[str, float] = {}
+            for term, qtf in Counter(terms).items():
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for incident_id, tf in postings.items():
+                    length = self._docs[incident_id]["length"]
+                    norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl))
+                    scores[incident_id] = scores.get(incident_id, 0.0) + idf * norm * qtf
+            scores.pop(exclude, None)
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            hits = [
+                dict({key: value for key, value in self._docs[incident_id].items() if key not in ("terms", "length")},
+                     score=round(score, 3))
+                for incident_id, score in top if score >= min_score
+            ]
+        self.searches += 1
+        self.total_search_ms += (time.monotonic() - started) * 1000
+        return hits
+
+    def similar_to(self, incident_info: Dict[str, Any], alerts: list, k: int = SIMILAR_TOP_K) -> List[Dict[str, Any]]:
+        """분석 중인 Incident(최근 알람 포함)와 유사한 해결된 Incident"""
+        terms = [f"key={incident_info['incident_key']}"] if incident_info.get("incident_key") else []
+        for alert in alerts[:5]:
+            terms.extend(document_terms(None, alert.get("alertname"), alert.get("labels") or {}))
+        return self.search(terms, k, exclude=incident_info.get("incident_id"))
+
+    # ------------------------------------------------------------------
+    # 저장 / 로드
+    # ------------------------------------------------------------------
+    def save(self):
+        """
+        인덱스 파일 저장 (변경이 있을 때만, 임시 파일 → rename)
+        snapshot부터 rename까지 _save_lock으로 직렬화 - 동시 저장이 같은 임시 파일을 쓰거나
+        오래된 snapshot이 최신 파일을 덮어쓰지 않음 (검색은 _lock만 사용하므로 막히지 않음)
+        """
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = {"version": INDEX_VERSION, "documents": list(self._docs.values())}
+                self._dirty = False
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # 프로세스별 임시 파일 (CLI rebuild와 서버가 동시에 저장하는 경우)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                with self._lock:
+                    self._dirty = True  # 다음 저장에서 다시 시도
+                raise
+
+    def load(self) -> bool:
+        """인덱스 파일 로드 (파일이 없거나 버전이 다르면 False)"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            return False
+        with self._lock:
+            self._docs, self._postings, self._total_length = {}, {}, 0
+            for document in data["documents"]:
+                counts = document.pop("terms")
+                document.pop("length", None)
+                document["terms"] = [term for term, tf in counts.items() for _ in range(tf)]
+                self.add(document)
+            self._dirty = False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """인덱스 크기 / 검색 시간 통계"""
+        with self._lock:
+            documents, terms = len(self._docs), len(self._postings)
+        return {
+            "enabled": SIMILAR_INDEX_ENABLED,
+            "documents": documents,
+            "terms": terms,
+            "indexed": self.indexed,
+            "searches": self.searches,
+            "avg_search_ms": round(self.total_search_ms / self.searches, 3) if self.searches else 0,
+            "errors": self.errors,
+        }
+
+
+# 프로세스 공용 인덱스
+similar_index = SimilarIncidentIndex()
+
+
+def load_or_rebuild() -> int:
+    """
+    시작 시 인덱스 파일 로드, 없으면 DB에서 재구성 후 저장
+    끝나면(실패해도) 대기 중인 증분 색인 시작
+    """
+    try:
+        if similar_index.load():
+            return similar_index.stats()["documents"]
+        conn = get_db_connection()
+        try:
+            count = similar_index.rebuild(conn)
+        finally:
+            conn.close()
+        similar_index.save()
+        return count
+    finally:
+        similar_index.mark_loaded()
+
+
+def format_similar_incidents(hits: List[Dict[str, Any]]) -> str:
+    """프롬프트용 과거 유사 사건 텍스트"""
+    if not hits:
+        return "없음"
+    lines = []
+    for hit in hits:
+        resolved = f"[{hit['resolved_time'][:10]}] " if hit.get("resolved_time") else ""
+        lines.append(
+            f"- {resolved}{hit.get('alertname') or 'Unknown'}"
+            f" (service: {hit.get('service') or '-'}, key: {hit.get('incident_key')})"
+        )
+        if hit.get("root_cause"):
+            lines.append(f"  근본 원인: {hit['root_cause'][:200]}")
+        if hit.get("action_taken"):
+            lines.append(f"  조치 내용: {hit['action_taken'][:200]}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="해결된 Incident 유사도 검색 인덱스")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="DB의 해결된 Incident 전체로 인덱스 재구성")
+    search_parser = sub.add_parser("search", help="인덱스 파일에서 검색")
+    search_parser.add_argument("query")
+    search_parser.add_argument("-k", type=int, default=SIMILAR_TOP_K)
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        started = time.monotonic()
+        conn = get_db_connection()
+        try:
+            count = similar_index.rebuild(conn)
+        finally:
+            conn.close()
+        similar_index.save()
+        print(f"✅ 유사 사건 인덱스 재구성: {count}건, {time.monotonic() - started:.1f}초 → {similar_index.path}")
+    else:
+        if not similar_index.load():
+            raise SystemExit(f"❌ 인덱스 파일이 없습니다: {similar_index.path} (먼저 rebuild 실행)")
+        query_terms = []
+        for word in args.query.split():
+            query_terms.extend(label_terms({"alertname": word}) if "=" not in word else [word.lower()])
+        for hit in similar_index.search(query_terms, args.k, min_score=0):
+            print(json.dumps(hit, ensure_ascii=False, default=str))
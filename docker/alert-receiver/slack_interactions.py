@@ -79,7 +79,9 @@ def extract_button_action(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     Returns: {
         "action_id": "incident_ack",
         "value": {"incident_id": "...", "incident_key": "...", "action": "ack"},
-        "user": {"id": "...", "name": "..."}
+        "user": {"id": "...", "name": "..."},
+        "action_ts": "...",  # 클릭마다 고유 (재전송 시 동일) - 중복 처리 방지용
+        "trigger_id": "..."  # 모달 열기용
     } 또는 None
     """
     if payload.get("type") != "block_actions":
@@ -107,6 +109,8 @@ def extract_button_action(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         "action_id": action_id,
         "value": value,
         "user": user,
+        "action_ts": action.get("action_ts"),
+        "trigger_id": payload.get("trigger_id") or payload.get("container", {}).get("trigger_id"),
         "response_url": payload.get("response_url"),  # 스레드 댓글용
         "channel": payload.get("channel", {}).get("id"),
         "message_ts": payload.get("message", {}).get("ts")  # 원본 메시지 timestamp
@@ -0,0 +1,318 @@
+"""
+Slack Outbox (Transactional Outbox)
+신규 Incident의 Slack 카드 전송을 DB 트랜잭션 안에서 slack_outbox 테이블에 기록하고,
+commit 후 dispatcher가 전송 → slack_message_ts 저장
+
+- webhook 처리 트랜잭션이 Slack API 응답을 기다리며 incident Row Lock을 잡지 않음
+- slack_outbox (incident_id, kind) UNIQUE → 신규 Incident당 카드 1회
+- 여러 replica의 dispatcher는 FOR UPDATE SKIP LOCKED로 같은 행을 동시에 처리하지 않음
+- 행을 status='sending' + lease(next_attempt_at)로 claim하고 commit한 뒤 전송
+  (전송 중에 Row Lock / DB 연결을 잡지 않음, lease가 지난 sending 행은 프로세스 중단으로 보고 다시 전송)
+- 실패 시 지수 백오프로 재시도, SLACK_OUTBOX_MAX_ATTEMPTS 초과 시 failed
+- 전송 중 대기 시간 초과로 결과를 알 수 없으면 unknown (다시 보내지 않음 - 카드 중복 방지)
+"""
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import slack_sender
+from slack_sender import create_incident_card, post_incident_card, SlackDeliveryUnknown, SLACK_SEND_TIMEOUT_SECONDS, SLACK_SEND_INFLIGHT_GRACE_SECONDS
+from db_pool import get_db_connection
+from incident_index import open_incidents
+from card_index import card_index
+from card_refresher import card_refresher
+
+SLACK_OUTBOX_ENABLED = os.getenv("SLACK_OUTBOX_ENABLED", "true").lower() in ("1", "true", "yes")
+SLACK_OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv("SLACK_OUTBOX_POLL_INTERVAL_SECONDS", "2"))
+SLACK_OUTBOX_BATCH = int(os.getenv("SLACK_OUTBOX_BATCH", "20"))
+SLACK_OUTBOX_MAX_ATTEMPTS = int(os.getenv("SLACK_OUTBOX_MAX_ATTEMPTS", "10"))
+SLACK_OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("SLACK_OUTBOX_RETRY_BASE_SECONDS", "5"))
+SLACK_OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("SLACK_OUTBOX_RETRY_MAX_SECONDS", "300"))
+# claim한 행의 lease (전송 결과 대기 최대 시간보다 길어야 다른 replica가 전송 중인 행을 가져가지 않음)
+SLACK_OUTBOX_LEASE_SECONDS = int(os.getenv(
+    "SLACK_OUTBOX_LEASE_SECONDS", str(int(SLACK_SEND_TIMEOUT_SECONDS + SLACK_SEND_INFLIGHT_GRACE_SECONDS) + 30)))
+
+KIND_INCIDENT_CARD = "incident_card"
+
+
+def slack_configured() -> bool:
+    """Slack 전송 수단(Webhook 또는 Bot Token) 설정 여부"""
+    return bool(slack_sender.SLACK_WEBHOOK_URL or slack_sender.SLACK_BOT_TOKEN)
+
+
+def build_incident_card_insert(incident: Dict[str, Any], alert_info: Dict[str, Any]) -> Tuple[str, tuple]:
+    """
+    신규 Incident 카드 outbox INSERT 문 (동기/비동기 경로 공용)
+    카드 내용 중 status, alert_count는 전송 시점의 incidents 값을 사용
+    """
+    payload = {
+        "incident_key": incident["incident_key"],
+        "severity": alert_info["severity"],
+        "cluster": alert_info["cluster"] or "",
+        "namespace": alert_info["namespace"] or "",
+        "phase": alert_info["phase"] or "",
+        "service": alert_info["service"] or "",
+        "start_time": incident["start_time"].isoformat(),
+    }
+    sql = """
+        INSERT IGNORE INTO slack_outbox (incident_id, kind, payload)
+        VALUES (%s, %s, %s)
+    """
+    return sql, (incident["incident_id"], KIND_INCIDENT_CARD, json.dumps(payload))
+
+
+def enqueue_incident_card(conn, incident: Dict[str, Any], alert_info: Dict[str, Any]) -> bool:
+    """
+    신규 Incident 카드 전송을 outbox에 기록
+    주의: commit은 호출자에서 처리 (incident 생성과 같은 트랜잭션)
+
+    Returns: 기록 여부
+    """
+    sql, params = build_incident_card_insert(incident, alert_info)
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount > 0
+
+
+def retry_delay(attempts: int) -> float:
+    """attempts번 실패 후 다음 시도까지 대기 시간 (지수 백오프)"""
+    return min(SLACK_OUTBOX_RETRY_BASE_SECONDS * (2 ** (attempts - 1)), SLACK_OUTBOX_RETRY_MAX_SECONDS)
+
+
+class SlackOutboxDispatcher:
+    """slack_outbox의 pending 행을 전송하는 백그라운드 작업"""
+
+    def __init__(self, poll_interval: float = SLACK_OUTBOX_POLL_INTERVAL_SECONDS, batch: int = SLACK_OUTBOX_BATCH):
+        self.poll_interval = poll_interval
+        self.batch = batch
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # 통계
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.unknown = 0
+        self.reclaimed = 0
+        self.total_delivery_latency = 0.0
+        self.last_error: Optional[str] = None
+
+    async def start(self):
+        """dispatcher 시작 (이벤트 루프에서 호출)"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        print(f"✅ Slack outbox dispatcher 시작: poll={self.poll_interval}s, batch={self.batch}")
+
+    def wake(self):
+        """commit 직후 즉시 전송 요청 (워커 스레드에서도 호출 가능)"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def stop(self):
+        """dispatcher 종료 (전송 중이던 행은 lease가 지나면 다시 전송)"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                # 한 번에 batch개까지 전송, 남은 행이 있으면 바로 다음 batch
+                while await asyncio.to_thread(self.dispatch_batch) >= self.batch:
+                    pass
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Slack outbox 처리 실패: {e}")
+
+    def dispatch_batch(self) -> int:
+        """
+        전송할 행을 최대 batch개 처리 (행마다 claim → 전송 → 결과 기록)
+
+        Returns: 처리한 행 수
+        """
+        processed = 0
+        while processed < self.batch:
+            row = self._claim()
+            if not row:
+                break
+            self._dispatch(row)
+            processed += 1
+        return processed
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """
+        전송할 행 1개를 sending으로 바꾸고 commit (lease = next_attempt_at)
+        pending 행과 lease가 지난 sending 행이 대상
+
+        Returns: claim한 행 (attempts는 이번 시도 포함), 없으면 None
+        """
+        conn = get_db_connection()
+        try:
+            conn.autocommit(False)
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT o.outbox_id, o.incident_id, o.kind, o.payload, o.attempts, o.created_at,
+                           o.status AS outbox_status,
+                           i.incident_key, i.status, i.alert_count, i.slack_message_ts
+                    FROM slack_outbox o
+                    JOIN incidents i ON i.incident_id = o.incident_id
+                    WHERE o.status IN ('pending', 'sending')
+                      AND o.next_attempt_at <= NOW()
+                    ORDER BY o.outbox_id
+                    LIMIT 1
+                    FOR UPDATE OF o SKIP LOCKED
+                """)
+                row = cursor.fetchone()
+                if not row:
+                    conn.rollback()
+                    return None
+                cursor.execute("""
+                    UPDATE slack_outbox
+                    SET status = 'sending', attempts = attempts + 1,
+                        next_attempt_at = NOW() + INTERVAL %s SECOND
+                    WHERE outbox_id = %s
+                """, (SLACK_OUTBOX_LEASE_SECONDS, row["outbox_id"]))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        if row["outbox_status"] == "sending":
+            self.reclaimed += 1
+            print(f"⚠️  Slack outbox lease 만료 행 다시 전송: outbox_id={row['outbox_id']}, incident_id={row['incident_id']}")
+        row["attempts"] += 1
+        return row
+
+    def _record(self, sql: str, params: tuple, incident_sql: Optional[str] = None, incident_params: tuple = ()):
+        """전송 결과 기록 (별도 트랜잭션)"""
+        conn = get_db_connection()
+        try:
+            conn.autocommit(False)
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                if incident_sql:
+                    cursor.execute(incident_sql, incident_params)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _dispatch(self, row: Dict[str, Any]):
+        """claim한 행 전송 (Row Lock / DB 연결 없이) → 결과 기록"""
+        attempts = row["attempts"]
+        try:
+            ts = self._deliver(row)
+        except SlackDeliveryUnknown as e:
+            # 전송됐을 수 있음 → 다시 보내면 카드 중복, unknown으로 남기고 재시도하지 않음
+            self.last_error = str(e)
+            self._record("""
+                UPDATE slack_outbox SET status = 'unknown', last_error = %s
+                WHERE outbox_id = %s
+            """, (str(e)[:1000], row["outbox_id"]))
+            self.unknown += 1
+            print(f"⚠️  Slack outbox 전송 결과 알 수 없음 (재전송 안 함): outbox_id={row['outbox_id']}, incident_id={row['incident_id']}: {e}")
+            return
+        except Exception as e:
+            self.last_error = str(e)
+            if attempts >= SLACK_OUTBOX_MAX_ATTEMPTS:
+                self._record("""
+                    UPDATE slack_outbox
+                    SET status = 'failed', last_error = %s
+                    WHERE outbox_id = %s
+                """, (str(e)[:1000], row["outbox_id"]))
+                self.failed += 1
+                print(f"❌ Slack outbox 전송 포기: outbox_id={row['outbox_id']}, incident_id={row['incident_id']}, attempts={attempts}: {e}")
+            else:
+                delay = retry_delay(attempts)
+                self._record("""
+                    UPDATE slack_outbox
+                    SET status = 'pending', last_error = %s,
+                        next_attempt_at = NOW() + INTERVAL %s SECOND
+                    WHERE outbox_id = %s
+                """, (str(e)[:1000], int(delay), row["outbox_id"]))
+                self.retried += 1
+                print(f"⏳ Slack outbox 재시도 예약: outbox_id={row['outbox_id']}, {int(delay)}초 후 ({attempts}/{SLACK_OUTBOX_MAX_ATTEMPTS}): {e}")
+            return
+
+        self._record("""
+            UPDATE slack_outbox
+            SET status = 'sent', slack_message_ts = %s, sent_at = %s
+            WHERE outbox_id = %s
+        """, (ts, datetime.now(), row["outbox_id"]),
+            incident_sql="""
+                UPDATE incidents SET slack_message_ts = %s, slack_channel = %s
+                WHERE incident_id = %s AND slack_message_ts IS NULL
+            """ if ts else None,
+            incident_params=(ts, slack_sender.SLACK_CHANNEL, row["incident_id"]))
+
+        if ts:
+            open_incidents.update(row["incident_id"], slack_message_ts=ts)
+            card_index.remember(slack_sender.SLACK_CHANNEL, ts, row["incident_id"], row["incident_key"])
+            print(f"💾 Slack message_ts 저장: incident_id={row['incident_id']}, ts={ts}")
+        self.sent += 1
+        self.total_delivery_latency += max((datetime.now() - row["created_at"]).total_seconds(), 0)
+
+    def _deliver(self, row: Dict[str, Any]) -> Optional[str]:
+        """outbox 행 전송 (실패 시 예외)"""
+        if row["kind"] != KIND_INCIDENT_CARD:
+            raise ValueError(f"알 수 없는 outbox kind: {row['kind']}")
+        payload = row["payload"]
+        if isinstance(payload, (str, bytes)):
+            payload = json.loads(payload)
+        blocks = create_incident_card(
+            incident_id=row["incident_id"],
+            incident_key=payload["incident_key"],
+            status=row["status"],
+            severity=payload["severity"],
+            cluster=payload["cluster"],
+            namespace=payload["namespace"],
+            phase=payload["phase"],
+            service=payload["service"],
+            alert_count=row["alert_count"],
+            start_time=datetime.fromisoformat(payload["start_time"]),
+            is_new_incident=True
+        )
+        ts = post_incident_card(blocks, severity=payload["severity"])
+        print(f"📤 신규 Incident 메시지 전송 (outbox): incident_id={row['incident_id']}, ts={ts}")
+        if ts:
+            card_refresher.remember(row["incident_id"], blocks)
+        return ts
+
+    def stats(self) -> Dict[str, Any]:
+        """전송 통계"""
+        return {
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "unknown": self.unknown,
+            "reclaimed": self.reclaimed,
+            "avg_delivery_latency_ms": round(self.total_delivery_latency / self.sent * 1000, 1) if self.sent else 0,
+            "last_error": self.last_error,
+        }
+
+
+# app.py 시작 시 생성 (SLACK_OUTBOX_ENABLED=true)
+dispatcher: Optional[SlackOutboxDispatcher] = None
+
+
+def notify():
+    """outbox에 기록한 트랜잭션이 commit된 후 호출 → dispatcher 즉시 실행"""
+    if dispatcher is not None:
+        dispatcher.wake()
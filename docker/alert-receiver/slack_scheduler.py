@@ -0,0 +1,383 @@
+"""
+Slack 전송 스케줄러
+slack_sender의 모든 메시지 전송(카드, 스레드 댓글)이 이 큐를 거침
+
+- 채널별 token bucket (Slack 권장 한도: 채널당 초당 1건)
+- 429 응답의 Retry-After 동안 해당 채널 전송 중지 후 재시도 (전송 시도 횟수에 포함하지 않고 별도 상한 적용)
+- 일시적인 오류(5xx, 연결 오류 / timeout, 재시도 가능한 Slack API 오류)만 재시도,
+  영구 오류(channel_not_found, invalid_auth, not_in_channel, invalid_blocks, 4xx 등)는 바로 실패
+- severity 기반 우선순위 (critical → warning → info)
+- 아직 전송되지 않은 같은 스레드(channel, thread_ts)의 댓글은 하나로 합쳐 전송
+- 큐 깊이 / drop / 429 통계
+- 아직 전송을 시작하지 않은 메시지는 취소 가능 (cancel) → 결과 대기 시간 초과 후 재전송해도 중복 전송 없음
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+SLACK_RATE_PER_CHANNEL = float(os.getenv("SLACK_RATE_PER_CHANNEL", "1"))  # 채널당 초당 전송 수
+SLACK_RATE_BURST = int(os.getenv("SLACK_RATE_BURST", "3"))
+SLACK_QUEUE_MAX = int(os.getenv("SLACK_QUEUE_MAX", "1000"))
+SLACK_SEND_MAX_ATTEMPTS = int(os.getenv("SLACK_SEND_MAX_ATTEMPTS", "5"))
+SLACK_RATE_LIMIT_MAX_RETRIES = int(os.getenv("SLACK_RATE_LIMIT_MAX_RETRIES", "100"))  # 메시지당 429 재시도 상한 (0이면 무제한)
+SLACK_COALESCE_MAX_MESSAGES = int(os.getenv("SLACK_COALESCE_MAX_MESSAGES", "10"))
+SLACK_RETRY_BASE_SECONDS = 1.0
+
+# 우선순위 (작을수록 먼저 전송)
+PRIORITY_CRITICAL = 0
+PRIORITY_HIGH = 1
+PRIORITY_NORMAL = 2
+PRIORITY_LOW = 3
+
+SEVERITY_PRIORITY = {
+    "critical": PRIORITY_CRITICAL,
+    "error": PRIORITY_CRITICAL,
+    "high": PRIORITY_HIGH,
+    "warning": PRIORITY_NORMAL,
+    "info": PRIORITY_LOW,
+}
+
+
+def severity_priority(severity: Optional[str]) -> int:
+    """알람 severity → 전송 우선순위"""
+    return SEVERITY_PRIORITY.get((severity or "").lower(), PRIORITY_NORMAL)
+
+
+class SlackRateLimited(Exception):
+    """Slack 429 응답 (Retry-After 초 동안 전송 중지)"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Slack rate limited (Retry-After: {retry_after}s)")
+        self.retry_after = retry_after
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    재시도할 전송 오류인지 판별
+    연결 오류 / timeout, 5xx 응답, retryable=True인 오류(Slack API 일시 오류)만 재시도
+    """
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return bool(getattr(error, "retryable", False))
+
+
+class SlackQueueFull(Exception):
+    """전송 큐가 가득 차서 메시지를 버림"""
+
+
+class SlackSendCancelled(Exception):
+    """전송 전에 취소된 메시지 (Slack에 보내지 않음)"""
+
+
+class OutboundMessage:
+    """
+    전송 대기 메시지
+    deliver(message)가 실제 전송을 수행하며, 합쳐진 text는 message.text로 전달됨
+    """
+
+    def __init__(self, channel: str, deliver: Callable[["OutboundMessage"], Any],
+                 priority: int = PRIORITY_NORMAL, text: Optional[str] = None,
+                 blocks: Optional[list] = None, thread_ts: Optional[str] = None,
+                 coalesce: bool = False):
+        self.channel = channel or ""
+        self.deliver = deliver
+        self.priority = priority
+        self.text = text
+        self.blocks = blocks
+        self.thread_ts = thread_ts
+        self.coalesce_key: Optional[Tuple[str, str]] = (self.channel, thread_ts) if coalesce and thread_ts else None
+        self.merged = 1
+        self.attempts = 0  # 전송 시도 횟수 (429 제외)
+        self.rate_limits = 0  # 429로 재시도한 횟수
+        self.sending = False  # deliver 실행 중 (취소 불가)
+        self.not_before = 0.0
+        self.enqueued_at = time.monotonic()
+        self.future: Future = Future()
+
+
+class TokenBucket:
+    """채널별 전송 한도"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available_at(self, now: float) -> float:
+        """다음 토큰을 쓸 수 있는 시각"""
+        self._refill(now)
+        ready = now if self.tokens >= 1 else now + (1 - self.tokens) / self.rate
+        return max(ready, self.blocked_until)
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        """Retry-After 동안 전송 중지 (토큰도 비움)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class SlackScheduler:
+    """채널별 우선순위 큐 + 전송 스레드"""
+
+    def __init__(self, rate: float = SLACK_RATE_PER_CHANNEL, burst: int = SLACK_RATE_BURST,
+                 max_queue: int = SLACK_QUEUE_MAX, max_attempts: int = SLACK_SEND_MAX_ATTEMPTS,
+                 max_rate_limit_retries: int = SLACK_RATE_LIMIT_MAX_RETRIES):
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.max_rate_limit_retries = max_rate_limit_retries
+
+        self._cond = threading.Condition()
+        self._queues: Dict[str, list] = {}  # channel → heap[(priority, seq, message)]
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._pending_replies: Dict[Tuple[str, str], OutboundMessage] = {}
+        self._seq = itertools.count()
+        self._depth = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        # 통계
+        self.submitted = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.rate_limited = 0
+        self.retried = 0
+        self.failed = 0
+        self.permanent_failures = 0
+        self.max_queue_wait = 0.0
+        self.cancelled = 0
+
+    def submit(self, message: OutboundMessage) -> Future:
+        """
+        메시지 전송 예약
+
+        Returns: 전송 결과 Future (합쳐진 경우 먼저 대기 중이던 메시지의 Future)
+        """
+        with self._cond:
+            self.submitted += 1
+            if message.coalesce_key:
+                pending = self._pending_replies.get(message.coalesce_key)
+                if pending and pending.merged < SLACK_COALESCE_MAX_MESSAGES:
+                    pending.text = f"{pending.text}\n\n{message.text}"
+                    pending.merged += 1
+                    self.coalesced += 1
+                    return pending.future
+
+            if self._depth >= self.max_queue:
+                self.dropped += 1
+                print(f"⚠️  Slack 전송 큐 가득 참 ({self._depth}개), 메시지 버림: channel={message.channel}")
+                message.future.set_exception(SlackQueueFull(f"Slack 전송 큐 가득 참 ({self._depth}개)"))
+                return message.future
+
+            self._push(message)
+            self._ensure_thread()
+            self._cond.notify()
+        return message.future
+
+    def cancel(self, message: OutboundMessage) -> bool:
+        """
+        아직 전송을 시작하지 않은 메시지를 큐에서 제거 (재시도 대기 중인 메시지 포함)
+        future에는 SlackSendCancelled 설정
+
+        Returns: 취소했으면 True, 전송 중이거나 이미 끝났으면 False (결과를 기다려야 함)
+        """
+        with self._cond:
+            if message.sending or message.future.done():
+                return False
+            heap = self._queues.get(message.channel, [])
+            for i, (_, _, queued) in enumerate(heap):
+                if queued is message:
+                    heap[i] = heap[-1]
+                    heap.pop()
+                    heapq.heapify(heap)
+                    break
+            else:
+                return False
+            self._depth -= 1
+            if message.coalesce_key and self._pending_replies.get(message.coalesce_key) is message:
+                del self._pending_replies[message.coalesce_key]
+            self.cancelled += 1
+        message.future.set_exception(SlackSendCancelled(f"Slack 전송 취소: channel={message.channel}"))
+        return True
+
+    def _push(self, message: OutboundMessage):
+        heapq.heappush(self._queues.setdefault(message.channel, []), (message.priority, next(self._seq), message))
+        self._depth += 1
+        if message.coalesce_key and message.coalesce_key not in self._pending_replies:
+            self._pending_replies[message.coalesce_key] = message
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="slack-scheduler", daemon=True)
+            self._thread.start()
+
+    def _bucket(self, channel: str) -> TokenBucket:
+        bucket = self._buckets.get(channel)
+        if bucket is None:
+            bucket = self._buckets[channel] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def _next(self) -> Tuple[Optional[OutboundMessage], Optional[float]]:
+        """
+        전송 가능한 메시지 중 우선순위가 가장 높은 것 선택 (_cond 보유 상태에서 호출)
+
+        Returns: (message, None) 또는 (None, 다음 확인까지 대기 시간)
+        """
+        now = time.monotonic()
+        best = None
+        earliest = None
+        for channel, heap in self._queues.items():
+            if not heap:
+                continue
+            head = heap[0]
+            ready_at = max(self._bucket(channel).available_at(now), head[2].not_before)
+            if ready_at <= now:
+                if best is None or head[:2] < best[1][:2]:
+                    best = (channel, head)
+            elif earliest is None or ready_at < earliest:
+                earliest = ready_at
+
+        if best is None:
+            return None, (earliest - now) if earliest is not None else None
+
+        channel, _ = best
+        _, _, message = heapq.heappop(self._queues[channel])
+        self._depth -= 1
+        message.sending = True
+        self._bucket(channel).take(now)
+        if message.coalesce_key and self._pending_replies.get(message.coalesce_key) is message:
+            del self._pending_replies[message.coalesce_key]
+        return message, None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    message, wait = self._next()
+                    if message:
+                        break
+                    if self._stopping and self._depth == 0:
+                        return
+                    self._cond.wait(timeout=wait)
+            self._send(message)
+
+    def _send(self, message: OutboundMessage):
+        self.max_queue_wait = max(self.max_queue_wait, time.monotonic() - message.enqueued_at)
+        try:
+            result = message.deliver(message)
+        except SlackRateLimited as e:
+            with self._cond:
+                # 429는 채널 한도 문제라 max_attempts를 쓰지 않음 (Retry-After 동안 채널 전체가 멈춤)
+                self.rate_limited += 1
+                message.rate_limits += 1
+                self._bucket(message.channel).block(e.retry_after)
+                message.sending = False
+                if self.max_rate_limit_retries and message.rate_limits > self.max_rate_limit_retries:
+                    print(f"❌ Slack 429 재시도 한도 초과: channel={message.channel} ({self.max_rate_limit_retries}회)")
+                    self.failed += 1
+                    message.future.set_exception(e)
+                    return
+                print(f"⏳ Slack 429: channel={message.channel}, {e.retry_after}초 후 재시도")
+                self.retried += 1
+                self._push(message)
+                self._cond.notify()
+            return
+        except Exception as e:
+            with self._cond:
+                message.attempts += 1
+                if not is_retryable(e):
+                    # 영구 오류: 재시도해도 실패하고 채널 토큰만 소모
+                    print(f"❌ Slack 전송 실패 (재시도 안 함): channel={message.channel}: {e}")
+                    message.sending = False
+                    self.failed += 1
+                    self.permanent_failures += 1
+                    message.future.set_exception(e)
+                    return
+                delay = SLACK_RETRY_BASE_SECONDS * (2 ** (message.attempts - 1))
+                print(f"❌ Slack 전송 실패: channel={message.channel}: {e} ({message.attempts}/{self.max_attempts})")
+                self._retry_or_fail(message, e, delay=delay)
+            return
+
+        with self._cond:
+            self.sent += 1
+            message.sending = False
+        message.future.set_result(result)
+
+    def _retry_or_fail(self, message: OutboundMessage, error: Exception, delay: float):
+        """재시도 예약 또는 포기 (_cond 보유 상태에서 호출)"""
+        message.sending = False
+        if message.attempts >= self.max_attempts:
+            self.failed += 1
+            message.future.set_exception(error)
+            return
+        self.retried += 1
+        message.not_before = time.monotonic() + delay
+        self._push(message)
+        self._cond.notify()
+
+    def shutdown(self, timeout: float = 10.0):
+        """남은 메시지를 timeout 동안 전송한 뒤 종료"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread = self._thread
+        if thread:
+            thread.join(timeout)
+            if thread.is_alive():
+                print(f"⚠️  Slack 전송 큐 종료 대기 시간 초과: 남은 메시지 {self._depth}개")
+
+    def stats(self) -> Dict[str, Any]:
+        """큐 깊이 및 전송 통계"""
+        with self._cond:
+            now = time.monotonic()
+            oldest = min((m.enqueued_at for heap in self._queues.values() for _, _, m in heap), default=None)
+            return {
+                "queue_depth": self._depth,
+                "queue_max": self.max_queue,
+                "channels": {channel: len(heap) for channel, heap in self._queues.items() if heap},
+                "submitted": self.submitted,
+                "sent": self.sent,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "rate_limited": self.rate_limited,
+                "retried": self.retried,
+                "failed": self.failed,
+                "permanent_failures": self.permanent_failures,
+                "cancelled": self.cancelled,
+                "oldest_wait_ms": round((now - oldest) * 1000, 1) if oldest is not None else 0,
+                "max_queue_wait_ms": round(self.max_queue_wait * 1000, 1),
+            }
+
+
+_scheduler: Optional[SlackScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> SlackScheduler:
+    """프로세스 공용 스케줄러 (최초 호출 시 생성)"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = SlackScheduler()
+    return _scheduler
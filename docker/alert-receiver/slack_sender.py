@@ -1,23 +1,49 @@
 """
 Slack Block Kit 메시지 생성 및 전송
+모든 전송은 slack_scheduler 큐를 거침 (채널별 rate limit, Retry-After, 우선순위, 스레드 댓글 병합)
 """
 import json
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from datetime import datetime
 from typing import Dict, Any, Optional
-import httpx
 import os
 
+import http_clients
+from slack_scheduler import (
+    OutboundMessage, SlackRateLimited, get_scheduler, severity_priority, PRIORITY_HIGH, PRIORITY_LOW
+)
+
+SLACK_SEND_TIMEOUT_SECONDS = float(os.getenv("SLACK_SEND_TIMEOUT_SECONDS", "60"))  # 카드 전송 결과(ts) 대기 시간
+# 결과 대기 시간 초과 시 이미 전송 중(HTTP 요청 중)인 메시지의 결과를 더 기다리는 시간
+SLACK_SEND_INFLIGHT_GRACE_SECONDS = max(http_clients.UPSTREAM_TIMEOUTS["slack_api"],
+                                        http_clients.UPSTREAM_TIMEOUTS["slack_webhook"]) + 5
+SLACK_STREAM_UPDATE_INTERVAL_SECONDS = float(os.getenv("SLACK_STREAM_UPDATE_INTERVAL_SECONDS", "3"))  # 스트리밍 메시지 갱신 간격
+
 SLACK_WEBHOOK_URL = None  # app.py에서 설정
 SLACK_BOT_TOKEN = None  # app.py에서 설정
 SLACK_CHANNEL = os.getenv("SLACK_CHANNEL", "C0A4LAEF6P8")  # 기본 채널 ID
 
 
+class SlackSendTimeout(Exception):
+    """결과 대기 시간 초과 - 전송 전에 취소했으므로 Slack에 보내지 않음 (다시 보내도 중복 없음)"""
+
+
+class SlackDeliveryUnknown(Exception):
+    """결과 대기 시간 초과 - 전송 중이라 취소하지 못함 (Slack에 보내졌을 수 있음, 다시 보내면 중복 가능)"""
+
+
 def create_incident_card(incident_id: str, incident_key: str, status: str, severity: str,
                          cluster: str, namespace: str, phase: str, service: str,
-                         alert_count: int, start_time: datetime, is_new_incident: bool) -> Dict[str, Any]:
+                         alert_count: int, start_time: datetime, is_new_incident: bool,
+                         last_seen_at: Optional[datetime] = None) -> Dict[str, Any]:
     """
     Incident Block Kit 카드 생성
     
+    Args:
+        last_seen_at: 최근 알람 수신 시각 (카드 갱신 시 표시)
+    
     Returns: Slack Block Kit JSON
     """
     severity_emoji = {
@@ -97,7 +123,12 @@ def create_incident_card(incident_id: str, incident_key: str, status: str, sever
                     "type": "mrkdwn",
                     "text": f"발생 시각: {start_time.strftime('%Y-%m-%d %H:%M:%S')} | Signature: `{incident_key}`"
                 }
-            ]
+            ] + ([
+                {
+                    "type": "mrkdwn",
+                    "text": f"최근 발생: {last_seen_at.strftime('%Y-%m-%d %H:%M:%S')}"
+                }
+            ] if last_seen_at and last_seen_at != start_time else [])
         },
         {
             "type": "divider"
@@ -200,110 +231,329 @@ def create_incident_card(incident_id: str, incident_key: str, status: str, sever
     }
 
 
-def send_incident_card(blocks: Dict[str, Any], channel: str = None) -> Optional[str]:
+def _retry_after(headers) -> float:
+    """429 응답의 Retry-After (초)"""
+    try:
+        return float(headers.get("Retry-After", 1))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def _post_webhook(url: str, payload: Dict[str, Any]) -> Optional[str]:
+    """Incoming Webhook 전송 (429는 SlackRateLimited로 변환)"""
+    response = http_clients.post("slack_webhook", url, json=payload)
+    if response.status_code == 429:
+        raise SlackRateLimited(_retry_after(response.headers))
+    response.raise_for_status()
+    # Slack Incoming Webhook은 성공 시 "ok" 문자열 또는 빈 응답을 반환할 수 있음
+    try:
+        result = response.json()
+        return result.get("ts") if isinstance(result, dict) else None
+    except ValueError:
+        return None
+
+
+# 다시 보내면 성공할 수 있는 Slack Web API 오류 코드 (그 외 ok=false는 영구 오류)
+SLACK_RETRYABLE_API_ERRORS = {"ratelimited", "internal_error", "fatal_error", "service_unavailable", "request_timeout"}
+
+
+class SlackApiCallError(Exception):
+    """Slack Web API가 ok=false를 반환 (retryable: 전송 큐 재시도 여부)"""
+
+    def __init__(self, message: str, error: Optional[str] = None):
+        super().__init__(message)
+        self.error = error
+        self.retryable = error in SLACK_RETRYABLE_API_ERRORS
+
+
+def _post_web_api(method: str = "chat_postMessage", **kwargs) -> Optional[str]:
     """
-    Slack에 Incident 카드 전송
+    Slack Web API 메시지 호출 (chat.postMessage / chat.update, 429는 SlackRateLimited로 변환)
+    전송 큐의 hot path이므로 WebClient 대신 keep-alive httpx 클라이언트로 직접 호출
     
-    Returns: Slack 메시지 timestamp (thread_ts로 사용)
+    Args:
+        method: WebClient 메서드 이름 (chat_postMessage → chat.postMessage)
+    """
+    response = http_clients.post(
+        "slack_api",
+        http_clients.SLACK_API_BASE_URL + method.replace("_", "."),
+        json=kwargs,
+        headers={"Authorization": f"Bearer {SLACK_BOT_TOKEN}"}
+    )
+    if response.status_code == 429:
+        raise SlackRateLimited(_retry_after(response.headers))
+    response.raise_for_status()
+    result = response.json()
+    if not result.get("ok"):
+        raise SlackApiCallError(f"Slack API {method} 실패: {result.get('error')}", result.get("error"))
+    return result.get("ts")
+
+
+def post_incident_card(blocks: Dict[str, Any], channel: str = None, severity: str = None) -> Optional[str]:
+    """
+    Slack에 Incident 카드 전송 (전송 큐를 거쳐 결과를 기다림, 실패 시 예외 발생 - Slack outbox 재시도용)
+    SLACK_SEND_TIMEOUT_SECONDS 안에 결과가 없으면 큐에서 취소 (SlackSendTimeout),
+    이미 전송 중이면 HTTP timeout만큼 더 기다린 뒤에도 결과가 없으면 SlackDeliveryUnknown
+    
+    Args:
+        severity: 전송 우선순위 결정 (critical이 먼저 전송됨)
+    
+    Returns: Slack 메시지 timestamp (Webhook은 ts를 반환하지 않으므로 None)
     """
     # 채널 ID 설정 (기본값 사용)
     target_channel = channel or SLACK_CHANNEL
     
     # SLACK_WEBHOOK_URL이 있으면 Webhook 사용, 없으면 SLACK_BOT_TOKEN으로 WebClient 사용
     if SLACK_WEBHOOK_URL:
-        payload = {
-            "blocks": blocks["blocks"]
-        }
-        
-        if target_channel:
-            payload["channel"] = target_channel
+        url = SLACK_WEBHOOK_URL
         
-        try:
-            response = httpx.post(
-                SLACK_WEBHOOK_URL,
-                json=payload,
-                timeout=5.0
-            )
-            response.raise_for_status()
-            # Slack Incoming Webhook은 성공 시 "ok" 문자열 또는 빈 응답을 반환할 수 있음
-            try:
-                result = response.json()
-                ts = result.get("ts") if isinstance(result, dict) else None
-            except:
-                text = response.text.strip()
-                if text == "ok" or not text:
-                    ts = None
-                else:
-                    ts = None
+        def deliver(message: OutboundMessage) -> Optional[str]:
+            payload = {"blocks": message.blocks}
+            if message.channel:
+                payload["channel"] = message.channel
+            ts = _post_webhook(url, payload)
             print(f"✅ Slack Incident 카드 전송 성공 (Webhook)")
             return ts
-        except Exception as e:
-            print(f"❌ Slack 전송 실패 (Webhook): {e}")
-            import traceback
-            traceback.print_exc()
-            return None
     
     elif SLACK_BOT_TOKEN:
         # WebClient 사용 (Socket Mode)
-        try:
-            from slack_sdk import WebClient
-            web_client = WebClient(token=SLACK_BOT_TOKEN)
-            
-            result = web_client.chat_postMessage(
-                channel=target_channel,
-                blocks=blocks["blocks"]
-            )
-            
-            ts = result.get("ts") if result else None
+        def deliver(message: OutboundMessage) -> Optional[str]:
+            ts = _post_web_api(channel=message.channel, blocks=message.blocks)
             print(f"✅ Slack Incident 카드 전송 성공 (WebClient): ts={ts}")
             return ts
-        except Exception as e:
-            print(f"❌ Slack 전송 실패 (WebClient): {e}")
-            import traceback
-            traceback.print_exc()
-            return None
     else:
+        raise RuntimeError("SLACK_WEBHOOK_URL 또는 SLACK_BOT_TOKEN이 설정되지 않았습니다.")
+    
+    message = OutboundMessage(
+        channel=target_channel,
+        deliver=deliver,
+        priority=severity_priority(severity),
+        blocks=blocks["blocks"]
+    )
+    scheduler = get_scheduler()
+    future = scheduler.submit(message)
+    for timeout in (SLACK_SEND_TIMEOUT_SECONDS, SLACK_SEND_INFLIGHT_GRACE_SECONDS):
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if scheduler.cancel(message):
+                raise SlackSendTimeout(f"Slack 카드 전송 대기 시간 초과 ({SLACK_SEND_TIMEOUT_SECONDS}초), 전송 취소")
+            # 전송 중 → 결과를 한 번 더 기다림 (실패해서 재시도 대기 중이면 다음 확인에서 취소)
+    raise SlackDeliveryUnknown("Slack 카드 전송 결과를 알 수 없음 (전송 중 대기 시간 초과)")
+
+
+def update_incident_card(channel: str, ts: str, blocks: Dict[str, Any], severity: str = None):
+    """
+    기존 Incident 카드를 chat.update로 수정 (전송 큐에 넣고 바로 반환)
+    Incoming Webhook으로 보낸 메시지는 수정할 수 없으므로 SLACK_BOT_TOKEN 필요
+    
+    Returns: 전송 결과 Future, SLACK_BOT_TOKEN이 없으면 None
+    """
+    if not SLACK_BOT_TOKEN:
+        return None
+    
+    def deliver(message: OutboundMessage) -> Optional[str]:
+        updated_ts = _post_web_api("chat_update", channel=message.channel, ts=ts, blocks=message.blocks)
+        print(f"✅ Slack Incident 카드 갱신 성공: ts={ts}")
+        return updated_ts
+    
+    message = OutboundMessage(
+        channel=channel or SLACK_CHANNEL,
+        deliver=deliver,
+        priority=severity_priority(severity),
+        blocks=blocks["blocks"]
+    )
+    return get_scheduler().submit(message)
+
+
+def send_incident_card(blocks: Dict[str, Any], channel: str = None, severity: str = None) -> Optional[str]:
+    """
+    Slack에 Incident 카드 전송
+    
+    Returns: Slack 메시지 timestamp (thread_ts로 사용), 실패 시 None
+    """
+    if not SLACK_WEBHOOK_URL and not SLACK_BOT_TOKEN:
         print("⚠️  SLACK_WEBHOOK_URL 또는 SLACK_BOT_TOKEN이 설정되지 않았습니다. Slack 전송을 건너뜁니다.")
         return None
+    
+    try:
+        return post_incident_card(blocks, channel, severity)
+    except Exception as e:
+        print(f"❌ Slack 전송 실패 ({'Webhook' if SLACK_WEBHOOK_URL else 'WebClient'}): {e}")
+        import traceback
+        traceback.print_exc()
+        return None
 
 
-def send_thread_reply(thread_ts: str, text: str, channel: str = None, webhook_url: str = None) -> bool:
+def send_thread_reply(thread_ts: str, text: str, channel: str = None, webhook_url: str = None,
+                      priority: int = PRIORITY_HIGH) -> bool:
     """
-    Slack 스레드에 댓글 추가
+    Slack 스레드에 댓글 추가 (전송 큐에 넣고 바로 반환)
+    Webhook이 있으면 Webhook, 없으면 SLACK_BOT_TOKEN으로 WebClient 사용
+    아직 전송되지 않은 같은 스레드의 댓글은 하나의 메시지로 합쳐짐
     
     Args:
         thread_ts: 원본 메시지의 timestamp
         text: 댓글 텍스트
         channel: 채널 ID (선택)
         webhook_url: Slack Webhook URL (없으면 전역 변수 사용)
+        priority: 전송 우선순위 (사용자 액션 응답은 PRIORITY_HIGH)
     
-    Returns: 성공 여부
+    Returns: 전송 예약 여부
     """
-    # 전역 변수 또는 파라미터에서 webhook_url 가져오기
-    import slack_sender as slack_sender_module
-    url = webhook_url or getattr(slack_sender_module, 'SLACK_WEBHOOK_URL', None)
+    url = webhook_url or SLACK_WEBHOOK_URL
     
-    if not url:
-        return False
+    if url:
+        def deliver(message: OutboundMessage) -> bool:
+            payload = {
+                "text": message.text,
+                "thread_ts": message.thread_ts
+            }
+            if channel:
+                payload["channel"] = channel
+            _post_webhook(url, payload)
+            print(f"✅ Slack 스레드 댓글 전송 성공: {message.thread_ts} (merged={message.merged})")
+            return True
+        
+        return _submit_thread_message(deliver, channel, thread_ts, text, priority)
     
-    payload = {
-        "text": text,
-        "thread_ts": thread_ts
-    }
+    return post_thread_message(channel, thread_ts, text, priority)
+
+
+def post_thread_message(channel: str, thread_ts: str, text: str, priority: int = PRIORITY_HIGH) -> bool:
+    """
+    SLACK_BOT_TOKEN(WebClient)으로 스레드에 메시지 전송 (전송 큐에 넣고 바로 반환)
+    아직 전송되지 않은 같은 스레드의 메시지는 하나로 합쳐짐
     
-    if channel:
-        payload["channel"] = channel
+    Returns: 전송 예약 여부
+    """
+    if not SLACK_BOT_TOKEN or not channel:
+        print("⚠️  SLACK_BOT_TOKEN 또는 channel이 없어 스레드 메시지를 전송할 수 없습니다.")
+        return False
     
-    try:
-        response = httpx.post(
-            url,
-            json=payload,
-            timeout=5.0
-        )
-        response.raise_for_status()
-        print(f"✅ Slack 스레드 댓글 전송 성공: {thread_ts}")
+    def deliver(message: OutboundMessage) -> bool:
+        ts = _post_web_api(channel=message.channel, thread_ts=message.thread_ts, text=message.text)
+        print(f"✅ Slack 스레드 댓글 전송 성공 (WebClient): {message.thread_ts}, reply_ts={ts} (merged={message.merged})")
         return True
-    except Exception as e:
-        print(f"❌ Slack 스레드 댓글 전송 실패: {e}")
+    
+    return _submit_thread_message(deliver, channel, thread_ts, text, priority)
+
+
+def send_response_url(response_url: str, text: str, channel: str = None, priority: int = PRIORITY_HIGH) -> bool:
+    """
+    인터랙션 response_url로 ephemeral 메시지 전송 (전송 큐에 넣고 바로 반환)
+    스레드 댓글을 달 수 없는 경우(카드 위치를 모름 등) 인터랙션 결과 알림용
+
+    Returns: 전송 예약 여부
+    """
+    if not response_url:
         return False
 
+    def deliver(message: OutboundMessage) -> bool:
+        _post_webhook(response_url, {"text": message.text, "response_type": "ephemeral", "replace_original": False})
+        print("✅ Slack response_url 응답 전송 성공")
+        return True
+
+    message = OutboundMessage(channel=channel or SLACK_CHANNEL, deliver=deliver, priority=priority, text=text)
+    future = get_scheduler().submit(message)
+    future.add_done_callback(_log_thread_message_failure)
+    return True
+
+
+def _submit_thread_message(deliver, channel: Optional[str], thread_ts: str, text: str, priority: int) -> bool:
+    """스레드 메시지 전송 예약 (실패는 로그로 남김)"""
+    message = OutboundMessage(
+        channel=channel or SLACK_CHANNEL,
+        deliver=deliver,
+        priority=priority,
+        text=text,
+        thread_ts=thread_ts,
+        coalesce=True
+    )
+    future = get_scheduler().submit(message)
+    future.add_done_callback(_log_thread_message_failure)
+    return not (future.done() and future.exception() is not None)
+
+
+def _log_thread_message_failure(future):
+    if future.exception() is not None:
+        print(f"❌ Slack 스레드 댓글 전송 실패: {future.exception()}")
+
+
+class StreamingThreadMessage:
+    """
+    스레드에 placeholder 메시지를 올리고, 생성 중인 텍스트로 chat.update (AI 분석 스트리밍용)
+    - 갱신은 SLACK_STREAM_UPDATE_INTERVAL_SECONDS마다 최대 1회, 이전 갱신이 전송 중이면 건너뜀
+    - finish()는 간격과 관계없이 최종 텍스트로 갱신 (placeholder 전송 실패 시 새 댓글)
+    """
+
+    def __init__(self, channel: str, thread_ts: str, placeholder: str,
+                 interval: float = SLACK_STREAM_UPDATE_INTERVAL_SECONDS):
+        self.channel = channel
+        self.thread_ts = thread_ts
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last_update = 0.0
+        self._pending: Optional[Future] = None
+        self._finished = False
+        self.updates = 0
+
+        def deliver(message: OutboundMessage) -> Optional[str]:
+            return _post_web_api(channel=message.channel, thread_ts=message.thread_ts, text=message.text)
+
+        # placeholder는 다른 댓글과 합치지 않음 (ts를 받아야 함)
+        self._ts_future = get_scheduler().submit(OutboundMessage(
+            channel=channel,
+            deliver=deliver,
+            priority=PRIORITY_HIGH,
+            text=placeholder,
+            thread_ts=thread_ts
+        ))
+
+    def _ts(self) -> Optional[str]:
+        if not self._ts_future.done() or self._ts_future.exception() is not None:
+            return None
+        return self._ts_future.result()
+
+    def _submit_update(self, ts: str, text: str, priority: int) -> Future:
+        def deliver(message: OutboundMessage) -> Optional[str]:
+            # 재시도가 늦게 도착해 최종 텍스트를 덮어쓰지 않도록 중간 갱신은 finish 후 버림
+            if self._finished and priority == PRIORITY_LOW:
+                return None
+            return _post_web_api("chat_update", channel=message.channel, ts=ts, text=message.text)
+
+        return get_scheduler().submit(OutboundMessage(
+            channel=self.channel,
+            deliver=deliver,
+            priority=priority,
+            text=text
+        ))
+
+    def update(self, text: str):
+        """생성 중인 텍스트로 갱신 (throttle)"""
+        now = time.monotonic()
+        with self._lock:
+            if self._finished or now - self._last_update < self.interval:
+                return
+            if self._pending is not None and not self._pending.done():
+                return
+            ts = self._ts()
+            if ts is None:
+                return
+            self._last_update = now
+            self.updates += 1
+            self._pending = self._submit_update(ts, text, PRIORITY_LOW)
+
+    def finish(self, text: str, priority: int = PRIORITY_HIGH):
+        """최종 텍스트로 갱신"""
+        with self._lock:
+            self._finished = True
+        try:
+            ts = self._ts_future.result(timeout=SLACK_SEND_TIMEOUT_SECONDS)
+        except Exception as e:
+            print(f"⚠️  스트리밍 placeholder 전송 실패, 새 댓글로 전송: {e}")
+            ts = None
+        if ts:
+            self._submit_update(ts, text, priority).add_done_callback(_log_thread_message_failure)
+        else:
+            post_thread_message(self.channel, self.thread_ts, text, priority)
@@ -0,0 +1,9 @@
+"""
+단위 테스트 공용 설정
+alert-receiver 모듈은 패키지가 아닌 평면 구조 → 상위 디렉토리를 import 경로에 추가
+(MySQL / Slack / Grafana 없이 실행되는 모듈 단위 테스트만 포함)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,69 @@
+"""
+incident_actions.IdempotencyCache 단위 테스트
+- TTL 안의 같은 요청은 한 번만 처리
+- TTL이 지나거나 크기 제한을 넘으면 오래된 항목부터 제거
+"""
+import pytest
+
+import incident_actions
+from incident_actions import IdempotencyCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """incident_actions의 time.monotonic을 수동으로 진행하는 시계"""
+    now = [1000.0]
+    monkeypatch.setattr(incident_actions.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_duplicate_within_ttl_is_rejected(clock):
+    cache = IdempotencyCache(max_size=10, ttl=60)
+    key = ("ack", "INC-1", "action-ts-1")
+
+    assert cache.add(key) is True
+    clock[0] += 59
+    assert cache.add(key) is False
+
+
+def test_different_keys_are_independent(clock):
+    cache = IdempotencyCache(max_size=10, ttl=60)
+
+    assert cache.add(("ack", "INC-1", "a")) is True
+    assert cache.add(("resolve", "INC-1", "a")) is True
+    assert cache.add(("ack", "INC-2", "a")) is True
+    assert cache.add(("ack", "INC-1", "b")) is True
+    assert len(cache) == 4
+
+
+def test_expired_entry_is_accepted_again(clock):
+    cache = IdempotencyCache(max_size=10, ttl=60)
+    key = ("ack", "INC-1", "a")
+
+    cache.add(key)
+    clock[0] += 60
+    assert cache.add(key) is True
+
+
+def test_expired_entries_are_pruned_on_add(clock):
+    cache = IdempotencyCache(max_size=10, ttl=60)
+    for i in range(5):
+        cache.add(("ack", f"INC-{i}", "a"))
+
+    clock[0] += 61
+    cache.add(("ack", "INC-new", "a"))
+
+    assert len(cache) == 1
+
+
+def test_oldest_entry_is_evicted_when_full(clock):
+    cache = IdempotencyCache(max_size=2, ttl=60)
+    first, second, third = ("ack", "INC-1", "a"), ("ack", "INC-2", "a"), ("ack", "INC-3", "a")
+
+    cache.add(first)
+    cache.add(second)
+    cache.add(third)
+
+    assert len(cache) == 2
+    assert cache.add(second) is False
+    assert cache.add(first) is True  # 크기 제한으로 제거된 항목
@@ -0,0 +1,191 @@
+"""
+ingest_spool 단위 테스트 (임시 디렉토리 사용)
+- record framing (length + CRC32)
+- 시작 시 손상된 tail 정리 (_recover)
+- replayer의 checkpoint 저장 / segment 전환 및 삭제
+"""
+import asyncio
+import io
+import json
+import os
+import time
+import zlib
+
+import pytest
+
+import ingest_spool
+from ingest_spool import RECORD_HEADER, IngestSpool, SpoolCorruptionError, read_record, segment_name
+
+
+def frame(body: bytes) -> bytes:
+    return RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body
+
+
+def write_segment(directory, seq: int, data: bytes) -> str:
+    path = os.path.join(directory, segment_name(seq))
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+async def wait_until(predicate, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("조건 대기 시간 초과")
+        await asyncio.sleep(0.01)
+
+
+# ----------------------------------------------------------------------
+# record framing
+# ----------------------------------------------------------------------
+
+def test_read_record_returns_body_and_length():
+    f = io.BytesIO(frame(b'{"a":1}') + frame(b'{"b":2}'))
+
+    assert read_record(f) == (b'{"a":1}', RECORD_HEADER.size + 7)
+    assert read_record(f) == (b'{"b":2}', RECORD_HEADER.size + 7)
+    assert read_record(f) is None
+
+
+def test_read_record_incomplete_record_is_none():
+    record = frame(b'{"a":1}')
+
+    assert read_record(io.BytesIO(record[:RECORD_HEADER.size - 1])) is None  # header 일부
+    assert read_record(io.BytesIO(record[:-1])) is None  # body 일부
+
+
+def test_read_record_crc_mismatch_raises():
+    record = bytearray(frame(b'{"a":1}'))
+    record[-1] ^= 0xFF
+
+    with pytest.raises(SpoolCorruptionError):
+        read_record(io.BytesIO(bytes(record)))
+
+
+# ----------------------------------------------------------------------
+# 복구
+# ----------------------------------------------------------------------
+
+@pytest.mark.parametrize("tail", [
+    frame(b'{"partial":true}')[:-3],  # 기록 중 중단된 record
+    b"\x00\x00\x00\x05\xde\xad\xbe\xefhello",  # CRC 불일치 record
+])
+def test_recover_truncates_damaged_tail(tmp_path, tail):
+    valid = frame(b'{"a":1}') + frame(b'{"b":2}')
+    path = write_segment(tmp_path, 1, valid + tail)
+
+    spool = IngestSpool(lambda payload: None, str(tmp_path))
+    spool._load_checkpoint()
+    spool._recover()
+    try:
+        assert os.path.getsize(path) == len(valid)
+        assert spool._seq == 1
+        assert spool._size == len(valid)
+    finally:
+        os.close(spool._fd)
+
+
+def test_recover_keeps_intact_segment(tmp_path):
+    valid = frame(b'{"a":1}')
+    path = write_segment(tmp_path, 3, valid)
+
+    spool = IngestSpool(lambda payload: None, str(tmp_path))
+    spool._load_checkpoint()
+    spool._recover()
+    try:
+        assert os.path.getsize(path) == len(valid)
+        assert spool._seq == 3
+        assert (spool._cp_seq, spool._cp_offset) == (3, 0)  # checkpoint 파일이 없으면 첫 segment부터
+    finally:
+        os.close(spool._fd)
+
+
+# ----------------------------------------------------------------------
+# replay / checkpoint
+# ----------------------------------------------------------------------
+
+def test_replay_advances_checkpoint_and_removes_finished_segments(tmp_path, monkeypatch):
+    # record 2개마다 segment 전환
+    record_size = len(frame(b'{"n":0}'))
+    monkeypatch.setattr(ingest_spool, "SPOOL_SEGMENT_MAX_BYTES", record_size * 2)
+    handled = []
+
+    async def scenario():
+        spool = IngestSpool(handled.append, str(tmp_path))
+        await spool.start()
+        for n in range(5):
+            await spool.append(json.dumps({"n": n}, separators=(",", ":")).encode())
+        await wait_until(lambda: len(handled) == 5)
+        await spool.stop()
+        return spool
+
+    spool = asyncio.run(scenario())
+
+    assert [payload["n"] for payload in handled] == [0, 1, 2, 3, 4]
+    assert spool.replayed == 5
+    with open(tmp_path / ingest_spool.CHECKPOINT_FILE) as f:
+        assert json.load(f) == {"segment": 3, "offset": record_size}
+    # 처리 완료한 segment 1, 2는 삭제, 쓰기 중인 segment 3만 남음
+    assert sorted(os.listdir(tmp_path)) == [ingest_spool.CHECKPOINT_FILE, segment_name(3)]
+
+
+def test_restart_resumes_after_checkpoint(tmp_path):
+    handled = []
+
+    async def run(bodies):
+        spool = IngestSpool(handled.append, str(tmp_path))
+        await spool.start()
+        for body in bodies:
+            await spool.append(body)
+        await wait_until(lambda: spool.backlog_bytes() == 0)
+        await spool.stop()
+
+    asyncio.run(run([b'{"n":1}', b'{"n":2}']))
+    asyncio.run(run([b'{"n":3}']))
+
+    # 재시작 시 이미 처리한 record를 다시 처리하지 않음
+    assert [payload["n"] for payload in handled] == [1, 2, 3]
+
+
+def test_invalid_json_goes_to_dead_letter(tmp_path):
+    handled = []
+
+    async def scenario():
+        spool = IngestSpool(handled.append, str(tmp_path))
+        await spool.start()
+        await spool.append(b"not json")
+        await spool.append(b'{"n":1}')
+        await wait_until(lambda: len(handled) == 1)
+        await spool.stop()
+        return spool
+
+    spool = asyncio.run(scenario())
+
+    assert spool.dead_lettered == 1
+    with open(tmp_path / ingest_spool.DEAD_LETTER_FILE) as f:
+        entries = [json.loads(line) for line in f]
+    assert [entry["body"] for entry in entries] == ["not json"]
+    assert handled == [{"n": 1}]
+
+
+def test_stop_waits_for_in_flight_record(tmp_path):
+    handled = []
+
+    def slow_handler(payload):
+        time.sleep(0.2)
+        handled.append(payload)
+
+    async def scenario():
+        spool = IngestSpool(slow_handler, str(tmp_path))
+        await spool.start()
+        await spool.append(b'{"n":1}')
+        await asyncio.sleep(0.05)  # replayer가 처리 시작
+        await spool.stop(timeout=5)
+
+    asyncio.run(scenario())
+
+    # 처리 중이던 record를 끝내고 checkpoint까지 저장한 뒤 종료
+    assert handled == [{"n": 1}]
+    with open(tmp_path / ingest_spool.CHECKPOINT_FILE) as f:
+        assert json.load(f)["offset"] == len(frame(b'{"n":1}'))
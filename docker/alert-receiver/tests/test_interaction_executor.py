@@ -0,0 +1,97 @@
+"""
+interaction_executor.KeyedExecutor 단위 테스트
+- 같은 key의 작업은 등록 순서대로 하나씩 실행 (ACK → Resolve)
+- 서로 다른 key는 병렬 실행
+- 대기 작업 상한 / 실패한 작업 이후 순서 유지
+"""
+import threading
+import time
+
+import pytest
+
+from interaction_executor import KeyedExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = KeyedExecutor(workers=4, max_pending=100)
+    yield executor
+    executor.shutdown()
+
+
+def test_same_key_runs_in_submission_order(executor):
+    order = []
+    running = []
+
+    def task(n):
+        def run():
+            running.append(n)
+            assert len(running) == 1, "같은 key의 작업이 동시에 실행됨"
+            time.sleep(0.01)
+            order.append(n)
+            running.remove(n)
+        return run
+
+    for n in range(10):
+        assert executor.submit("card-1", task(n), f"task-{n}")
+    executor.shutdown()
+
+    assert order == list(range(10))
+    assert executor.stats()["completed"] == 10
+
+
+def test_different_keys_run_in_parallel(executor):
+    barrier = threading.Barrier(2, timeout=2)
+
+    # 두 작업이 동시에 실행되어야 barrier를 통과
+    executor.submit("card-1", barrier.wait, "a")
+    executor.submit("card-2", barrier.wait, "b")
+    executor.shutdown()
+
+    stats = executor.stats()
+    assert stats["completed"] == 2
+    assert stats["failed"] == 0
+
+
+def test_failed_task_does_not_break_key_order(executor):
+    order = []
+
+    def fail():
+        order.append("fail")
+        raise RuntimeError("boom")
+
+    executor.submit("card-1", fail, "fail")
+    executor.submit("card-1", lambda: order.append("next"), "next")
+    executor.shutdown()
+
+    assert order == ["fail", "next"]
+    stats = executor.stats()
+    assert (stats["failed"], stats["completed"], stats["active_keys"]) == (1, 1, 0)
+
+
+def test_submit_rejects_when_pending_limit_reached():
+    executor = KeyedExecutor(workers=1, max_pending=2)
+    release = threading.Event()
+    try:
+        assert executor.submit("card-1", release.wait, "blocking")
+        assert executor.submit("card-1", lambda: None, "queued")
+        assert executor.submit("card-2", lambda: None, "rejected") is False
+        assert executor.stats()["rejected"] == 1
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_urgent_task_does_not_wait_for_busy_workers():
+    executor = KeyedExecutor(workers=1, max_pending=10, urgent_workers=1)
+    release = threading.Event()
+    done = threading.Event()
+    try:
+        # 유일한 worker가 점유된 상태에서도 전용 풀에서 바로 실행
+        executor.submit("card-1", release.wait, "slow")
+        assert executor.submit_urgent(done.set, "resolve_modal")
+        assert done.wait(timeout=2)
+    finally:
+        release.set()
+        executor.shutdown()
+    assert executor.stats()["urgent"]["submitted"] == 1
@@ -5,6 +5,12 @@ USE observer;
 
 -- 1. incidents 테이블: 사건 관리 (사람이 관리하는 상태 객체)
 -- grafana_alerts가 FK로 참조하므로 먼저 생성
+-- Slack 리액션 / 버튼이 달린 카드 메시지 → Incident 조회용 (slack_message_ts, slack_channel) 인덱스
+-- 기존 DB 마이그레이션:
+--   ALTER TABLE incidents
+--     ADD COLUMN slack_channel VARCHAR(32) NULL AFTER slack_message_ts,
+--     ADD INDEX idx_slack_message_ts_channel (slack_message_ts, slack_channel);
+--   (기존 행의 slack_channel은 NULL로 두어도 조회됨 - message_ts만 일치하면 사용)
 CREATE TABLE IF NOT EXISTS incidents (
     incident_id VARCHAR(64) PRIMARY KEY COMMENT '에피소드 ID (이번에 대응한 사건의 고유 ID)',
     incident_key VARCHAR(16) NOT NULL COMMENT '사건 유형 키 (rule_uid|cluster|namespace|phase 해시)',
@@ -26,6 +32,7 @@ CREATE TABLE IF NOT EXISTS incidents (
     root_cause TEXT NULL COMMENT '문제의 근본 원인',
     resolved_by VARCHAR(255) NULL COMMENT '해결 담당자',
     slack_message_ts VARCHAR(32) NULL COMMENT 'Slack 메시지 timestamp (스레드 루트 메시지)',
+    slack_channel VARCHAR(32) NULL COMMENT 'Incident 카드를 보낸 Slack 채널 ID',
     is_noise BOOLEAN NOT NULL DEFAULT FALSE COMMENT '노이즈 여부',
     created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '레코드 생성 시각',
     updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '레코드 수정 시각',
@@ -36,10 +43,18 @@ CREATE TABLE IF NOT EXISTS incidents (
     INDEX idx_service_category (service_category),
     -- 성능 최적화: 복합 인덱스 (incident_key, status, last_seen_at)
     -- WHERE incident_key = ? AND status IN (...) ORDER BY last_seen_at DESC 쿼리 최적화
-    INDEX idx_incident_key_status_last_seen (incident_key, status, last_seen_at DESC)
+    INDEX idx_incident_key_status_last_seen (incident_key, status, last_seen_at DESC),
+    -- Slack 카드 메시지 → Incident 조회 (리액션 처리)
+    INDEX idx_slack_message_ts_channel (slack_message_ts, slack_channel)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='사건 관리 테이블';
 
--- 2. grafana_alerts 테이블: 원본 알람 저장 (무조건 insert)
+-- 2. grafana_alerts 테이블: 원본 알람 저장
+-- Grafana 반복 전송(같은 fingerprint + startsAt + status)은 행을 추가하지 않고 최초 행의 repeat_count만 증가
+-- 기존 DB 마이그레이션:
+--   ALTER TABLE grafana_alerts
+--     ADD COLUMN fingerprint VARCHAR(64) NULL, ADD COLUMN starts_at VARCHAR(64) NULL,
+--     ADD COLUMN repeat_count INT NOT NULL DEFAULT 0, ADD COLUMN last_seen_at DATETIME NULL,
+--     ADD INDEX idx_fingerprint_starts_at_state (fingerprint, starts_at, state);
 CREATE TABLE IF NOT EXISTS grafana_alerts (
     alert_id BIGINT AUTO_INCREMENT PRIMARY KEY COMMENT '알람 고유 ID',
     incident_id VARCHAR(64) NOT NULL COMMENT '사건 ID (FK → incidents.incident_id)',
@@ -52,52 +67,84 @@ CREATE TABLE IF NOT EXISTS grafana_alerts (
     labels JSON NULL COMMENT '알람 라벨 (JSON)',
     annotations JSON NULL COMMENT '알람 어노테이션 (JSON)',
     raw_payload JSON NULL COMMENT '원본 Grafana payload 전체',
+    fingerprint VARCHAR(64) NULL COMMENT 'Grafana alert fingerprint (반복 알림 dedupe 키)',
+    starts_at VARCHAR(64) NULL COMMENT 'Grafana alert startsAt (반복 알림 dedupe 키)',
+    repeat_count INT NOT NULL DEFAULT 0 COMMENT 'Grafana 반복 전송 횟수 (최초 저장 행에만 누적)',
+    last_seen_at DATETIME NULL COMMENT '최근 수신 시각 (반복 전송 포함)',
     INDEX idx_incident_id (incident_id),
     INDEX idx_incident_key_received_at (incident_key, received_at),
     INDEX idx_received_at (received_at),
+    -- 반복 알림 dedupe: WHERE (fingerprint, starts_at, state) IN (...) 조회
+    INDEX idx_fingerprint_starts_at_state (fingerprint, starts_at, state),
     FOREIGN KEY (incident_id) REFERENCES incidents(incident_id) ON DELETE RESTRICT
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='Grafana 원본 알람 저장';
 
+-- 3. slack_outbox 테이블: Slack 전송 대기열 (Transactional Outbox)
+-- incident 생성과 같은 트랜잭션에서 기록, commit 후 alert-receiver dispatcher가 전송
+-- dispatcher는 행을 sending(lease = next_attempt_at)으로 claim / commit한 뒤 전송 (전송 중 Row Lock 없음)
+-- 기존 DB 마이그레이션:
+--   ALTER TABLE slack_outbox
+--     MODIFY COLUMN status ENUM('pending', 'sending', 'sent', 'failed', 'unknown') NOT NULL DEFAULT 'pending';
+CREATE TABLE IF NOT EXISTS slack_outbox (
+    outbox_id BIGINT AUTO_INCREMENT PRIMARY KEY COMMENT 'Outbox 고유 ID',
+    incident_id VARCHAR(64) NOT NULL COMMENT '사건 ID (FK → incidents.incident_id)',
+    kind VARCHAR(32) NOT NULL COMMENT '전송 종류 (incident_card)',
+    payload JSON NOT NULL COMMENT '전송 내용',
+    status ENUM('pending', 'sending', 'sent', 'failed', 'unknown') NOT NULL DEFAULT 'pending' COMMENT '전송 상태 (sending: 전송 중, unknown: 전송 결과 알 수 없음 - 재전송 안 함)',
+    attempts INT NOT NULL DEFAULT 0 COMMENT '전송 시도 횟수',
+    next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '다음 전송 시도 시각 (sending이면 lease 만료 시각)',
+    last_error TEXT NULL COMMENT '마지막 전송 실패 사유',
+    slack_message_ts VARCHAR(32) NULL COMMENT '전송된 Slack 메시지 timestamp',
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '레코드 생성 시각',
+    sent_at DATETIME NULL COMMENT '전송 완료 시각',
+    -- 신규 Incident당 카드 1회
+    UNIQUE KEY uk_incident_kind (incident_id, kind),
+    -- dispatcher: WHERE status IN ('pending', 'sending') AND next_attempt_at <= NOW() ORDER BY outbox_id
+    INDEX idx_status_next_attempt (status, next_attempt_at),
+    FOREIGN KEY (incident_id) REFERENCES incidents(incident_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='Slack 전송 Outbox';
+
+-- 4. ai_analysis_cache 테이블: AI 분석 결과 캐시
+-- incident_key + 요약된 알람 집합/프롬프트 버전 hash가 같으면 LLM을 다시 실행하지 않음
+CREATE TABLE IF NOT EXISTS ai_analysis_cache (
+    incident_key VARCHAR(16) NOT NULL COMMENT '사건 유형 키',
+    alert_digest CHAR(64) NOT NULL COMMENT '요약된 알람 집합 + 프롬프트 버전 SHA-256',
+    prompt_version VARCHAR(128) NOT NULL COMMENT '프롬프트 버전 (모델 포함)',
+    result JSON NOT NULL COMMENT 'AI 분석 결과',
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '분석 시각',
+    expires_at DATETIME NOT NULL COMMENT '만료 시각',
+    PRIMARY KEY (incident_key, alert_digest),
+    -- 만료 행 정리: DELETE ... WHERE expires_at <= NOW()
+    INDEX idx_expires_at (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='AI 분석 결과 캐시';
+
 -- incident_alert_links 테이블 제거 (단순화)
 -- grafana_alerts.incident_id FK로 직접 연결 관리
 
 -- silences 테이블 제거: Grafana의 기본 Silence 기능 사용
 
 -- ============================================================================
--- 트리거: 데이터 무결성 및 alert_count 자동 관리
+-- 트리거: 데이터 무결성 및 alert_count 관리
 -- ============================================================================
 
--- 트리거 1: alert_count 자동 업데이트 (grafana_alerts INSERT 시)
-DELIMITER //
-CREATE TRIGGER IF NOT EXISTS trg_update_alert_count_on_insert
-AFTER INSERT ON grafana_alerts
-FOR EACH ROW
-BEGIN
-    UPDATE incidents
-    SET alert_count = (
-        SELECT COUNT(*) FROM grafana_alerts 
-        WHERE incident_id = NEW.incident_id
-    )
-    WHERE incident_id = NEW.incident_id;
-END//
-DELIMITER ;
+-- alert_count 증가는 애플리케이션에서 처리 (find_or_create_incident: alert_count = alert_count + N)
+-- 기존 INSERT 트리거는 알람마다 COUNT(*)를 다시 계산하여 Incident의 알람 이력에 비례해 느려졌음
+-- 누락/중복으로 인한 불일치는 애플리케이션의 주기적 reconciliation 작업이 보정
+-- 기존 DB에서 전환 시: DROP TRIGGER IF EXISTS trg_update_alert_count_on_insert;
 
--- 트리거 2: alert_count 자동 업데이트 (grafana_alerts DELETE 시)
+-- 트리거 1: alert_count 감소 (grafana_alerts DELETE 시, 행당 -1)
 DELIMITER //
 CREATE TRIGGER IF NOT EXISTS trg_update_alert_count_on_delete
 AFTER DELETE ON grafana_alerts
 FOR EACH ROW
 BEGIN
     UPDATE incidents
-    SET alert_count = (
-        SELECT COUNT(*) FROM grafana_alerts 
-        WHERE incident_id = OLD.incident_id
-    )
+    SET alert_count = GREATEST(alert_count - 1, 0)
     WHERE incident_id = OLD.incident_id;
 END//
 DELIMITER ;
 
--- 트리거 3: 데이터 무결성 체크 - 같은 incident_key에 여러 open incident 방지
+-- 트리거 2: 데이터 무결성 체크 - 같은 incident_key에 여러 open incident 방지
 -- INSERT 전에 체크하여 중복 방지
 DELIMITER //
 CREATE TRIGGER IF NOT EXISTS trg_prevent_duplicate_open_incident